@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import numpy as np
+from prompts import COMPARISON_CATEGORIES, CONTENT_5_CATEGORIES
+
+
+def _wins(scores: np.ndarray, opponent: np.ndarray) -> np.ndarray:
+    # NaN compares unequal to everything, so unplayed pairs come out as 0.
+    # Built in place in float32, like the scores, rather than as float64 temporaries
+    wins = np.equal(scores, opponent).astype(np.float32)
+    wins *= 0.5
+    wins += np.greater(scores, opponent)
+    return wins
+
+
+class PairAnalytics:
+    """Per-category score and win matrices built from the comparison data of every page.
+
+    scores[c, i, j] is the score keyword i got in category c when compared with
+    keyword j (NaN for pairs that weren't generated), and wins[c, i, j] is 1, 0.5
+    or 0 for a win, tie or loss. All scores mean "better for beginners", so
+    rankings are highest first. Everything is computed from data the pages
+    already contain, without further API calls.
+    """
+
+    def __init__(self, keywords: List[str], categories: List[str] = COMPARISON_CATEGORIES):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.categories = list(categories)
+        self._keyword_index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._category_index = {category: c for c, category in enumerate(self.categories)}
+        n = len(self.keywords)
+        # float32 keeps 1,000 keywords under 50 MB
+        self.scores = np.full((len(self.categories), n, n), np.nan, dtype=np.float32)
+
+    def record(self, item1: str, item2: str, comparison_data: List[Dict]) -> bool:
+        """Add one page's category rows; returns False if the pair can't be placed"""
+        i, j = self._keyword_index.get(item1), self._keyword_index.get(item2)
+        if i is None or j is None or i == j:
+            return False
+        for category in comparison_data:
+            c = self._category_index.get(category.get('name'))
+            if c is None:
+                continue
+            self.scores[c, i, j] = category['item1_score']
+            self.scores[c, j, i] = category['item2_score']
+        return True
+
+    @property
+    def compared(self) -> np.ndarray:
+        """Boolean (categories, n, n) mask of the scored pairs"""
+        return ~np.isnan(self.scores)
+
+    @property
+    def played(self) -> np.ndarray:
+        """Boolean (n, n) mask of the pairs scored in any category"""
+        played = np.zeros(self.scores.shape[1:], dtype=bool)
+        for category_scores in self.scores:
+            played |= ~np.isnan(category_scores)
+        return played
+
+    @property
+    def wins(self) -> np.ndarray:
+        return _wins(self.scores, self.scores.transpose(0, 2, 1))
+
+    def total_wins(self) -> np.ndarray:
+        """(n, n) wins summed over the categories, one category at a time"""
+        totals = np.zeros(self.scores.shape[1:], dtype=np.float32)
+        for category_scores in self.scores:
+            totals += _wins(category_scores, category_scores.T)
+        return totals
+
+    def category_ranking(self, category: str) -> List[Dict]:
+        """Keywords ordered by mean score in one category, with their win rate"""
+        c = self._category_index[category]
+        counts = (~np.isnan(self.scores[c])).sum(axis=1)
+        totals = np.nansum(self.scores[c], axis=1)
+        wins = _wins(self.scores[c], self.scores[c].T).sum(axis=1)
+        ranked = [i for i in np.argsort(-totals / np.maximum(counts, 1), kind='stable') if counts[i]]
+        return [{
+            "keyword": self.keywords[i],
+            "mean_score": round(float(totals[i] / counts[i]), 2),
+            "win_rate": round(float(wins[i] / counts[i]), 3),
+            "pairs": int(counts[i])
+        } for i in ranked]
+
+    def bradley_terry(self, iterations: int = 200, prior: float = 0.5, tolerance: float = 1e-9) -> np.ndarray:
+        """Bradley-Terry strengths from the category wins of every pair.
+
+        Each category of a pair counts as one game. Fitted with the usual MM
+        updates; `prior` adds that many pseudo-wins each way to every compared
+        pair so keywords that never won still get a finite strength.
+        """
+        played = self.played
+        wins = self.total_wins() + prior * played
+        games = wins + wins.T
+        strengths = np.where(played.any(axis=1), 1.0, 0.0)
+        for _ in range(iterations):
+            pair_sums = strengths[:, None] + strengths[None, :]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                denominators = np.where(games > 0, games / pair_sums, 0.0).sum(axis=1)
+                updated = np.where(denominators > 0, wins.sum(axis=1) / denominators, 0.0)
+            # Strengths are only defined up to scale; keep their geometric mean at 1
+            active = updated > 0
+            if active.any():
+                updated[active] /= np.exp(np.log(updated[active]).mean())
+            if np.abs(updated - strengths).max(initial=0.0) < tolerance:
+                strengths = updated
+                break
+            strengths = updated
+        return strengths
+
+    def overall_ranking(self) -> List[Dict]:
+        strengths = self.bradley_terry()
+        ranked = [i for i in np.argsort(-strengths, kind='stable') if strengths[i] > 0]
+        return [{"keyword": self.keywords[i], "strength": round(float(strengths[i]), 4)} for i in ranked]
+
+    def best_for(self, category: str, top: int = 5) -> List[str]:
+        return [row["keyword"] for row in self.category_ranking(category)[:top]]
+
+    def leaderboards(self, top: int = 5) -> Dict:
+        """Everything as one JSON-ready document; best_for is keyed by the zeyvior.com hub categories"""
+        return {
+            "keywords": len(self.keywords),
+            "pairs": int(self.played.sum() // 2),
+            "overall": self.overall_ranking(),
+            "categories": {category: self.category_ranking(category) for category in self.categories},
+            "best_for": {
+                hub["name"]: {
+                    "link": hub["link"],
+                    "button_text": hub["button_text"],
+                    "keywords": self.best_for(hub["name"], top)
+                }
+                for hub in CONTENT_5_CATEGORIES if hub["name"] in self._category_index
+            }
+        }
+
+    def report(self, top: int = 5) -> List[str]:
+        overall = self.overall_ranking()
+        lines = [f"Leaderboard from {int(self.played.sum() // 2)} compared pairs:"]
+        for rank, row in enumerate(overall[:top], 1):
+            lines.append(f"  {rank:>3}. {row['keyword']:<40} {row['strength']:>8.3f}")
+        for category in self.categories:
+            best = self.best_for(category, 3)
+            if best:
+                lines.append(f"    best for {category}: {', '.join(best)}")
+        return lines
+
+    def save(self, path):
+        """Keep the score matrices next to the run report, so repair.py can redo the leaderboards"""
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, keywords=np.array(self.keywords), categories=np.array(self.categories),
+                                scores=self.scores)
+
+    @classmethod
+    def load(cls, path) -> 'PairAnalytics':
+        with np.load(path) as saved:
+            analytics = cls(saved['keywords'].tolist(), saved['categories'].tolist())
+            analytics.scores = saved['scores']
+        return analytics
+
+
+# Analytics of the run in progress, if main() is collecting them
+current_analytics: ContextVar[Optional[PairAnalytics]] = ContextVar('current_analytics', default=None)
+
+
+def record_scores(item1: str, item2: str, comparison_data: List[Dict]):
+    analytics = current_analytics.get()
+    if analytics is not None:
+        analytics.record(item1, item2, comparison_data)
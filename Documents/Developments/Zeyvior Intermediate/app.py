@@ -1,30 +1,150 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, stream_template
 import os
 from pathlib import Path
-from generate_comparisons import main as generate_comparisons
+from generate_comparisons import main as generate_comparisons, generate_page_data, render_pages
+from backends import get_backend
+import hashlib
+import io
+import json
 import tempfile
+import threading
+import time
+from contextlib import contextmanager
 import shutil
+import sqlite3
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+from http_cache import ResponseCache
+from page_store import PageStore
+from planner import BudgetExceededError
+from preview import PAGE_STYLES, PreviewPage
+from run_report import RunReport, current_report
+from single_flight import SharedFlight, SingleFlight
+from variants import VariantPool
+from pair_selection import AllPairs
+from scheduler import FairScheduler, QuotaExceededError
+from warming import PreWarmer, PrewarmConfig
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 
+# Reverse proxies in front of the app that set X-Forwarded-For (and may set
+# X-Client-Id). Without any, those headers come from the caller and are ignored,
+# so a client can't dodge its quota by sending a new value with every request.
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
 # Create templates directory if it doesn't exist
 Path("templates").mkdir(exist_ok=True)
 
+# Rendered /compare and /download responses, keyed on normalized form inputs
+response_cache = ResponseCache(int(os.getenv('RESPONSE_CACHE_SIZE', '256')))
+CACHE_MAX_AGE = int(os.getenv('CACHE_MAX_AGE', '300'))
+
+def open_page_store():
+    """The store at PAGE_STORE_PATH or next to app.py; the temp dir where that is read-only (e.g. Vercel)"""
+    path = os.getenv('PAGE_STORE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages.db')
+    try:
+        return PageStore(path)
+    except (OSError, sqlite3.Error) as e:
+        fallback = os.path.join(tempfile.gettempdir(), 'pages.db')
+        print(f"Page store at {path} is unavailable ({str(e)}); using {fallback}, which may not outlive this instance")
+        return PageStore(fallback)
+
+# Generated pages are kept here so the comparison site can be served by the app itself
+page_store = open_page_store()
+
+# Pair pages missing from the store are generated on first request for keywords
+# listed here or used in an earlier /generate run; 0 keeps generated pages forever
+page_store.add_keywords(k.strip() for k in os.getenv('SITE_KEYWORDS', '').split(',') if k.strip())
+LAZY_PAGE_TTL = int(os.getenv('LAZY_PAGE_TTL_SECONDS', '604800'))
+
+# Paraphrases per boilerplate block for /generate and lazy pages; 0 rewrites per page
+VARIANT_POOL_SIZE = int(os.getenv('VARIANT_POOL_SIZE', '0'))
+
+# When set, every /generate job writes per-stage CPU profiles to a directory of its own here
+PROFILE_DIR = os.getenv('PROFILE_DIR')
+
+# Identical /generate jobs and lazy page generations in flight share one run;
+# /generate jobs also across worker processes, through leases in the page store
+job_flight = SingleFlight()
+shared_job_flight = SharedFlight(page_store)
+
+# Pages from every job run on one worker pool, interleaved fairly across jobs;
+# quotas are charged in the page store, so they hold across worker processes
+scheduler = FairScheduler(ledger=page_store)
+
+def client_id():
+    """Who a job is for, for quotas and fairness; X-Client-Id only behind a trusted proxy"""
+    if TRUSTED_PROXY_HOPS and request.headers.get('X-Client-Id'):
+        return request.headers['X-Client-Id']
+    return request.remote_addr or 'anonymous'
+
+# Running /generate jobs, so a shutting-down worker can let them finish
+active_jobs = 0
+jobs_changed = threading.Condition()
+draining = threading.Event()
+
+@contextmanager
+def tracked_job():
+    global active_jobs
+    with jobs_changed:
+        active_jobs += 1
+    try:
+        yield
+    finally:
+        with jobs_changed:
+            active_jobs -= 1
+            jobs_changed.notify_all()
+
+def begin_drain():
+    """Stop accepting new /generate jobs and pre-warming; running ones carry on"""
+    draining.set()
+    prewarmer.stop()
+
+def drain_jobs(timeout=None):
+    """Stop accepting jobs and wait for running ones; returns False if some are still running"""
+    begin_drain()
+    with jobs_changed:
+        return jobs_changed.wait_for(lambda: active_jobs == 0, timeout)
+
+def parse_comparison_form():
+    """Read and normalize category and methods from the query string or form"""
+    category = ' '.join(request.values.get('category', '').split())
+    methods = request.values.get('methods', '').split(',')
+    methods = [' '.join(m.split()) for m in methods if m.strip()]
+    return category, methods
+
+def cached_html_response(key, render, headers=None):
+    """Serve a rendered page from the response cache with a strong ETag.
+
+    GET/HEAD requests carrying a matching If-None-Match get an empty 304.
+    """
+    entry = response_cache.get_or_render(key, render)
+    response = app.response_class(entry.body, mimetype='text/html', headers=headers)
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/compare', methods=['POST'])
+@app.route('/healthz')
+def healthz():
+    # Fails while draining so load balancers stop routing new work here
+    status = {'status': 'draining' if draining.is_set() else 'ok', 'active_jobs': active_jobs,
+              'queued_pages': scheduler.queued(), 'prewarmed_pages': prewarmer.warmed}
+    return jsonify(status), 503 if draining.is_set() else 200
+
+@app.route('/compare', methods=['GET', 'POST'])
 def compare():
     try:
         # Get category and methods from form
-        category = request.form.get('category', '').strip()
-        methods = request.form.get('methods', '').split(',')
-        methods = [m.strip() for m in methods if m.strip()]
+        category, methods = parse_comparison_form()
         
         if not category:
             return jsonify({'error': 'Please provide a category'}), 400
@@ -33,18 +153,19 @@ def compare():
             return jsonify({'error': 'Please provide at least 1 method'}), 400
         
         # Return the comparison page with methods and category
-        return render_template('comparison.html', category=category, methods=methods)
+        return cached_html_response(
+            ('compare', category, tuple(methods)),
+            lambda: render_template('comparison.html', category=category, methods=methods)
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/download', methods=['POST'])
+@app.route('/download', methods=['GET', 'POST'])
 def download():
     try:
         # Get category and methods from form
-        category = request.form.get('category', '').strip()
-        methods = request.form.get('methods', '').split(',')
-        methods = [m.strip() for m in methods if m.strip()]
+        category, methods = parse_comparison_form()
         
         if not category or len(methods) < 1:
             return jsonify({'error': 'Invalid data'}), 400
@@ -53,22 +174,19 @@ def download():
         from datetime import datetime
         current_date = datetime.now().strftime("%B %d, %Y")
         
-        # Render the standalone comparison page as HTML
-        html_content = render_template('standalone_comparison.html', 
-                                     category=category, 
-                                     methods=methods,
-                                     current_date=current_date)
-        
         # Create filename based on category
         filename = f"{category.lower().replace(' ', '-')}-comparison.html"
         
-        # Return the HTML file for download
-        response = app.response_class(
-            html_content,
-            mimetype='text/html',
+        # Render the standalone comparison page as HTML (the date is part of the
+        # cache key so the page is re-rendered once a day)
+        return cached_html_response(
+            ('download', category, tuple(methods), current_date),
+            lambda: render_template('standalone_comparison.html',
+                                    category=category,
+                                    methods=methods,
+                                    current_date=current_date),
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
-        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -83,36 +201,203 @@ def generate():
         if len(keywords) < 2:
             return jsonify({'error': 'Please provide at least 2 keywords'}), 400
         
-        # Create a temporary directory for generation
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Change to temp directory
-            original_cwd = os.getcwd()
-            os.chdir(temp_dir)
-            
+        # Optional backend choice, e.g. backend=offline for fast previews
+        try:
+            backend = get_backend(request.form.get('backend') or None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if draining.is_set():
+            return jsonify({'error': 'Server is shutting down, please retry shortly'}), 503, {'Retry-After': '30'}
+        
+        client = client_id()
+        
+        def run_job():
+            # Each job gets its own directory, so concurrent jobs never touch each
+            # other's files and the process working directory is left alone
+            job = scheduler.open_job(client, len(AllPairs(keywords)))
             try:
-                # Copy static directory to temp directory
-                shutil.copytree(os.path.join(original_cwd, 'static'), 'static')
-                
-                # Generate comparisons
-                generate_comparisons(keywords)
-                
-                # Move the ZIP file to original directory
-                zip_path = 'comparison_pages.zip'
-                if os.path.exists(zip_path):
-                    shutil.move(zip_path, os.path.join(original_cwd, zip_path))
+                with tempfile.TemporaryDirectory() as temp_dir, tracked_job():
+                    shutil.copytree(app.static_folder, os.path.join(temp_dir, 'static'))
+                    profile_dir = None
+                    if PROFILE_DIR:
+                        profile_dir = os.path.join(os.path.abspath(PROFILE_DIR),
+                                                   f"generate-{time.strftime('%Y%m%d-%H%M%S')}-{os.path.basename(temp_dir)}")
+                    zip_path = generate_comparisons(keywords, store=page_store, backend=backend,
+                                                    work_dir=temp_dir, executor=job,
+                                                    variant_pool_size=VARIANT_POOL_SIZE,
+                                                    profile_dir=profile_dir)
+                    return zip_path.read_bytes()
             finally:
-                # Change back to original directory
-                os.chdir(original_cwd)
+                job.shutdown(cancel_futures=True)
+        
+        # Identical submissions in flight at the same time (e.g. a double click,
+        # whose requests may land on different workers) wait for the first one
+        # and get the same ZIP
+        job_key = 'generate:' + hashlib.sha256(json.dumps([keywords, backend.name]).encode('utf-8')).hexdigest()
+        zip_bytes, _ = job_flight.do(job_key, lambda: shared_job_flight.do(job_key, run_job)[0])
         
         # Send the ZIP file
         return send_file(
-            'comparison_pages.zip',
+            io.BytesIO(zip_bytes),
+            mimetype='application/zip',
             as_attachment=True,
             download_name='comparison_pages.zip'
         )
     
+    except BudgetExceededError as e:
+        return jsonify({'error': str(e)}), 400
+    except QuotaExceededError as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/preview')
+def preview():
+    """Stream one comparison page while it is being generated.
+
+    The page header goes out immediately and each block is flushed as its
+    completion streams in, so nothing is written to disk or the page store.
+    """
+    item1 = ' '.join(request.args.get('item1', '').split())
+    item2 = ' '.join(request.args.get('item2', '').split())
+    
+    if not item1 or not item2:
+        return jsonify({'error': 'Please provide item1 and item2'}), 400
+    
+    try:
+        backend = get_backend(request.args.get('backend') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return stream_template('preview.html',
+                           page=PreviewPage(item1, item2, backend),
+                           page_styles=PAGE_STYLES,
+                           title=f"{item1} vs {item2} [AI Analysis]")
+
+def stored_page_response(filename, as_attachment=False):
+    """Serve a page from the page store, pre-compressed when the client accepts it"""
+    page = page_store.get(filename)
+    if page is None:
+        return jsonify({'error': 'Page not found'}), 404
+    
+    body, etag, encoding = page.content, page.etag, None
+    for candidate in ('br', 'gzip'):
+        if candidate in page.encodings and request.accept_encodings[candidate]:
+            body, etag, encoding = page.encodings[candidate], f"{page.etag}-{candidate}", candidate
+            break
+    
+    response = app.response_class(body, mimetype=page.content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    if as_attachment:
+        response.headers['Content-Disposition'] = f"attachment; filename={os.path.basename(filename)}"
+    response.set_etag(etag)
+    response.last_modified = page.updated_at
+    response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+    return response.make_conditional(request)
+
+def canonical_pair(item1, item2, keywords=None):
+    """The keyword added first leads, as in generate_comparisons.py, so either URL yields the same page"""
+    keywords = page_store.keywords() if keywords is None else keywords
+    if item1 in keywords and item2 in keywords and keywords.index(item1) > keywords.index(item2):
+        return item2, item1
+    return item1, item2
+
+def generate_pair_page(item1, item2):
+    """Generate a pair page and its b-vs-a mirror from the same data.
+
+    Returns (stored, {filename: html}). Pages with fallback blocks are not
+    stored, so a failing API can't replace good pages with generic text for a
+    whole TTL; the caller may still serve them once.
+    """
+    report = RunReport()
+    token = current_report.set(report)
+    try:
+        backend = get_backend()
+        variants = VariantPool.build(backend, VARIANT_POOL_SIZE, page_store) if VARIANT_POOL_SIZE else None
+        keywords = page_store.keywords()
+        item1, item2 = canonical_pair(item1, item2, keywords)
+        data = generate_page_data(item1, item2, keywords, backend=backend, variants=variants)
+        pages = render_pages(data, mirror=True)
+    finally:
+        current_report.reset(token)
+    if report.fallbacks:
+        failed = sorted({entry["block"] for entries in report.fallbacks.values() for entry in entries})
+        print(f"Not storing {item1} vs {item2}: {', '.join(failed)} fell back")
+        return False, pages
+    for name, html_content in pages.items():
+        page_store.put(name, html_content.encode('utf-8'))
+    return True, pages
+
+def warm_page(filename, item1, item2):
+    """Pre-warmer hook: generate a pair page, returning whether it was stored"""
+    # A visitor asking for either orientation meanwhile waits for this generation.
+    # This runs on a scheduler worker, so it skips a page already in flight rather
+    # than wait for a leader that may itself be waiting for a worker.
+    ran, result = job_flight.try_do(('page',) + canonical_pair(item1, item2),
+                                    lambda: generate_pair_page(item1, item2))
+    return ran and result[0]
+
+# Popular pair pages are regenerated in the background before visitors find them
+# missing or stale (PREWARM_TOP_N > 0 turns it on; see warming.py)
+prewarmer = PreWarmer(page_store, scheduler, warm_page, PrewarmConfig.from_env(LAZY_PAGE_TTL))
+prewarmer.start()
+
+@app.route('/<slug_a>-vs-<slug_b>.html')
+def pair_page(slug_a, slug_b):
+    """Serve a pair page, generating it on first request or once it is older than the TTL"""
+    filename = f"{slug_a}-vs-{slug_b}.html"
+    page = page_store.get(filename)
+    if page is None or (LAZY_PAGE_TTL and time.time() - page.updated_at > LAZY_PAGE_TTL):
+        # Only known keywords, so arbitrary URLs can't trigger paid generation
+        item1, item2 = page_store.keyword_for_slug(slug_a), page_store.keyword_for_slug(slug_b)
+        if item1 is None or item2 is None or item1 == item2:
+            if page is None:
+                return jsonify({'error': 'Page not found'}), 404
+        else:
+            def schedule_page():
+                # A one-page job, so it takes the priority lane
+                job = scheduler.open_job(client_id(), 1)
+                try:
+                    return job.submit(generate_pair_page, item1, item2).result()
+                finally:
+                    job.shutdown()
+            
+            # Concurrent first requests for either order of a pair wait for a single generation
+            try:
+                (stored, pages), _ = job_flight.do(('page',) + canonical_pair(item1, item2), schedule_page)
+                if not stored and page is None and filename in pages:
+                    # Generic text in places: better than nothing, but neither stored nor cached
+                    response = app.response_class(pages[filename], mimetype='text/html')
+                    response.headers['Cache-Control'] = 'no-store'
+                    return response
+            except QuotaExceededError as e:
+                # Over quota: a stale page is still better than none
+                if page is None:
+                    return jsonify({'error': str(e)}), 429
+            except Exception as e:
+                # Failed generation (no API key, API down, ...): the same goes for a stale page
+                print(f"Generating {filename} failed: {str(e)}")
+                if page is None:
+                    return jsonify({'error': 'The page could not be generated, please retry shortly'}), 503, {'Retry-After': '30'}
+    prewarmer.record(filename)
+    return stored_page_response(filename)
+
+@app.route('/styles.css')
+def pair_page_styles():
+    # Pair pages link their stylesheet relative to the page
+    return app.send_static_file('styles.css')
+
+@app.route('/standalone/<path:filename>')
+def standalone(filename):
+    return stored_page_response(filename)
+
+@app.route('/download/<path:filename>')
+def download_page(filename):
+    return stored_page_response(filename, as_attachment=True)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=True) 
\ No newline at end of file
+    # Development server only; see gunicorn.conf.py and asgi.py for production
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '8080')), debug=True) 
\ No newline at end of file
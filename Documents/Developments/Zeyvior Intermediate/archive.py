@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import contextvars
+import os
+import struct
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
+from profiling import stage
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for tar.zst archives
+    zstandard = None
+
+ARCHIVE_FORMATS = ('zip', 'tar.zst')
+
+# Already compressed; deflating them again costs time and saves nothing
+STORED_SUFFIXES = ('.gz', '.br', '.zst', '.zip', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff2')
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_COUNT_LIMIT = 0xFFFF
+
+
+def archive_workers() -> int:
+    value = os.getenv('ARCHIVE_WORKERS')
+    return int(value) if value else (os.cpu_count() or 1)
+
+
+class _Entry(NamedTuple):
+    name: bytes
+    method: int
+    dos_time: int
+    dos_date: int
+    crc: int
+    data: bytes
+    size: int
+
+
+def _dos_timestamp(mtime: float):
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _compress_entry(path: Path, name: str, level: int) -> _Entry:
+    """Read and deflate one file; runs on a worker thread (zlib releases the GIL)"""
+    with stage("compress"):
+        return deflate_entry(name, path.read_bytes(), path.stat().st_mtime, level)
+
+
+def deflate_entry(name: str, data: bytes, mtime: float, level: int = 6) -> _Entry:
+    """A ZIP entry for data, deflated unless that doesn't make it smaller"""
+    dos_time, dos_date = _dos_timestamp(mtime)
+    crc = zlib.crc32(data)
+    method, payload = 0, data
+    if not name.endswith(STORED_SUFFIXES):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        deflated = compressor.compress(data) + compressor.flush()
+        if len(deflated) < len(data):
+            method, payload = 8, deflated
+    return _Entry(name.encode('utf-8'), method, dos_time, dos_date, crc, payload, len(data))
+
+
+def _in_order(entries: Iterable[Path], names: Iterable[str], level: int, workers: int) -> Iterator[_Entry]:
+    """Compress on a thread pool, at most a few files per worker in flight, yielding in input order"""
+    if workers <= 1:
+        for path, name in zip(entries, names):
+            yield _compress_entry(path, name, level)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="archive") as executor:
+        pending = deque()
+        for path, name in zip(entries, names):
+            # In the caller's context, so a profiled run sees the workers' stages
+            pending.append(executor.submit(contextvars.copy_context().run, _compress_entry, path, name, level))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ZipStreamWriter:
+    """Appends finished entries to a binary stream and writes the central directory on close.
+
+    Entries are compressed beforehand (deflate_entry), so callers can do that on
+    any thread and only hand the bytes over here, one at a time. ZIP64 records
+    are added when the archive needs them.
+    """
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.central = []
+        self.offset = 0
+
+    def add(self, entry: _Entry):
+        self.out.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, 0x800, entry.method, entry.dos_time,
+                                   entry.dos_date, entry.crc, len(entry.data), entry.size, len(entry.name), 0))
+        self.out.write(entry.name)
+        self.out.write(entry.data)
+        # The payload isn't needed for the central directory
+        self.central.append((entry._replace(data=b''), len(entry.data), self.offset))
+        self.offset += 30 + len(entry.name) + len(entry.data)
+
+    def close(self):
+        out = self.out
+        central_offset = offset = self.offset
+        for entry, compressed_size, local_offset in self.central:
+            extra = b''
+            if local_offset >= _ZIP64_LIMIT:
+                extra = struct.pack('<HHQ', 0x0001, 8, local_offset)
+                local_offset = _ZIP64_LIMIT
+            out.write(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 45 if extra else (3 << 8) | 20,
+                                  45 if extra else 20, 0x800, entry.method, entry.dos_time, entry.dos_date,
+                                  entry.crc, compressed_size, entry.size, len(entry.name), len(extra), 0, 0, 0,
+                                  0o100644 << 16, local_offset))
+            out.write(entry.name)
+            out.write(extra)
+            offset += 46 + len(entry.name) + len(extra)
+
+        count, central_size = len(self.central), offset - central_offset
+        if count >= _ZIP_COUNT_LIMIT or central_offset >= _ZIP64_LIMIT or central_size >= _ZIP64_LIMIT:
+            out.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, (3 << 8) | 45, 45, 0, 0,
+                                  count, count, central_size, central_offset))
+            out.write(struct.pack('<IIQI', 0x07064b50, 0, offset, 1))
+        out.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(count, _ZIP_COUNT_LIMIT),
+                              min(count, _ZIP_COUNT_LIMIT), min(central_size, _ZIP64_LIMIT),
+                              min(central_offset, _ZIP64_LIMIT), 0))
+
+
+def write_zip(zip_path: Path, output_dir: Path, filenames: Iterable[str], level: int = 6,
+              workers: Optional[int] = None):
+    """Write a ZIP of output_dir files, deflating them in parallel.
+
+    zipfile compresses each member on the thread that writes it, so packaging
+    thousands of pages is single-threaded. Here workers deflate the files and
+    this thread only appends the finished entries, in order.
+    """
+    workers = archive_workers() if workers is None else workers
+    filenames = list(dict.fromkeys(filenames))
+    with open(zip_path, 'wb') as out:
+        writer = ZipStreamWriter(out)
+        for entry in _in_order((output_dir / name for name in filenames), filenames, level, workers):
+            writer.add(entry)
+        writer.close()
+
+
+def write_tar_zst(tar_path: Path, output_dir: Path, filenames: Iterable[str], level: int = 10,
+                  workers: Optional[int] = None):
+    """Write a zstd-compressed tarball; zstd splits the stream across worker threads itself"""
+    if zstandard is None:
+        raise RuntimeError("tar.zst archives need the zstandard package (pip install zstandard)")
+    workers = archive_workers() if workers is None else workers
+    compressor = zstandard.ZstdCompressor(level=level, threads=workers if workers > 1 else 0)
+    with open(tar_path, 'wb') as out, compressor.stream_writer(out) as stream, \
+            tarfile.open(fileobj=stream, mode='w|') as tar:
+        for filename in dict.fromkeys(filenames):
+            tar.add(output_dir / filename, arcname=filename)
+
+
+def write_archive(path: Path, output_dir: Path, filenames: Iterable[str], workers: Optional[int] = None) -> Path:
+    """Package output_dir files as a .zip or .tar.zst, by the extension of path"""
+    if path.name.endswith('.tar.zst'):
+        write_tar_zst(path, output_dir, filenames, workers=workers)
+    else:
+        write_zip(path, output_dir, filenames, workers=workers)
+    return path
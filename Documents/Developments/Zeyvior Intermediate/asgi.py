@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""ASGI entry point: uvicorn asgi:app --workers 4 --timeout-graceful-shutdown 300
+
+The Flask app is adapted with a2wsgi, which runs requests on a pool of
+WEB_THREADS threads per process so slow generation never blocks the event loop
+or other requests. Shutdown stops new /generate jobs and waits for running ones
+before the process exits.
+"""
+import asyncio
+import os
+from a2wsgi import WSGIMiddleware
+from app import app as flask_app, drain_jobs
+
+wsgi_app = WSGIMiddleware(flask_app, workers=int(os.getenv('WEB_THREADS', '16')))
+GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT_SECONDS', '300'))
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Waiting blocks, so do it off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, drain_jobs, GRACEFUL_TIMEOUT)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    else:
+        await wsgi_app(scope, receive, send)
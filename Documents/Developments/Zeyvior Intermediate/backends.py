@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterator, Optional
+from llm_client import LLMClient, get_client
+from prompts import COMPARISON_CATEGORIES
+from single_flight import SingleFlight
+
+
+class GenerationBackend:
+    """Produces the chat completion for one content block.
+
+    complete() returns a body shaped like an OpenAI chat completion response, so
+    the generate_* functions parse every backend's output the same way. The
+    keyword arguments carry the block's inputs (item names, scores, category) for
+    backends that don't run the prompt through a model.
+    """
+
+    name = 'base'
+    # Model the requests are sent to; None keeps the one the prompts name (prompts.MODEL)
+    model: Optional[str] = None
+    # Whether calls cost money, i.e. whether the planner's budget applies
+    billable = False
+
+    def complete(self, block: str, request: Dict, **fields) -> Dict:
+        raise NotImplementedError
+
+    def stream(self, block: str, request: Dict, **fields) -> Iterator[str]:
+        """Yield the completion text in pieces as it is produced"""
+        yield self.complete(block, request, **fields)['choices'][0]['message']['content']
+
+
+# Identical requests in flight at the same moment share one API call
+prompt_flight = SingleFlight()
+
+
+class RemoteChatBackend(GenerationBackend):
+    """The hosted chat model, reached through the shared pooled client"""
+
+    name = 'openai'
+    billable = True
+
+    def __init__(self, client: Optional[LLMClient] = None, model: Optional[str] = None):
+        if client is None and not os.getenv('OPENAI_API_KEY'):
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        self.client = client
+        self.model = model
+
+    def complete(self, block: str, request: Dict, **fields) -> Dict:
+        if self.model:
+            request = dict(request, model=self.model)
+        client = self.client or get_client()
+        key = (client.base_url, json.dumps(request, sort_keys=True))
+        response, shared = prompt_flight.do(key, lambda: client.chat_completion(**request))
+        if shared:
+            # The tokens were paid for once, by the caller that made the request
+            response = dict(response, usage=None)
+        return response
+
+    def stream(self, block: str, request: Dict, **fields) -> Iterator[str]:
+        if self.model:
+            request = dict(request, model=self.model)
+        return (self.client or get_client()).stream_chat_completion(**request)
+
+
+class LocalModelBackend(RemoteChatBackend):
+    """A local OpenAI-compatible server such as Ollama, llama.cpp or vLLM"""
+
+    name = 'local'
+    billable = False
+
+    def __init__(self):
+        super().__init__(
+            client=LLMClient(api_key=os.getenv('LOCAL_LLM_API_KEY', 'local'),
+                             base_url=os.getenv('LOCAL_LLM_BASE_URL', 'http://localhost:11434/v1')),
+            model=os.getenv('LOCAL_LLM_MODEL', 'llama3.1')
+        )
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.sha256("\x1f".join(str(p) for p in parts).encode('utf-8')).hexdigest()[:8], 16)
+
+
+def _pick(options, *parts) -> str:
+    return options[_seed(*parts) % len(options)]
+
+
+class OfflineBackend(GenerationBackend):
+    """Deterministic templated text and plausible scores, with no network access.
+
+    The same inputs always give the same output, which makes it suitable for
+    previews, template work and tests. A full site renders in seconds.
+    """
+
+    name = 'offline'
+
+    INTROS = [
+        "See how {item1} and {item2} compare side by side. Zeyvior AI weighs current data and trends to show which option may suit you better.",
+        "Curious whether {item1} or {item2} is the better fit? Zeyvior AI breaks down both options with clear, data-driven insights.",
+        "Explore an AI-driven comparison of {item1} and {item2}, built from real-time trends to help you weigh each option with confidence.",
+    ]
+    DETAILS = [
+        "{item} offers a {level} starting point for beginners when it comes to {category}, with results depending on consistent effort.",
+        "For {category}, {item} is {level} for newcomers; most beginners need patience and practice before seeing progress.",
+        "{item} rates as {level} on {category} for beginners, though outcomes vary with time invested and skills learned.",
+    ]
+    REASONS = [
+        "{winner} is easier for beginners to start and offers steadier early progress.",
+        "{winner} has a gentler learning curve and fewer upfront hurdles for newcomers.",
+        "{winner} scores higher across most categories that matter to complete beginners.",
+    ]
+    SUMMARIES = [
+        "Zeyvior AI rates {item1} at {item1_score:.1f}% and {item2} at {item2_score:.1f}%, so neither stands out yet. For beginners without a clear plan, {winner} looks like the stronger start. Pick another option below to compare more.",
+        "With {item1} at {item1_score:.1f}% and {item2} at {item2_score:.1f}%, both have room to improve. If you're just starting out, {winner} is the better choice for now. Explore more options below.",
+    ]
+    CATEGORY_TEXT = [
+        "For {category}, {item1} and {item2} take different paths; {winner} tends to perform better because it is simpler for beginners to get right.",
+        "On {category}, {winner} has the edge over {other}, mainly thanks to lower barriers and more predictable early results.",
+    ]
+    OUTROS = [
+        "Want to compare {item1} vs. {item2} using the latest data and trends? Zeyvior AI delivers clear insights before you choose your next online strategy, and it can compare almost anything else too. Try it now and decide with confidence!",
+        "Looking for an up-to-date comparison of {item1} and {item2}? Zeyvior AI turns current news and trends into clear insights, whether you're weighing online methods, markets or any other topic. Give it a try today!",
+    ]
+
+    def _level(self, score: int) -> str:
+        if score >= 50:
+            return "fairly approachable"
+        if score >= 35:
+            return "moderately challenging"
+        return "difficult"
+
+    def _comparison_data(self, item1: str, item2: str) -> str:
+        categories = []
+        for category in COMPARISON_CATEGORIES:
+            item1_score = 20 + _seed(item1, item2, category, 1) % 41
+            item2_score = 20 + _seed(item1, item2, category, 2) % 41
+            categories.append({
+                "name": category,
+                "item1_details": _pick(self.DETAILS, item1, category).format(
+                    item=item1, level=self._level(item1_score), category=category.lower()),
+                "item2_details": _pick(self.DETAILS, item2, category).format(
+                    item=item2, level=self._level(item2_score), category=category.lower()),
+                "item1_score": item1_score,
+                "item2_score": item2_score,
+                "winner": item1 if item1_score >= item2_score else item2
+            })
+        item1_total = sum(c["item1_score"] for c in categories)
+        item2_total = sum(c["item2_score"] for c in categories)
+        winner = item1 if item1_total >= item2_total else item2
+        return json.dumps({
+            "categories": categories,
+            "overall_winner": winner,
+            "winning_reason": _pick(self.REASONS, item1, item2).format(winner=winner)
+        })
+
+    def text(self, block: str, item1: str, item2: str, item1_score: float = 50.0,
+             item2_score: float = 50.0, category: Optional[Dict] = None, **fields) -> str:
+        if block == 'seo_intro':
+            return _pick(self.INTROS, item1, item2).format(item1=item1, item2=item2)
+        if block == 'comparison_data':
+            return self._comparison_data(item1, item2)
+        if block == 'content_4':
+            winner = item1 if item1_score > item2_score else item2
+            return _pick(self.SUMMARIES, item1, item2).format(
+                item1=item1, item2=item2, item1_score=item1_score, item2_score=item2_score, winner=winner)
+        if block == 'content_5':
+            name = category["name"]
+            winner, other = (item1, item2) if _seed(item1, item2, name) % 2 else (item2, item1)
+            return _pick(self.CATEGORY_TEXT, item1, item2, name).format(
+                category=name.lower(), item1=item1, item2=item2, winner=winner, other=other)
+        if block == 'content_6':
+            return _pick(self.OUTROS, item1, item2).format(item1=item1, item2=item2)
+        raise ValueError(f"Offline backend has no template for block {block!r}")
+
+    def variants(self, block: str, count: int) -> str:
+        """A variant pool: the templates themselves, placeholders and all"""
+        templates = {'seo_intro_variants': self.INTROS, 'content_6_variants': self.OUTROS}[block]
+        return json.dumps([templates[i % len(templates)] for i in range(count)])
+
+    def translate(self, locale: str, texts: Dict[str, str]) -> str:
+        """A pseudo-translation: each text tagged with the locale, HTML tags kept in place"""
+        return json.dumps({key: re.sub(r'^(<[^>]+>)?', lambda m: f"{m.group(0)}[{locale}] ", text, count=1)
+                           for key, text in texts.items()}, ensure_ascii=False)
+
+    def complete(self, block: str, request: Dict, **fields) -> Dict:
+        if block.endswith('_variants'):
+            content = self.variants(block, **fields)
+        elif block in ('translation', 'ui_strings'):
+            content = self.translate(**fields)
+        else:
+            content = self.text(block, **fields)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0}
+        }
+
+    def stream(self, block: str, request: Dict, **fields) -> Iterator[str]:
+        # Word-sized pieces exercise the same incremental paths as a real stream
+        yield from re.findall(r'\S+\s*|\s+', self.text(block, **fields))
+
+
+BACKENDS = {
+    'openai': RemoteChatBackend,
+    'offline': OfflineBackend,
+    'local': LocalModelBackend,
+}
+
+_instances: Dict[str, GenerationBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None) -> GenerationBackend:
+    """The shared backend instance for a name (default: GENERATION_BACKEND or openai)"""
+    name = (name or os.getenv('GENERATION_BACKEND') or 'openai').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown generation backend: {name} (expected one of {', '.join(BACKENDS)})")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
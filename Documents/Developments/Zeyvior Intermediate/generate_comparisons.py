@@ -1,35 +1,57 @@
 #!/usr/bin/env python3
 import os
 import sys
+import argparse
 import json
-import itertools
-import zipfile
+import contextvars
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
-import openai
+from typing import IO, Callable, Iterator, List, Dict, Iterable, Optional, Sequence, Tuple, TypeVar
 from jinja2 import Template
 from slugify import slugify
 from dotenv import load_dotenv
+from analytics import PairAnalytics, current_analytics, record_scores
+from archive import ARCHIVE_FORMATS, write_archive
+from backends import BACKENDS, GenerationBackend, get_backend
+from locales import Localizer
+from manifest import BuildManifest, write_delta
+from minify import MinifyStats, minify_css, minify_html, precompressed_variants
+from page_store import PageStore
+from pair_selection import STRATEGIES, AllPairs, select_pairs
+from planner import BudgetExceededError, PlannerConfig, plan_job
+from profiling import current_profiler, profile_run, stage
+from prompts import (
+    CONTENT_5_CATEGORIES,
+    SOURCE_LOCALE,
+    UI_STRINGS,
+    comparison_data_request,
+    content_4_request,
+    content_5_request,
+    content_6_request,
+    select_content_5_categories,
+    seo_intro_request,
+)
+from run_report import RunReport, current_report, record_fallback, record_page
+from sinks import DirectorySink, OutputSink, open_sink
+from sitemap import SiteIndexBuilder
+from usage import UsageStats, current_usage, record_usage
+from variants import VariantPool
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Set OpenAI API key
-api_key = os.getenv('OPENAI_API_KEY')
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
-openai.api_key = api_key
-
 # HTML template
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
-<html lang="en">
+<html lang="{{ lang }}">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ title }}</title>
     <meta name="description" content="{{ meta_description }}">
-    <link rel="stylesheet" href="styles.css">
+    {% if canonical %}<link rel="canonical" href="{{ canonical }}">{% endif %}
+    <link rel="stylesheet" href="{{ root }}styles.css">
     <style>
         /* Navigation Styles */
         .navbar {
@@ -1000,8 +1022,8 @@ HTML_TEMPLATE = '''
                 <a href="https://zeyvior.com/" class="logo-text">Zeyvior</a>
             </div>
             <div class="nav-buttons">
-                <a href="https://ai-analyzer.zeyvior.com/" class="nav-btn nav-btn-primary">Personalize Comparisons</a>
-                <a href="../" class="nav-btn nav-btn-secondary">Similar Comparisons</a>
+                <a href="https://ai-analyzer.zeyvior.com/" class="nav-btn nav-btn-primary">{{ ui.personalize }}</a>
+                <a href="../" class="nav-btn nav-btn-secondary">{{ ui.similar_comparisons }}</a>
             </div>
         </div>
     </nav>
@@ -1036,7 +1058,7 @@ HTML_TEMPLATE = '''
                     {% if category.winner == current_item1 %}
                     <div class="winner-indicator">
                         <span class="winner-emoji">🏆</span>
-                        <span class="winner-text">Winner!</span>
+                        <span class="winner-text">{{ ui.winner }}</span>
                     </div>
                     {% endif %}
                 </div>
@@ -1048,7 +1070,7 @@ HTML_TEMPLATE = '''
                     {% if category.winner == current_item2 %}
                     <div class="winner-indicator">
                         <span class="winner-emoji">🏆</span>
-                        <span class="winner-text">Winner!</span>
+                        <span class="winner-text">{{ ui.winner }}</span>
                     </div>
                     {% endif %}
                 </div>
@@ -1056,7 +1078,7 @@ HTML_TEMPLATE = '''
             {% endfor %}
 
             <div class="performance-row">
-                <div class="performance-label">Performance</div>
+                <div class="performance-label">{{ ui.performance }}</div>
                 <div class="performance-metric">
                     <div class="metric-score">{{ "%.1f"|format(item1_performance) }}%</div>
                 </div>
@@ -1067,7 +1089,7 @@ HTML_TEMPLATE = '''
         </div>
 
         <div class="navigation-section">
-            <h2 class="navigation-title">Similar Comparisons</h2>
+            <h2 class="navigation-title">{{ ui.similar_comparisons }}</h2>
             <nav class="navigation-grid">
                 {% for link in content_3_links %}
                 <a href="{{ link.url }}" class="nav-link">{{ link.text }}</a>
@@ -1083,7 +1105,7 @@ HTML_TEMPLATE = '''
                         <div class="button-bg-animation"></div>
                         <div class="button-content">
                             <span class="zeyvior-icon">🤖</span>
-                            <span class="zeyvior-text">Try Zeyvior</span>
+                            <span class="zeyvior-text">{{ ui.try_zeyvior }}</span>
                             <span class="zeyvior-sparkle">✨</span>
                         </div>
                     </a>
@@ -1097,7 +1119,7 @@ HTML_TEMPLATE = '''
                 <div class="cta-button-container">
                     <a href="https://zeyvior.com/opportunity-for-newcomers/" class="cta-button">
                         <span class="button-icon">🚀</span>
-                        <span class="button-text">Best Methods to Start Now!</span>
+                        <span class="button-text">{{ ui.start_now }}</span>
                         <span class="button-arrow">→</span>
                     </a>
                 </div>
@@ -1129,14 +1151,14 @@ HTML_TEMPLATE = '''
     <footer class="footer">
         <div class="footer-container">
             <div class="footer-links">
-                <a href="https://zeyvior.com/privacy-policy/" class="footer-link">Privacy Policy</a>
-                <a href="https://zeyvior.com/terms-and-conditions/" class="footer-link">Terms and Conditions</a>
-                <a href="https://zeyvior.com/refund-policy/" class="footer-link">Refund Policy</a>
-                <a href="https://zeyvior.com/about-us/" class="footer-link">About Us</a>
-                <a href="https://zeyvior.com/contact-us/" class="footer-link">Contact Us</a>
+                <a href="https://zeyvior.com/privacy-policy/" class="footer-link">{{ ui.privacy_policy }}</a>
+                <a href="https://zeyvior.com/terms-and-conditions/" class="footer-link">{{ ui.terms }}</a>
+                <a href="https://zeyvior.com/refund-policy/" class="footer-link">{{ ui.refund_policy }}</a>
+                <a href="https://zeyvior.com/about-us/" class="footer-link">{{ ui.about_us }}</a>
+                <a href="https://zeyvior.com/contact-us/" class="footer-link">{{ ui.contact_us }}</a>
             </div>
             <div class="footer-copyright">
-                <p>&copy; 2025 Zeyvior. All rights reserved.</p>
+                <p>{{ ui.copyright }}</p>
             </div>
         </div>
     </footer>
@@ -1409,6 +1431,9 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# Compiled once; compiling HTML_TEMPLATE takes far longer than rendering it
+PAGE_TEMPLATE = Template(HTML_TEMPLATE)
+
 def get_badge(score: float) -> str:
     if score >= 90:
         return "Perfect"
@@ -1421,87 +1446,32 @@ def get_badge(score: float) -> str:
     else:
         return "Difficult"
 
-def generate_seo_intro(item1: str, item2: str) -> str:
-    prompt = f'''Re-write this in a meaningful, engaging, and SEO-friendly way. Ensure content avoids triggering Google's YMYL (Your Money or Your Life) policy.
-
-"Get the most accurate and unbiased AI-driven comparison of {item1} and {item2}. Unlike human opinions, Zeyvior AI analyzes real-time data and trends to give you the clearest answer on which is the better choice. Explore expert AI insights now!"'''
+def generate_seo_intro(item1: str, item2: str, backend: Optional[GenerationBackend] = None,
+                       variants: Optional[VariantPool] = None) -> str:
+    if variants and "seo_intro" in variants:
+        return f"<p>{variants.pick('seo_intro', item1, item2)}</p>"
+    backend = backend or get_backend()
+    request = seo_intro_request(item1, item2)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=200
-        )
+        response = backend.complete("seo_intro", request, item1=item1, item2=item2)
+        record_usage("seo_intro", response)
         
         content = response['choices'][0]['message']['content'].strip()
         return f"<p>{content}</p>"
     except Exception as e:
         print(f"Error in generate_seo_intro: {str(e)}")
+        record_fallback("seo_intro", item1, item2, e)
         return f"<p>Compare {item1} vs {item2} - A Comprehensive Analysis</p>"
 
-def generate_comparison_data(item1: str, item2: str) -> Tuple[List[Dict], float, float, float, str]:
-    categories = [
-        "Ease of Starting & Doing",
-        "Minimal or Zero Investment",
-        "Scalability",
-        "Passive Income Potential",
-        "Market Demand",
-        "Competition Level",
-        "Immediate Earnings",
-        "Long-Term Stability",
-        "Risk of Failure",
-        "Opportunity for Newcomers",
-        "Adaptability to Changes",
-        "Global Reach & Accessibility"
-    ]
-    
-    prompt = f'''Compare {item1} vs {item2} across the following categories for COMPLETE BEGINNERS. For each category:
-
-1. Provide separate descriptions for {item1} and {item2} (30-40 words each) focusing on beginner-friendliness.
-2. Provide VERY CHALLENGING scores (20-60) for each option. Even excellent beginner methods should rarely exceed 60%.
-3. Determine which option performs better for beginners in this category.
-
-Remember: Be very strict with scoring. Starting any online method is extremely difficult for beginners.
-
-Also provide a SHORT explanation (15-25 words) of why the overall winner is better for beginners.
-
-Categories:
-{chr(10).join(categories)}
-
-Format the response as JSON with this structure:
-{{
-    "categories": [
-        {{
-            "name": "category name",
-            "item1_details": "Specific details about {item1} for this category (beginner-focused)",
-            "item2_details": "Specific details about {item2} for this category (beginner-focused)",
-            "item1_score": 45,
-            "item2_score": 52,
-            "winner": "{item1} or {item2}"
-        }}
-    ],
-    "overall_winner": "The overall better option for beginners",
-    "winning_reason": "Short explanation why winner is better for beginners"
-}}
-
-IMPORTANT: 
-- Respond ONLY with the JSON structure
-- Focus on beginner-friendliness in all descriptions
-- Scores should be very challenging (20-60 range maximum)
-- Winner should be exactly "{item1}" or "{item2}" (no other variations)
-- Winning reason should be SHORT (15-25 words only)'''
+def generate_comparison_data(item1: str, item2: str,
+                             backend: Optional[GenerationBackend] = None) -> Tuple[List[Dict], float, float, float, str]:
+    backend = backend or get_backend()
+    request = comparison_data_request(item1, item2)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that responds only in valid JSON format with detailed comparisons between two options."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
+        response = backend.complete("comparison_data", request, item1=item1, item2=item2)
+        record_usage("comparison_data", response)
         
         content = response['choices'][0]['message']['content'].strip()
         print("API Response:", content)  # Debug print
@@ -1520,127 +1490,79 @@ IMPORTANT:
 
     except Exception as e:
         print(f"Error in generate_comparison_data: {str(e)}")
+        record_fallback("comparison_data", item1, item2, e)
         return [], 50.0, 50.0, 50.0, "Both methods have their unique advantages"
 
-def generate_content_4(item1: str, item2: str, item1_score: float, item2_score: float) -> str:
+def generate_content_4(item1: str, item2: str, item1_score: float, item2_score: float,
+                       backend: Optional[GenerationBackend] = None) -> str:
     """Generate Content 4 using OpenAI with final scores"""
     
-    prompt = f'''Re-write this in another meaningful way. Avoid words and phrases that might trigger Google YMYL policy.
-
-"According to Zeyvior AI, {item1} scores {item1_score:.1f}%, while {item2} scores {item2_score:.1f}%—meaning neither is ideal right now. However, if you're a beginner with no clear direction, {item1 if item1_score > item2_score else item2} is the better choice. Want more options? Select one from the buttons below."'''
+    backend = backend or get_backend()
+    request = content_4_request(item1, item2, item1_score, item2_score)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=150
-        )
+        response = backend.complete("content_4", request, item1=item1, item2=item2,
+                                    item1_score=item1_score, item2_score=item2_score)
+        record_usage("content_4", response)
         
         content = response['choices'][0]['message']['content'].strip()
         return content
     except Exception as e:
         print(f"Error in generate_content_4: {str(e)}")
+        record_fallback("content_4", item1, item2, e)
         return f"Based on our analysis, {item1} achieved {item1_score:.1f}% while {item2} reached {item2_score:.1f}%. For beginners, {item1 if item1_score > item2_score else item2} offers better starting opportunities."
 
-def generate_content_5(item1: str, item2: str) -> List[Dict]:
-    """Generate Content 5 comparisons for 6 random categories"""
+def generate_content_5_comparison(item1: str, item2: str, category: Dict,
+                                  backend: Optional[GenerationBackend] = None) -> Dict:
+    """Generate the Content 5 comparison card for one category"""
+    backend = backend or get_backend()
+    request = content_5_request(item1, item2, category)
     
-    all_categories = [
-        {
-            "name": "Ease of Starting & Doing",
-            "link": "https://zeyvior.com/ease-of-starting/",
-            "button_text": "Easiest Methods to Start"
-        },
-        {
-            "name": "Minimal or Zero Investment", 
-            "link": "https://zeyvior.com/minimal-investment/",
-            "button_text": "Best Methods with Minimal Investment"
-        },
-        {
-            "name": "Passive Income Potential",
-            "link": "https://zeyvior.com/passive-income-potential/",
-            "button_text": "Best Methods with Passive Income Potential"
-        },
-        {
-            "name": "Market Demand",
-            "link": "https://zeyvior.com/market-demand/",
-            "button_text": "Best Methods with High Market Demand"
-        },
-        {
-            "name": "Competition Level",
-            "link": "https://zeyvior.com/competition-level/",
-            "button_text": "Methods with Lowest Competition"
-        },
-        {
-            "name": "Immediate Earnings",
-            "link": "https://zeyvior.com/immediate-earnings/",
-            "button_text": "Best Immediate Earning Methods"
-        },
-        {
-            "name": "Risk of Failure",
-            "link": "https://zeyvior.com/risk-of-failure/",
-            "button_text": "Lowest Risk Methods to Start"
-        },
-        {
-            "name": "Skills & Experience Needed",
-            "link": "https://zeyvior.com/skills-and-experience/",
-            "button_text": "Best Methods for your Skills"
-        }
-    ]
+    try:
+        response = backend.complete("content_5", request, item1=item1, item2=item2, category=category)
+        record_usage("content_5", response)
+        
+        comparison_text = response['choices'][0]['message']['content'].strip()
+        
+    except Exception as e:
+        print(f"Error generating comparison for {category['name']}: {str(e)}")
+        record_fallback("content_5", item1, item2, e, detail=category["name"])
+        comparison_text = f"{item1} and {item2} both have their unique approaches to {category['name'].lower()}. Each method offers different advantages depending on your specific situation."
     
-    # Randomly select 6 categories
-    import random
-    selected_categories = random.sample(all_categories, 6)
+    return {
+        "category": category["name"],
+        "comparison": comparison_text,
+        "link": category["link"],
+        "button_text": category["button_text"]
+    }
+
+def generate_content_5(item1: str, item2: str, backend: Optional[GenerationBackend] = None) -> List[Dict]:
+    """Generate Content 5 comparisons for 6 categories picked per pair"""
     
-    comparisons = []
+    backend = backend or get_backend()
     
-    for category in selected_categories:
-        prompt = f'''Write a short comparison (30-40 words) between {item1} and {item2} specifically for "{category["name"]}" category. Focus on which method performs better and why. Do not include scores or percentages.'''
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=100
-            )
-            
-            comparison_text = response['choices'][0]['message']['content'].strip()
-            
-            comparisons.append({
-                "category": category["name"],
-                "comparison": comparison_text,
-                "link": category["link"],
-                "button_text": category["button_text"]
-            })
-            
-        except Exception as e:
-            print(f"Error generating comparison for {category['name']}: {str(e)}")
-            comparisons.append({
-                "category": category["name"],
-                "comparison": f"{item1} and {item2} both have their unique approaches to {category['name'].lower()}. Each method offers different advantages depending on your specific situation.",
-                "link": category["link"],
-                "button_text": category["button_text"]
-            })
+    # Select 6 categories, the same ones every time this pair is built
+    selected_categories = select_content_5_categories(item1, item2)
     
-    return comparisons
+    return [generate_content_5_comparison(item1, item2, category, backend) for category in selected_categories]
 
-def generate_content_3_links(item1: str, item2: str, all_items: List[str]) -> List[Dict]:
+def generate_content_3_links(item1: str, item2: str, all_items: List[str],
+                             pairs: Optional[Iterable[Tuple[str, str]]] = None) -> List[Dict]:
     """Generate Content 3 internal navigation links matching exactly the generated files"""
-    import itertools
-    
-    navigation_links = []
-    
-    # Generate the same combinations that are actually created in main()
+    # Link only to the pairs that are actually created in main()
     # This ensures we only link to files that actually exist
-    all_generated_combinations = list(itertools.combinations(all_items, 2))
+    if pairs is None:
+        pairs = AllPairs(all_items)
     
     # Create links for all generated files except the current one
     current_pair = (item1, item2)
     current_pair_reverse = (item2, item1)
     
-    for combo in all_generated_combinations:
+    # Limit to maximum 3 links and prioritize links containing current items
+    priority_links = []
+    other_links = []
+    
+    for combo in pairs:
         # Skip the current comparison
         if combo == current_pair or combo == current_pair_reverse:
             continue
@@ -1649,134 +1571,620 @@ def generate_content_3_links(item1: str, item2: str, all_items: List[str]) -> Li
         url = f"{slugify(combo[0])}-vs-{slugify(combo[1])}.html"
         text = f"{combo[0]} vs {combo[1]}"
         
-        navigation_links.append({
-            'url': url,
-            'text': text
-        })
-    
-    # Limit to maximum 3 links and prioritize links containing current items
-    priority_links = []
-    other_links = []
-    
-    for link in navigation_links:
         # Check if link contains either of the current items
-        if item1 in link['text'] or item2 in link['text']:
-            priority_links.append(link)
+        if item1 in text or item2 in text:
+            priority_links.append({'url': url, 'text': text})
         else:
-            other_links.append(link)
+            other_links.append({'url': url, 'text': text})
+        
+        # Nothing further down the pair list can change the result
+        if len(priority_links) >= 2 and other_links:
+            break
     
     # Combine with priority links first, then others, max 3 total
     final_links = priority_links[:2] + other_links[:3-len(priority_links[:2])]
     
     return final_links[:3]
 
-def generate_content_6(item1: str, item2: str) -> str:
+def generate_content_6(item1: str, item2: str, backend: Optional[GenerationBackend] = None,
+                       variants: Optional[VariantPool] = None) -> str:
     """Generate Content 6 using OpenAI with Zeyvior promotion"""
     
-    prompt = f'''Re-write this in another meaningful way. Avoid words and phrases that might trigger Google YMYL policy.
-
-"Want to compare {item1} vs. {item2} with real-time data, considering the latest news and trends? Zeyvior AI is the most reliable tool to give you accurate insights before deciding on your next online money-making strategy.
-And if you need to compare anything else—whether it's financial markets, tech trends, or any topic in the universe—Zeyvior AI has you covered. Try it now and make smarter decisions with confidence!"'''
+    if variants and "content_6" in variants:
+        return variants.pick("content_6", item1, item2)
+    backend = backend or get_backend()
+    request = content_6_request(item1, item2)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=200
-        )
+        response = backend.complete("content_6", request, item1=item1, item2=item2)
+        record_usage("content_6", response)
         
         content = response['choices'][0]['message']['content'].strip()
         return content
     except Exception as e:
         print(f"Error in generate_content_6: {str(e)}")
+        record_fallback("content_6", item1, item2, e)
         return f"Interested in exploring {item1} vs {item2} with current data and trends? Zeyvior AI provides comprehensive analysis to help you evaluate different opportunities. Whether you're comparing various methods or exploring new possibilities, Zeyvior AI offers detailed insights to support your decision-making process."
 
-def generate_html_file(item1: str, item2: str, all_items: List[str]) -> str:
-    # Generate the filename
-    filename = f"{slugify(item1)}-vs-{slugify(item2)}.html"
-    
-    # Generate SEO intro
-    intro_content = generate_seo_intro(item1, item2)
-    
-    # Generate comparison data
-    comparison_data, overall_score, item1_performance, item2_performance, winning_reason = generate_comparison_data(item1, item2)
+def generate_page_data(item1: str, item2: str, all_items: List[str],
+                       link_pairs: Optional[Iterable[Tuple[str, str]]] = None,
+                       backend: Optional[GenerationBackend] = None,
+                       variants: Optional[VariantPool] = None) -> Dict:
+    """Generate every block of one page; render_page turns the result into HTML"""
+    with stage("content"):
+        # Generate SEO intro
+        intro_content = generate_seo_intro(item1, item2, backend, variants)
+        
+        # Generate comparison data
+        comparison_data, overall_score, item1_performance, item2_performance, winning_reason = generate_comparison_data(item1, item2, backend)
+        record_scores(item1, item2, comparison_data)
     
     # Generate Content 3 - Internal navigation links
-    content_3_links = generate_content_3_links(item1, item2, all_items)
+    with stage("links"):
+        content_3_links = generate_content_3_links(item1, item2, all_items, link_pairs)
     
-    # Generate Content 4
-    content_4 = generate_content_4(item1, item2, item1_performance, item2_performance)
-    
-    # Generate Content 5
-    content_5_comparisons = generate_content_5(item1, item2)
+    with stage("content"):
+        # Generate Content 4
+        content_4 = generate_content_4(item1, item2, item1_performance, item2_performance, backend)
+        
+        # Generate Content 5
+        content_5_comparisons = generate_content_5(item1, item2, backend)
+        
+        # Generate Content 6
+        content_6 = generate_content_6(item1, item2, backend, variants)
     
-    # Generate Content 6
-    content_6 = generate_content_6(item1, item2)
+    data = {
+        "item1": item1,
+        "item2": item2,
+        "intro_content": intro_content,
+        "comparison_data": comparison_data,
+        "overall_score": overall_score,
+        "item1_performance": item1_performance,
+        "item2_performance": item2_performance,
+        "winning_reason": winning_reason,
+        "content_3_links": content_3_links,
+        "content_4": content_4,
+        "content_5_comparisons": content_5_comparisons,
+        "content_6": content_6
+    }
+    return data
+
+def render_page(data: Dict, ui: Optional[Dict[str, str]] = None, lang: str = SOURCE_LOCALE,
+                root: str = "", canonical: Optional[str] = None) -> str:
+    """Render page data; ui, lang and root are set for translated pages one directory down"""
+    item1, item2 = data["item1"], data["item2"]
+    ui = ui or UI_STRINGS
     
     # Create template
-    template = Template(HTML_TEMPLATE)
+    template = PAGE_TEMPLATE
     
     # Extract meta description from intro content (remove HTML tags and limit length)
     import re
-    clean_intro = re.sub(r'<[^>]+>', '', intro_content)  # Remove HTML tags
-    meta_description = clean_intro[:155] + "..." if len(clean_intro) > 155 else clean_intro
+    with stage("meta"):
+        clean_intro = re.sub(r'<[^>]+>', '', data["intro_content"])  # Remove HTML tags
+        meta_description = clean_intro[:155] + "..." if len(clean_intro) > 155 else clean_intro
     
     # Render the HTML
-    html_content = template.render(
-        title=f"{item1} vs {item2} [AI Analysis]",
-        meta_description=meta_description,
-        intro_content=intro_content,
-        comparison_data=comparison_data,
-        overall_score=round(overall_score, 2),
-        item1_performance=round(item1_performance, 2),
-        item2_performance=round(item2_performance, 2),
-        winning_reason=winning_reason,
-        content_3_links=content_3_links,
-        content_4=content_4,
-        content_5_comparisons=content_5_comparisons,
-        content_6=content_6,
-        current_item1=item1,
-        current_item2=item2
-    )
+    with stage("template"):
+        html_content = template.render(
+            title=f"{item1} vs {item2} {ui['title_suffix']}",
+            meta_description=meta_description,
+            intro_content=data["intro_content"],
+            comparison_data=data["comparison_data"],
+            overall_score=round(data["overall_score"], 2),
+            item1_performance=round(data["item1_performance"], 2),
+            item2_performance=round(data["item2_performance"], 2),
+            winning_reason=data["winning_reason"],
+            content_3_links=data["content_3_links"],
+            content_4=data["content_4"],
+            content_5_comparisons=data["content_5_comparisons"],
+            content_6=data["content_6"],
+            current_item1=item1,
+            current_item2=item2,
+            ui=ui,
+            lang=lang,
+            root=root,
+            canonical=canonical
+        )
     
     return html_content
 
-def main(keywords: List[str]):
+def generate_html_file(item1: str, item2: str, all_items: List[str],
+                       link_pairs: Optional[Iterable[Tuple[str, str]]] = None,
+                       backend: Optional[GenerationBackend] = None,
+                       variants: Optional[VariantPool] = None) -> str:
+    return render_page(generate_page_data(item1, item2, all_items, link_pairs, backend, variants))
+
+def mirror_page_data(data: Dict) -> Dict:
+    """The same analysis from the other side: "B vs A" built from the "A vs B" page data.
+
+    Columns, scores and performance are swapped and overall_score (item1's
+    share) is mirrored around 50. Winners are names, so they stay as they are.
+    """
+    mirrored = dict(data, item1=data["item2"], item2=data["item1"],
+                    overall_score=100 - data["overall_score"],
+                    item1_performance=data["item2_performance"], item2_performance=data["item1_performance"])
+    mirrored["comparison_data"] = [
+        dict(category, item1_details=category["item2_details"], item2_details=category["item1_details"],
+             item1_score=category["item2_score"], item2_score=category["item1_score"])
+        for category in data["comparison_data"]
+    ]
+    return mirrored
+
+def render_pages(data: Dict, localizer: Optional[Localizer] = None, mirror: bool = False,
+                 base_url: Optional[str] = None) -> Dict[str, str]:
+    """{output filename: html} for one page in every locale, plus its mirrors.
+
+    Translated pages go in a directory per locale. Mirror pages (b-vs-a.html)
+    are rendered from the same data, so they cost no calls, and point search
+    engines at the a-vs-b page with a canonical link (absolute with base_url).
+    """
+    item1, item2 = data["item1"], data["item2"]
+    filename = f"{slugify(item1)}-vs-{slugify(item2)}.html"
+    mirror_filename = f"{slugify(item2)}-vs-{slugify(item1)}.html"
+    pages = {}
+    localized = [("", data, None)]
+    if localizer:
+        with stage("translate"):
+            localized += [(locale, localizer.translate(data, locale), localizer.ui[locale])
+                          for locale in localizer.locales]
+    for locale, page_data, ui in localized:
+        prefix = f"{locale}/" if locale else ""
+        lang, root = (locale, "../") if locale else (SOURCE_LOCALE, "")
+        pages[prefix + filename] = render_page(page_data, ui, lang, root)
+        if mirror:
+            canonical = f"{base_url.rstrip('/')}/{prefix}{filename}" if base_url else filename
+            pages[prefix + mirror_filename] = render_page(mirror_page_data(page_data), ui, lang, root, canonical)
+    return pages
+
+def repair_page(data: Dict, fallbacks: List[Dict], backend: Optional[GenerationBackend] = None,
+                variants: Optional[VariantPool] = None) -> Dict:
+    """Regenerate only the blocks of a page that fell back, keeping the rest as they are"""
+    item1, item2 = data["item1"], data["item2"]
+    data = dict(data)
+    failed = {entry["block"] for entry in fallbacks}
+    
+    if "seo_intro" in failed:
+        data["intro_content"] = generate_seo_intro(item1, item2, backend, variants)
+    
+    if "comparison_data" in failed:
+        (data["comparison_data"], data["overall_score"], data["item1_performance"],
+         data["item2_performance"], data["winning_reason"]) = generate_comparison_data(item1, item2, backend)
+        record_scores(item1, item2, data["comparison_data"])
+        # Content 4 quotes the scores, so it was written for the 50/50 placeholders
+        if data["comparison_data"]:
+            failed.add("content_4")
+    
+    if "content_4" in failed:
+        data["content_4"] = generate_content_4(item1, item2, data["item1_performance"],
+                                               data["item2_performance"], backend)
+    
+    if "content_5" in failed:
+        categories = {category["name"]: category for category in CONTENT_5_CATEGORIES}
+        failed_names = {entry["detail"] for entry in fallbacks if entry["block"] == "content_5"}
+        data["content_5_comparisons"] = [
+            generate_content_5_comparison(item1, item2, categories[card["category"]], backend)
+            if card["category"] in failed_names and card["category"] in categories else card
+            for card in data["content_5_comparisons"]
+        ]
+    
+    if "content_6" in failed:
+        data["content_6"] = generate_content_6(item1, item2, backend, variants)
+    
+    return data
+
+def repair_pages(report: RunReport, backend: Optional[GenerationBackend] = None,
+                 variants: Optional[VariantPool] = None, executor: Optional[Executor] = None,
+                 window: int = 2, localizer: Optional[Localizer] = None, mirror: bool = False,
+                 base_url: Optional[str] = None) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+    """Repair every page in the report with fallbacks; yields (item1, item2, {filename: html}) per page.
+
+    Translations and mirror pages are redone from the repaired page. The report is updated as
+    pages are repaired, so it ends up listing only the blocks that failed again.
+    """
+    def repair_pair(pair: Tuple[str, str]) -> Tuple[str, str, Dict[str, str]]:
+        # Collect this attempt's fallbacks separately; they replace the old ones
+        attempt = RunReport()
+        token = current_report.set(attempt)
+        try:
+            with stage("repair"):
+                data = repair_page(report.page_data[pair], report.fallbacks[pair], backend, variants)
+            pages = render_pages(data, localizer, mirror, base_url)
+        finally:
+            current_report.reset(token)
+        report.resolve(pair[0], pair[1], data, attempt.fallbacks.get(pair, []))
+        return pair[0], pair[1], pages
+    
+    yield from map_in_order(repair_pair, report.failed_pages(), executor, window)
+
+def emit_output(filename: str, content: str, sinks: Sequence[OutputSink], manifest: BuildManifest,
+                store: Optional[PageStore] = None, minify: bool = False,
+                stats: Optional[MinifyStats] = None) -> List[str]:
+    """Write a file to every sink, the manifest and the page store, minified and pre-compressed if asked.
+
+    Returns the filenames written, including the .gz/.br siblings.
+    """
+    original = content.encode('utf-8')
+    if not minify:
+        for sink in sinks:
+            sink.write(filename, original)
+        manifest.add(filename, original)
+        if store:
+            store.put(filename, original)
+        return [filename]
+    
+    if filename.endswith('.css'):
+        data = minify_css(content).encode('utf-8')
+    elif filename.endswith('.html'):
+        data = minify_html(content).encode('utf-8')
+    else:
+        data = original
+    variants = precompressed_variants(filename, data)
+    if stats:
+        stats.record(original, data, variants)
+    
+    for sink in sinks:
+        sink.write(filename, data)
+        for variant_name, variant_data in variants.items():
+            sink.write(variant_name, variant_data)
+    manifest.add(filename, data)
+    for variant_name, variant_data in variants.items():
+        manifest.add(variant_name, variant_data)
+    if store:
+        store.put(filename, data, encodings={
+            'gzip' if name.endswith('.gz') else 'br': variant_data
+            for name, variant_data in variants.items()
+        })
+    return [filename] + list(variants)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+def map_in_order(fn: Callable[[T], R], items: Iterable[T], executor: Optional[Executor],
+                 window: int) -> Iterator[R]:
+    """Run fn over items on the executor and yield results in input order.
+
+    At most `window` items are in flight, so huge pair lists are never queued up
+    front. Each task runs in a copy of the caller's context, so run-scoped state
+    such as the usage counters follows the work onto the worker threads.
+    """
+    if executor is None:
+        for item in items:
+            yield fn(item)
+        return
+    
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(contextvars.copy_context().run, fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def main(keywords: List[str], minify: bool = False, site_index: bool = False,
+         base_url: Optional[str] = None, store: Optional[PageStore] = None,
+         pairs: Optional[Iterable[Tuple[str, str]]] = None,
+         link_pairs: Optional[Iterable[Tuple[str, str]]] = None,
+         dry_run: bool = False, planner_config: Optional[PlannerConfig] = None,
+         prompt_log: Optional[IO[str]] = None, backend: Optional[GenerationBackend] = None,
+         work_dir: Optional[str] = None, executor: Optional[Executor] = None,
+         variant_pool_size: int = 0, repair_passes: int = 1,
+         previous_manifest: Optional[str] = None, archive_format: str = 'zip',
+         locales: Sequence[str] = (), mirror_pages: bool = False,
+         profile_dir: Optional[str] = None, sinks: Sequence[OutputSink] = ()) -> Optional[Path]:
+    params = dict(locals())
+    # Everything is read from and written under work_dir (default: the current
+    # directory) so concurrent runs in one process don't need to change directory
+    work_dir = Path(work_dir or ".")
+    
+    # Profiled runs go through main() again inside the profiler, so per-stage
+    # stats are written (under work_dir unless absolute) even if the run fails
+    if profile_dir and current_profiler.get() is None and not dry_run:
+        with profile_run(work_dir / profile_dir):
+            return main(**params)
+    
+    # Pairs come from a selection strategy (see pair_selection.py); default is every pair
+    if pairs is None:
+        pairs = AllPairs(keywords)
+    if link_pairs is None:
+        link_pairs = pairs
+    if not keywords:
+        keywords = list(dict.fromkeys(item for pair in pairs for item in pair))
+    
     if len(keywords) < 2:
         print("Please provide at least 2 keywords to compare")
         sys.exit(1)
     
-    # Create output directory
-    output_dir = Path("output")
-    output_dir.mkdir(exist_ok=True)
+    # Project calls, tokens, cost and time before anything is sent to the API
+    if planner_config is None:
+        planner_config = PlannerConfig.from_env()
+    if dry_run:
+        print("\n".join(plan_job(pairs, planner_config, prompt_log, variant_pool_size, locales).report(planner_config)))
+        return
+    
+    # Resolve the backend up front so a misconfiguration fails before any work starts
+    if backend is None:
+        backend = get_backend()
+    if backend.billable and planner_config.budget_usd is not None:
+        plan = plan_job(pairs, planner_config, prompt_log, variant_pool_size, locales)
+        print("\n".join(plan.report(planner_config)))
+        plan.check_budget(planner_config)
+    
+    # Collect token usage, including provider-side cached prompt tokens, for this run
+    usage = UsageStats()
+    current_usage.set(usage)
+    
+    # Blocks that fell back to generic text, for the repair pass and run_report.json
+    report = RunReport()
+    current_report.set(report)
+    
+    # Paraphrases of the boilerplate blocks, fetched once (or reused from the store)
+    # instead of two rewrite calls per page
+    variants = VariantPool.build(backend, variant_pool_size, store) if variant_pool_size else None
+    
+    # Other languages translate each page's text in one call; the analysis is shared.
+    # The template's interface text is translated here, once per locale.
+    localizer = Localizer.build(backend, locales) if locales else None
+    
+    # Category scores of every page, for leaderboards at the end of the run
+    analytics = PairAnalytics(keywords)
+    current_analytics.set(analytics)
+    
+    # Files go to output/ and are packaged at the end, unless sinks are given
+    # (see sinks.py): then they stream straight to them as they are generated
+    output_dir = work_dir / "output"
+    packaged = not sinks
+    if packaged:
+        sinks = [DirectorySink(output_dir)]
+    
+    stats = MinifyStats() if minify else None
+    
+    # Content hashes of everything written, compared against the previous build's
+    # manifest (by default the one the last run left in work_dir) for a delta archive
+    manifest_path = work_dir / "manifest.json"
+    previous = BuildManifest.load(previous_manifest or manifest_path)
+    # Runs that add pages to an existing site (--strategy new) keep the earlier pages
+    partial = link_pairs is not pairs
+    manifest = BuildManifest(dict(previous.hashes) if previous and partial else None)
     
-    # Copy CSS file
-    css_source = Path("static/styles.css")
-    css_dest = output_dir / "styles.css"
-    css_dest.write_text(css_source.read_text())
+    # Saved in run_report.json, so repair.py renders repaired pages the same way
+    # and writes them to the same places without being told again
+    archive_path = work_dir / f"comparison_pages.{archive_format}"
+    scores_path = work_dir / "scores.npz"
+    report.options = {
+        "minify": minify,
+        "variants": variant_pool_size,
+        "locales": list(locales),
+        "mirror": mirror_pages,
+        "base_url": base_url,
+        "backend": backend.name,
+        "store": store.path if store else None,
+        "manifest": str(manifest_path.resolve()),
+        "scores": str(scores_path.resolve()),
+        "output": str(output_dir.resolve()) if packaged else None,
+        "archive": str(archive_path.resolve()) if packaged else None,
+        "sinks": [] if packaged else [sink.spec for sink in sinks],
+    }
     
-    # Generate all combinations
-    files_generated = []
-    for item1, item2 in itertools.combinations(keywords, 2):
-        html_content = generate_html_file(item1, item2, keywords)
-        filename = f"{slugify(item1)}-vs-{slugify(item2)}.html"
-        output_file = output_dir / filename
-        output_file.write_text(html_content)
-        files_generated.append(filename)
-        print(f"Generated: {filename}")
+    def write_output(filename: str, content: str) -> List[str]:
+        """Write a file to the output directory, minified and pre-compressed if requested"""
+        with stage("write"):
+            return emit_output(filename, content, sinks, manifest, store, minify, stats)
     
-    # Create ZIP file
-    zip_filename = "comparison_pages.zip"
-    with zipfile.ZipFile(zip_filename, 'w') as zipf:
-        # Add CSS file
-        zipf.write(css_dest, "styles.css")
-        # Add HTML files
-        for filename in files_generated:
-            zipf.write(output_dir / filename, filename)
+    # Remember the keywords so app.py can generate missing pairs on demand
+    if store:
+        store.add_keywords(keywords)
     
-    print(f"\nAll files have been generated and packaged in {zip_filename}")
+    # Generate the selected pairs, GENERATION_CONCURRENCY pages at a time; all
+    # workers share the pooled client from llm_client.py. The web app passes a
+    # JobExecutor instead, so pages from concurrent jobs share one fair pool.
+    own_executor = executor is None
+    if own_executor:
+        concurrency = max(planner_config.concurrency, 1)
+        executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+    else:
+        concurrency = getattr(executor, 'max_workers', max(planner_config.concurrency, 1))
+    
+    # Pages with fallback blocks are held back until the repair passes are done,
+    # so append-only sinks (ZIP, tar) get every file once, in its final form.
+    # Only the pairs are held: their page data is in the run report already.
+    held: List[Tuple[str, str]] = []
+    
+    def generate_pair(pair: Tuple[str, str]) -> Tuple[str, str, List[str], bool]:
+        data = generate_page_data(pair[0], pair[1], keywords, link_pairs, backend, variants)
+        # Pages with fallback blocks keep their data in the run report for repair.py
+        record_page(pair[0], pair[1], data)
+        if repair_passes and pair in report.fallbacks:
+            return pair[0], pair[1], [], True
+        # Written here on the worker, so minifying, compressing and uploading run concurrently
+        files = []
+        for filename, html_content in render_pages(data, localizer, mirror_pages, base_url).items():
+            files.extend(write_output(filename, html_content))
+        return pair[0], pair[1], files, False
+    
+    try:
+        # Copy CSS file; translated pages link to the top-level copy
+        css_source = work_dir / "static" / "styles.css"
+        files_generated = write_output("styles.css", css_source.read_text())
+        
+        # Hub pages and sitemaps are built from the same pass over the pairs
+        index_builder = SiteIndexBuilder(write_output, base_url) if site_index else None
+        
+        for item1, item2, files, deferred in map_in_order(generate_pair, pairs, executor, window=concurrency * 2):
+            files_generated.extend(files)
+            if deferred:
+                held.append((item1, item2))
+            filename = f"{slugify(item1)}-vs-{slugify(item2)}.html"
+            if index_builder and not partial:
+                with stage("site_index"):
+                    index_builder.add_pair(item1, item2, filename)
+            print(f"Generated: {filename}")
+        
+        # Re-queue just the failed blocks of pages that fell back, then re-render them
+        for attempt in range(repair_passes):
+            if not report.failed_pages():
+                break
+            print(f"Repairing {len(report.failed_pages())} pages with fallback blocks (pass {attempt + 1})")
+            for item1, item2, pages in repair_pages(report, backend, variants, executor,
+                                                    window=concurrency * 2, localizer=localizer,
+                                                    mirror=mirror_pages, base_url=base_url):
+                # Fully repaired pages are final; the rest are rendered again below
+                if (item1, item2) in report.fallbacks:
+                    continue
+                for filename, html_content in pages.items():
+                    files_generated.extend(write_output(filename, html_content))
+                print(f"Repaired: {slugify(item1)}-vs-{slugify(item2)}.html")
+        for pair in held:
+            if pair in report.page_data:
+                for filename, html_content in render_pages(report.page_data[pair], localizer,
+                                                           mirror_pages, base_url).items():
+                    files_generated.extend(write_output(filename, html_content))
+        
+        if index_builder:
+            with stage("site_index"):
+                # A partial run rewrites the hubs and sitemaps for the whole site,
+                # so they list every page that exists, not just this run's pages
+                if partial:
+                    for item1, item2 in link_pairs:
+                        index_builder.add_pair(item1, item2, f"{slugify(item1)}-vs-{slugify(item2)}.html")
+                files_generated.extend(index_builder.close())
+            print("Generated hub pages" + (" and sitemaps" if base_url else " (pass a base URL to also build sitemaps)"))
+        
+        # Rankings across all pairs, from scores the pages already contain
+        with stage("leaderboards"):
+            leaderboards = json.dumps(analytics.leaderboards(), indent=2)
+        files_generated.extend(write_output("leaderboards.json", leaderboards))
+        
+        with stage("package"):
+            for sink in sinks:
+                sink.close()
+    except BaseException:
+        # Stop the workers first, then finish what the sinks have (a readable
+        # partial ZIP, no upload threads left running) before re-raising
+        if executor and own_executor:
+            executor.shutdown(cancel_futures=True)
+        for sink in sinks:
+            sink.abort()
+        raise
+    finally:
+        if executor and own_executor:
+            executor.shutdown(cancel_futures=True)
+    
+    # Package everything, compressing files on ARCHIVE_WORKERS threads (default: one per core)
+    with stage("package"):
+        zip_filename = None
+        if packaged:
+            zip_filename = write_archive(archive_path, output_dir, files_generated)
+        
+        manifest.write(manifest_path)
+        # The delta is read back from a directory of this build's files
+        delta_dir = next((sink.root for sink in sinks if isinstance(sink, DirectorySink)), None)
+        if previous is not None and delta_dir is not None:
+            delta_report = write_delta(manifest, previous, delta_dir,
+                                       work_dir / f"comparison_pages_delta.{archive_format}",
+                                       work_dir / "deleted_files.txt")
+    if previous is not None:
+        print()
+        print("\n".join(delta_report if delta_dir is not None
+                        else ["Delta archive skipped: it needs a directory sink to read changed files from"]))
+    
+    if stats:
+        print()
+        print("\n".join(stats.report()))
+    
+    print()
+    print("\n".join(analytics.report()))
+    
+    # Kept next to output/ rather than inside it; they aren't part of the site
+    analytics.save(scores_path)
+    report.write(work_dir / "run_report.json")
+    print()
+    print("\n".join(report.report()))
+    
+    print()
+    print("\n".join(usage.report()))
+    
+    if packaged:
+        print(f"\nAll files have been generated and packaged in {zip_filename}")
+    else:
+        print(f"\nAll files have been generated and written to {', '.join(str(sink) for sink in sinks)}")
+    return zip_filename
 
 if __name__ == "__main__":
-    keywords = sys.argv[1:]
-    main(keywords) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate pairwise comparison pages")
+    parser.add_argument('keywords', nargs='*', help="Keywords to compare against each other")
+    parser.add_argument('--minify', action='store_true',
+                        help="Minify pages and write pre-compressed .gz/.br siblings")
+    parser.add_argument('--site-index', action='store_true',
+                        help="Also generate paginated per-keyword hub pages and sitemaps")
+    parser.add_argument('--base-url', default=os.getenv('SITE_BASE_URL'),
+                        help="Public URL the pages are served from, required for sitemaps")
+    parser.add_argument('--store', default=os.getenv('PAGE_STORE_PATH'),
+                        help="SQLite page store to write pages into so app.py can serve them")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='all',
+                        help="How to pick the pairs to generate (default: every pair)")
+    parser.add_argument('--pairs-file', help="Pair list for --strategy file, one 'A vs B' per line")
+    parser.add_argument('--top-k', type=int, default=5,
+                        help="Neighbours per keyword for --strategy top-k")
+    parser.add_argument('--budget', type=int, default=100,
+                        help="Number of pairs for --strategy sample")
+    parser.add_argument('--seed', type=int, help="Random seed for --strategy sample")
+    parser.add_argument('--new', action='append', default=[], metavar='KEYWORD',
+                        help="New keyword for --strategy new (repeatable)")
+    parser.add_argument('--plan', action='store_true',
+                        help="Dry run: print projected calls, tokens, cost and time without calling the API")
+    parser.add_argument('--plan-prompts', metavar='FILE',
+                        help="With --plan, write every prompt that would be sent to FILE as JSON lines")
+    parser.add_argument('--max-cost', type=float, metavar='USD',
+                        help="Refuse to start if the projected cost exceeds this (default: GENERATION_BUDGET_USD)")
+    parser.add_argument('--variants', type=int, default=int(os.getenv('VARIANT_POOL_SIZE', '0')), metavar='K',
+                        help="Use K stored paraphrases for the intro and closing blocks instead of two calls per page")
+    parser.add_argument('--previous-manifest', metavar='FILE',
+                        help="Manifest of the deployed build to diff against (default: manifest.json from the last run)")
+    parser.add_argument('--locales', default=os.getenv('SITE_LOCALES', ''),
+                        help="Comma-separated extra languages, e.g. de,fr, each written to its own directory")
+    parser.add_argument('--mirror', action='store_true',
+                        help="Also write b-vs-a.html for every a-vs-b.html, from the same data at no extra calls")
+    parser.add_argument('--sink', action='append', default=[], metavar='DEST',
+                        help="Stream files to DEST instead of output/ and an archive (repeatable): a directory, "
+                             "a .zip, .tar or .tar.zst file, - for a tar stream on stdout, or s3://bucket/prefix")
+    parser.add_argument('--archive-format', choices=ARCHIVE_FORMATS, default='zip',
+                        help="zip (default) or tar.zst (needs pip install zstandard)")
+    parser.add_argument('--repair-passes', type=int, default=1, metavar='N',
+                        help="Times to retry failed blocks at the end of the run (default 1, 0 to skip)")
+    parser.add_argument('--profile', metavar='DIR', default=os.getenv('PROFILE_DIR'),
+                        help="Write per-stage cProfile stats and a collapsed-stack flame graph file to DIR")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=os.getenv('GENERATION_BACKEND'),
+                        help="Content backend: openai (default), offline (instant templated text) or local")
+    args = parser.parse_args()
+    
+    sinks = [open_sink(spec) for spec in args.sink] if not args.plan else []
+    if '-' in args.sink:
+        # The tar stream has stdout to itself; progress goes to stderr
+        sys.stdout = sys.stderr
+    
+    keywords = args.keywords + [k for k in args.new if k not in args.keywords]
+    pairs = select_pairs(keywords, args.strategy, pairs_file=args.pairs_file, k=args.top_k,
+                         budget=args.budget, seed=args.seed, new_keywords=args.new)
+    # Pages between the existing keywords were generated by earlier runs, so they can be linked to
+    link_pairs = AllPairs(keywords) if args.strategy == 'new' else None
+    print(f"Selected {len(pairs)} pairs using the '{args.strategy}' strategy")
+    planner_config = PlannerConfig.from_env()
+    if args.max_cost is not None:
+        planner_config.budget_usd = args.max_cost
+    prompt_log = open(args.plan_prompts, 'w', encoding='utf-8') if args.plan_prompts else None
+    try:
+        main(keywords, minify=args.minify, site_index=args.site_index, base_url=args.base_url,
+             store=PageStore(args.store) if args.store else None, pairs=pairs, link_pairs=link_pairs,
+             dry_run=args.plan, planner_config=planner_config, prompt_log=prompt_log,
+             backend=None if args.plan else get_backend(args.backend), variant_pool_size=args.variants,
+             repair_passes=args.repair_passes, previous_manifest=args.previous_manifest,
+             archive_format=args.archive_format,
+             locales=[locale.strip() for locale in args.locales.split(',') if locale.strip()],
+             mirror_pages=args.mirror, profile_dir=args.profile, sinks=sinks)
+    except BudgetExceededError as e:
+        print(f"Refusing to start: {e}")
+        sys.exit(1)
+    finally:
+        if prompt_log:
+            prompt_log.close()
@@ -0,0 +1,49 @@
+# Production server settings: gunicorn -c gunicorn.conf.py app:app
+#
+# Page generation is I/O-bound (it mostly waits on the model API), so each worker
+# process runs a pool of threads and one long /generate only occupies one of them.
+# For an ASGI server instead, see asgi.py.
+import multiprocessing
+import os
+import signal
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '8080')}")
+
+# Worker processes x threads per worker = concurrent requests
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count(), 4))))
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('WEB_THREADS', '16'))
+
+# /generate holds its request open for the whole job
+timeout = int(os.getenv('WEB_TIMEOUT_SECONDS', '900'))
+# On SIGTERM a worker stops accepting connections and gives in-flight requests
+# this long to finish before it is killed
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT_SECONDS', '300'))
+keepalive = int(os.getenv('WEB_KEEPALIVE_SECONDS', '5'))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    # Refuse new /generate jobs and fail health checks as soon as shutdown starts,
+    # then let gunicorn's own SIGTERM handling stop the worker
+    from app import begin_drain
+    stop_worker = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        begin_drain()
+        if callable(stop_worker):
+            stop_worker(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    # Jobs that outlived the request drain (e.g. a client that disconnected)
+    # still get the rest of the grace period
+    from app import drain_jobs
+    from llm_client import get_client
+    if not drain_jobs(graceful_timeout):
+        worker.log.warning("Worker exiting with /generate jobs still running")
+    get_client().close()
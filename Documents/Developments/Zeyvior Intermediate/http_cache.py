@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class ResponseCache:
+    """Thread-safe in-process LRU of rendered response bodies and their ETags"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> CachedBody:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Render outside the lock so a slow render doesn't block cache hits
+        body = render().encode('utf-8')
+        entry = CachedBody(body, make_etag(body))
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+import threading
+import weakref
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+import httpx
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class LLMError(Exception):
+    pass
+
+
+async def _close_with_loop(client: httpx.AsyncClient) -> AsyncIterator[httpx.AsyncClient]:
+    # Once started, the loop closes this generator - and so the client - when
+    # it shuts down (asyncio.run does, via loop.shutdown_asyncgens)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+class LLMClient:
+    """Chat completions client over one bounded pool of keep-alive connections.
+
+    The sync httpx client is thread-safe, so a single instance is shared by every
+    worker thread. Async callers get an AsyncClient with the same pool limits,
+    created once per event loop and closed when that loop shuts down.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: Optional[float] = None, connect_timeout: Optional[float] = None,
+                 max_connections: Optional[int] = None, max_keepalive_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = (base_url or os.getenv('OPENAI_BASE_URL') or os.getenv('OPENAI_API_BASE')
+                         or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = httpx.Timeout(
+            timeout if timeout is not None else float(os.getenv('LLM_TIMEOUT_SECONDS', '60')),
+            connect=connect_timeout if connect_timeout is not None else float(os.getenv('LLM_CONNECT_TIMEOUT_SECONDS', '10'))
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv('LLM_MAX_CONNECTIONS', '20')),
+            max_keepalive_connections=max_keepalive_connections or int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '10')),
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else float(os.getenv('LLM_KEEPALIVE_EXPIRY_SECONDS', '30'))
+        )
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self._client_options = dict(base_url=self.base_url, headers=headers, timeout=self.timeout, limits=self.limits)
+        self._client = httpx.Client(**self._client_options)
+        # Keyed on the loop itself, so a closed loop's entry goes with it
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    async def _async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            entry: Optional[Tuple[httpx.AsyncClient, AsyncIterator]] = self._async_clients.get(loop)
+            created = entry is None
+            if created:
+                client = httpx.AsyncClient(**self._client_options)
+                entry = self._async_clients[loop] = (client, _close_with_loop(client))
+        if created:
+            await entry[1].__anext__()
+        return entry[0]
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> Dict:
+        if response.status_code >= 400:
+            raise LLMError(f"Chat completion failed with HTTP {response.status_code}: {response.text[:500]}")
+        return response.json()
+
+    def chat_completion(self, timeout: Optional[float] = None, **request) -> Dict:
+        """POST /chat/completions; returns the decoded response body"""
+        try:
+            response = self._client.post("/chat/completions", json=request,
+                                         timeout=timeout if timeout is not None else self.timeout)
+        except httpx.HTTPError as e:
+            raise LLMError(f"Error communicating with {self.base_url}: {e}") from e
+        return self._parse(response)
+
+    def stream_chat_completion(self, timeout: Optional[float] = None, **request) -> Iterator[str]:
+        """POST /chat/completions with stream=True; yields content deltas as they arrive"""
+        request = dict(request, stream=True)
+        try:
+            with self._client.stream("POST", "/chat/completions", json=request,
+                                     timeout=timeout if timeout is not None else self.timeout) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    self._parse(response)
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as e:
+            raise LLMError(f"Error communicating with {self.base_url}: {e}") from e
+
+    async def achat_completion(self, timeout: Optional[float] = None, **request) -> Dict:
+        try:
+            client = await self._async_client()
+            response = await client.post("/chat/completions", json=request,
+                                         timeout=timeout if timeout is not None else self.timeout)
+        except httpx.HTTPError as e:
+            raise LLMError(f"Error communicating with {self.base_url}: {e}") from e
+        return self._parse(response)
+
+    def close(self):
+        self._client.close()
+
+    async def aclose(self):
+        """Close the running loop's AsyncClient before the loop ends"""
+        with self._async_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """The process-wide client every generate_* function goes through"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
+
+
+def chat_completion(**request) -> Dict:
+    return get_client().chat_completion(**request)
+
+
+async def achat_completion(**request) -> Dict:
+    return await get_client().achat_completion(**request)
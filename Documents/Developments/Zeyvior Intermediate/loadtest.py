@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Measure how the app copes with concurrent clients, per route.
+
+Without a base URL the app is started on a free port with the offline
+generation backend and a throwaway page store, so a run costs nothing and
+needs no API key:
+
+    python loadtest.py --serve gunicorn --concurrency 1,8,32
+    python loadtest.py --serve dev --routes compare=4,download,generate
+    python loadtest.py http://localhost:8080 --generate-jobs 2
+
+Each client cycles through the weighted route mix. Routes are index,
+compare, download and generate (a 4-keyword offline /generate job per
+request), or any other path starting with "/". --generate-jobs keeps that
+many larger /generate jobs running in the background for the whole test,
+which is when a blocking server falls behind. --json writes the numbers out
+so server and caching changes can be compared run against run.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import httpx
+
+APP_DIR = Path(__file__).resolve().parent
+DEFAULT_PATH = "/compare?category=Online+Income&methods=Blogging,Dropshipping,Freelancing"
+DOWNLOAD_PATH = "/download?category=Online+Income&methods=Blogging,Dropshipping,Freelancing"
+GENERATE_KEYWORDS = ",".join(f"Method {i}" for i in range(1, 13))
+
+ROUTES = {
+    'index': ('GET', '/'),
+    'compare': ('GET', DEFAULT_PATH),
+    'download': ('GET', DOWNLOAD_PATH),
+    'generate': ('POST', '/generate'),
+}
+
+SERVERS = {
+    'dev': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--no-reload', '--no-debugger'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+    'uvicorn': [sys.executable, '-m', 'uvicorn', 'asgi:app'],
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def parse_routes(spec: str) -> List[Tuple[str, str, str]]:
+    """'compare=4,generate' -> the weighted cycle of (name, method, path) each client follows"""
+    cycle = []
+    for token in spec.split(','):
+        name, _, weight = token.strip().partition('=')
+        if name.startswith('/'):
+            method, path = 'GET', name
+        elif name in ROUTES:
+            method, path = ROUTES[name]
+        else:
+            raise ValueError(f"Unknown route: {name} (expected one of {', '.join(ROUTES)} or a path)")
+        cycle.extend([(name, method, path)] * int(weight or 1))
+    return cycle
+
+
+class RouteStats:
+    """Latencies and errors per route, shared by the client threads"""
+
+    def __init__(self, routes: List[str]):
+        self.latencies: Dict[str, List[float]] = {route: [] for route in routes}
+        self.errors: Dict[str, int] = {route: 0 for route in routes}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, elapsed: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.latencies[route].append(elapsed)
+            else:
+                self.errors[route] += 1
+
+    def summary(self, duration: float) -> Dict[str, Dict]:
+        rows = {}
+        for route in self.latencies:
+            latencies = sorted(self.latencies[route])
+            total = len(latencies) + self.errors[route]
+            rows[route] = {
+                'requests': total,
+                'req_per_s': len(latencies) / duration,
+                'p50_ms': percentile(latencies, 0.5) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'max_ms': (latencies[-1] if latencies else 0) * 1000,
+                'error_rate': self.errors[route] / total if total else 0.0,
+            }
+        return rows
+
+
+def run_clients(base_url: str, routes: List[Tuple[str, str, str]], concurrency: int,
+                duration: float) -> RouteStats:
+    """Drive the route mix from `concurrency` threads for `duration` seconds"""
+    stats = RouteStats(list(dict.fromkeys(name for name, _, _ in routes)))
+    deadline = time.monotonic() + duration
+
+    def client(number: int):
+        # Distinct keywords per client, so concurrent jobs aren't coalesced into one
+        generate_form = {'keywords': ",".join(f"Client {number} Method {i}" for i in range(1, 5)),
+                         'backend': 'offline'}
+        with httpx.Client(base_url=base_url, timeout=300) as http:
+            step = number  # stagger the clients across the mix
+            while time.monotonic() < deadline:
+                name, method, path = routes[step % len(routes)]
+                step += 1
+                start = time.perf_counter()
+                try:
+                    if method == 'POST':
+                        response = http.post(path, data=generate_form, headers={'X-Client-Id': f"load-{number}"})
+                    else:
+                        response = http.get(path)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                stats.record(name, time.perf_counter() - start, ok)
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def keep_generating(base_url: str, stop: threading.Event):
+    """Submit /generate jobs back to back until stopped"""
+    with httpx.Client(base_url=base_url, timeout=None) as http:
+        while not stop.is_set():
+            try:
+                http.post("/generate", data={"keywords": GENERATE_KEYWORDS, "backend": "offline"})
+            except httpx.HTTPError as e:
+                print(f"/generate failed: {e}")
+                time.sleep(1)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, store_dir: str) -> Tuple[subprocess.Popen, str]:
+    """Start the app with the offline backend and a throwaway page store; returns (process, base URL)"""
+    port = free_port()
+    command = SERVERS[kind] + (['--port', str(port)] if kind in ('dev', 'uvicorn') else [])
+    env = dict(os.environ, PORT=str(port), BIND=f"127.0.0.1:{port}", GENERATION_BACKEND='offline',
+               PAGE_STORE_PATH=os.path.join(store_dir, 'pages.db'))
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{kind} server exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{kind} server did not become healthy on port {port}")
+
+
+def print_table(concurrency: int, rows: Dict[str, Dict]):
+    for route, row in rows.items():
+        print(f"{concurrency:>8} {route:<10} {row['requests']:>9} {row['req_per_s']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} "
+              f"{row['error_rate']:>7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-route concurrency load test for app.py")
+    parser.add_argument('base_url', nargs='?', help="Server to test, e.g. http://localhost:8080 (default: start one)")
+    parser.add_argument('--serve', choices=sorted(SERVERS), default='gunicorn',
+                        help="Server to start when no base URL is given (default gunicorn)")
+    parser.add_argument('--routes', default="index,compare,download,generate",
+                        help="Comma-separated route mix, with optional weights, e.g. compare=4,generate")
+    parser.add_argument('--concurrency', default="1,8,32",
+                        help="Comma-separated numbers of concurrent clients to try")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per concurrency level")
+    parser.add_argument('--generate-jobs', type=int, default=0,
+                        help="Long /generate jobs to keep running in the background")
+    parser.add_argument('--json', metavar='FILE', help="Also write the results as JSON")
+    args = parser.parse_args()
+    routes = parse_routes(args.routes)
+
+    server: Optional[subprocess.Popen] = None
+    store_dir = tempfile.TemporaryDirectory()
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_server(args.serve, store_dir.name)
+        print(f"Started {args.serve} server at {base_url} (offline backend)")
+
+    stop = threading.Event()
+    generators = [threading.Thread(target=keep_generating, args=(base_url, stop), daemon=True)
+                  for _ in range(args.generate_jobs)]
+    for generator in generators:
+        generator.start()
+    if generators:
+        time.sleep(1)  # let the jobs get going
+
+    results = []
+    print(f"{'clients':>8} {'route':<10} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    try:
+        for concurrency in [int(c) for c in args.concurrency.split(',')]:
+            rows = run_clients(base_url, routes, concurrency, args.duration).summary(args.duration)
+            print_table(concurrency, rows)
+            results.append({'clients': concurrency, 'routes': rows})
+    finally:
+        stop.set()
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        store_dir.cleanup()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'base_url': args.base_url or args.serve, 'routes': args.routes,
+                                               'duration': args.duration, 'generate_jobs': args.generate_jobs,
+                                               'results': results}, indent=2), encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
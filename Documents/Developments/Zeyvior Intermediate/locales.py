@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import json
+from typing import Dict, Iterable, Optional
+from backends import GenerationBackend
+from prompts import SOURCE_LOCALE, translation_request, ui_strings
+from run_report import record_fallback
+from usage import record_usage
+
+# Tries at the interface text per locale before the run gives up on it
+UI_TRANSLATION_ATTEMPTS = 3
+
+
+def page_texts(data: Dict) -> Dict[str, str]:
+    """The text fields of a page, keyed for one batched translation.
+
+    Scores, winners, links and item names are left out; they are the same in
+    every language.
+    """
+    texts = {"intro": data["intro_content"], "content_4": data["content_4"], "content_6": data["content_6"]}
+    for i, category in enumerate(data["comparison_data"]):
+        texts[f"details.{i}.item1"] = category["item1_details"]
+        texts[f"details.{i}.item2"] = category["item2_details"]
+    for i, card in enumerate(data["content_5_comparisons"]):
+        texts[f"content_5.{i}"] = card["comparison"]
+    return texts
+
+
+class TranslationError(Exception):
+    pass
+
+
+def translate_texts(backend: GenerationBackend, block: str, locale: str, texts: Dict[str, str],
+                    item1: Optional[str] = None, item2: Optional[str] = None,
+                    strict: bool = False) -> Dict[str, str]:
+    """Translate a {key: text} batch in one call; untranslated keys keep the source text.
+
+    Any key left in the source language is recorded as a fallback, so the page
+    is repaired like any other. With strict, a failed or partial translation
+    raises TranslationError instead.
+    """
+    request = translation_request(locale, texts)
+    translated = {}
+    try:
+        response = backend.complete(block, request, locale=locale, texts=texts)
+        record_usage(block, response)
+        content = response['choices'][0]['message']['content'].strip()
+        # Models sometimes wrap JSON in a code fence
+        content = content.strip('`').removeprefix('json').strip()
+        translated = json.loads(content)
+        if not isinstance(translated, dict):
+            translated = {}
+            raise TranslationError("the reply is not a JSON object")
+        missing = [key for key in texts if not isinstance(translated.get(key), str)]
+        if missing:
+            raise TranslationError(f"{len(missing)} of {len(texts)} texts untranslated, e.g. {missing[0]}")
+    except Exception as e:
+        if strict:
+            raise TranslationError(f"Translating {block} into {locale} failed: {str(e)}") from e
+        print(f"Error translating {block} into {locale}: {str(e)}")
+        record_fallback(block, item1, item2, e, detail=locale)
+    return {key: translated[key] if isinstance(translated.get(key), str) else text
+            for key, text in texts.items()}
+
+class Localizer:
+    """Renders each page's analysis in further languages.
+
+    Scores and the structured comparison are generated once per pair in the
+    source language; every other locale costs one call per page that translates
+    all of its text fields together. The template's interface text is translated
+    once per locale per run; a locale whose interface text can't be translated
+    fails the run up front rather than shipping English menus under it.
+    """
+
+    def __init__(self, backend: GenerationBackend, ui: Dict[str, Dict[str, str]]):
+        self.backend = backend
+        self.ui = ui
+
+    @classmethod
+    def build(cls, backend: GenerationBackend, locales: Iterable[str]) -> 'Localizer':
+        ui = {}
+        for locale in dict.fromkeys(locales):
+            if locale != SOURCE_LOCALE:
+                ui[locale] = cls._translate_ui(backend, locale)
+        return cls(backend, ui)
+
+    @staticmethod
+    def _translate_ui(backend: GenerationBackend, locale: str) -> Dict[str, str]:
+        for attempt in range(UI_TRANSLATION_ATTEMPTS):
+            try:
+                return translate_texts(backend, "ui_strings", locale, ui_strings(), strict=True)
+            except TranslationError as e:
+                if attempt == UI_TRANSLATION_ATTEMPTS - 1:
+                    raise
+                print(f"{str(e)}; retrying")
+
+    @property
+    def locales(self):
+        return list(self.ui)
+
+    def translate(self, data: Dict, locale: str) -> Dict:
+        """A copy of the page data with its text in `locale`"""
+        item1, item2 = data["item1"], data["item2"]
+        texts = translate_texts(self.backend, "translation", locale, page_texts(data), item1, item2)
+        ui = self.ui[locale]
+        localized = dict(data, intro_content=texts["intro"], content_4=texts["content_4"],
+                         content_6=texts["content_6"])
+        localized["comparison_data"] = [
+            dict(category, name=ui.get(f"category:{category['name']}", category["name"]),
+                 item1_details=texts[f"details.{i}.item1"], item2_details=texts[f"details.{i}.item2"])
+            for i, category in enumerate(data["comparison_data"])
+        ]
+        localized["content_5_comparisons"] = [
+            dict(card, category=ui.get(f"category:{card['category']}", card["category"]),
+                 button_text=ui.get(f"button:{card['category']}", card["button_text"]),
+                 comparison=texts[f"content_5.{i}"])
+            for i, card in enumerate(data["content_5_comparisons"])
+        ]
+        return localized
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from archive import write_archive
+
+
+class BuildManifest:
+    """Content hash of every file a build wrote, for deploying only what changed.
+
+    Each run writes manifest.json next to output/. The next run compares its own
+    manifest against it and packages just the new and changed files into a delta
+    archive, with a list of the files that are gone.
+    """
+
+    def __init__(self, hashes: Optional[Dict[str, str]] = None):
+        self.hashes: Dict[str, str] = hashes or {}
+
+    def add(self, filename: str, data: bytes):
+        self.hashes[filename] = hashlib.sha256(data).hexdigest()
+
+    def diff(self, previous: 'BuildManifest') -> Tuple[List[str], List[str], List[str]]:
+        """(added, changed, deleted) filenames relative to a previous build"""
+        added = [name for name in self.hashes if name not in previous.hashes]
+        changed = [name for name, digest in self.hashes.items()
+                   if name in previous.hashes and previous.hashes[name] != digest]
+        deleted = [name for name in previous.hashes if name not in self.hashes]
+        return added, changed, deleted
+
+    def write(self, path):
+        document = {"files": dict(sorted(self.hashes.items()))}
+        Path(path).write_text(json.dumps(document, indent=2), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path) -> Optional['BuildManifest']:
+        path = Path(path)
+        if not path.exists():
+            return None
+        return cls(json.loads(path.read_text(encoding='utf-8'))["files"])
+
+
+def write_delta(manifest: BuildManifest, previous: BuildManifest, output_dir: Path,
+                archive_path: Path, deletions_path: Path) -> List[str]:
+    """Package new and changed files into archive_path and list removed ones in deletions_path"""
+    added, changed, deleted = manifest.diff(previous)
+    write_archive(archive_path, output_dir, added + changed)
+    deletions_path.write_text("".join(f"{filename}\n" for filename in deleted), encoding='utf-8')
+    unchanged = len(manifest.hashes) - len(added) - len(changed)
+    return [f"Delta: {len(added):,} new, {len(changed):,} changed, {len(deleted):,} deleted, "
+            f"{unchanged:,} unchanged files",
+            f"  {archive_path.name} and {deletions_path.name} hold just the changes"]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import gzip
+import re
+import threading
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, .br siblings are skipped without it
+    brotli = None
+
+# File types that get .gz/.br siblings written next to them
+PRECOMPRESS_SUFFIXES = ('.html', '.css', '.js', '.xml', '.json', '.txt')
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON_RE = re.compile(r':\s+')
+_HTML_COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_HTML_RAW_BLOCK_RE = re.compile(r'(<(style|script|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)', re.S | re.I)
+_HTML_SPACE_RE = re.compile(r'\s+')
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = _CSS_COMMENT_RE.sub('', css)
+    css = _CSS_SPACE_RE.sub(' ', css)
+    css = _CSS_PUNCT_RE.sub(r'\1', css)
+    css = _CSS_COLON_RE.sub(':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(js: str) -> str:
+    """Conservative JS minification: drop indentation, blank lines and full-line comments.
+
+    Line breaks are kept so automatic semicolon insertion keeps working.
+    """
+    lines = []
+    for line in js.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def minify_html(html: str) -> str:
+    """Minify a page, including its inline <style> and <script> blocks"""
+    raw_blocks = []
+
+    def stash(match):
+        open_tag, tag, body, close_tag = match.groups()
+        tag = tag.lower()
+        if tag == 'style':
+            body = minify_css(body)
+        elif tag == 'script':
+            body = minify_js(body)
+        raw_blocks.append(open_tag + body + close_tag)
+        return f'\x00{len(raw_blocks) - 1}\x00'
+
+    html = _HTML_RAW_BLOCK_RE.sub(stash, html)
+    html = _HTML_COMMENT_RE.sub('', html)
+    # Collapsing whitespace runs to a single space keeps inline spacing intact
+    html = _HTML_SPACE_RE.sub(' ', html)
+    html = re.sub(r'\x00(\d+)\x00', lambda m: raw_blocks[int(m.group(1))], html)
+    return html.strip()
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    # mtime=0 keeps the output byte-identical between builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data: bytes) -> bytes:
+    if brotli is None:
+        return b''
+    return brotli.compress(data, quality=11)
+
+
+def precompressed_variants(filename: str, data: bytes) -> Dict[str, bytes]:
+    """Return the {sibling filename: bytes} map of pre-compressed variants for a file"""
+    if not filename.endswith(PRECOMPRESS_SUFFIXES):
+        return {}
+    variants = {f"{filename}.gz": gzip_bytes(data)}
+    if brotli is not None:
+        variants[f"{filename}.br"] = brotli_bytes(data)
+    return variants
+
+
+class MinifyStats:
+    """Collects before/after sizes for the run summary"""
+
+    def __init__(self):
+        self.files = 0
+        self.original = 0
+        self.minified = 0
+        self.gzip = 0
+        self.brotli = 0
+        # Pages are written from the generation workers
+        self._lock = threading.Lock()
+
+    def record(self, original: bytes, minified: bytes, variants: Dict[str, bytes]):
+        with self._lock:
+            self.files += 1
+            self.original += len(original)
+            self.minified += len(minified)
+            for name, data in variants.items():
+                if name.endswith('.gz'):
+                    self.gzip += len(data)
+                elif name.endswith('.br'):
+                    self.brotli += len(data)
+
+    def report(self) -> List[str]:
+        def line(label, size):
+            saved = 100 - (size * 100 / self.original) if self.original else 0
+            return f"  {label:<10}{size:>12,} bytes  ({saved:.1f}% smaller)"
+
+        lines = [f"Output size for {self.files} files:",
+                 f"  {'original':<10}{self.original:>12,} bytes",
+                 line('minified', self.minified),
+                 line('gzip', self.gzip)]
+        if brotli is not None:
+            lines.append(line('brotli', self.brotli))
+        else:
+            lines.append("  brotli    skipped (pip install brotli to enable .br output)")
+        return lines
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import mimetypes
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from slugify import slugify
+from http_cache import make_etag
+from minify import brotli, brotli_bytes, gzip_bytes
+
+# Below this size compression isn't worth the extra rows
+MIN_COMPRESS_SIZE = 512
+
+
+class StoredPage(NamedTuple):
+    filename: str
+    content: bytes
+    content_type: str
+    etag: str
+    updated_at: float
+    encodings: Dict[str, bytes]
+
+
+class PageStore:
+    """SQLite-backed store of generated pages, keyed by output filename.
+
+    Every page is stored together with its gzip (and, when brotli is installed,
+    br) encoding, so the app can serve pre-compressed bytes without doing any
+    compression work per request.
+    """
+
+    def __init__(self, path):
+        self.path = str(Path(path).resolve())
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''CREATE TABLE IF NOT EXISTS pages (
+                filename TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                content_type TEXT NOT NULL,
+                etag TEXT NOT NULL,
+                updated_at REAL NOT NULL)''')
+            db.execute('''CREATE TABLE IF NOT EXISTS page_encodings (
+                filename TEXT NOT NULL REFERENCES pages (filename) ON DELETE CASCADE,
+                encoding TEXT NOT NULL,
+                content BLOB NOT NULL,
+                PRIMARY KEY (filename, encoding))''')
+            # Keywords pages can be generated for, so a URL slug maps back to its keyword
+            db.execute('''CREATE TABLE IF NOT EXISTS keywords (
+                slug TEXT PRIMARY KEY,
+                keyword TEXT NOT NULL)''')
+            # Paraphrase pools for boilerplate blocks, per backend and model (see variants.py).
+            # Pools stored before they were keyed that way can't be told apart, so they go.
+            db.execute('DROP TABLE IF EXISTS variants')
+            db.execute('''CREATE TABLE IF NOT EXISTS variant_pools (
+                backend TEXT NOT NULL,
+                model TEXT NOT NULL,
+                block TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (backend, model, block, position))''')
+            # Decayed request counts per page, kept by the pre-warmer (see warming.py)
+            db.execute('''CREATE TABLE IF NOT EXISTS popularity (
+                filename TEXT PRIMARY KEY,
+                score REAL NOT NULL,
+                updated_at REAL NOT NULL)''')
+            # Pages reserved or charged against client quotas, shared by every worker (see scheduler.py)
+            db.execute('''CREATE TABLE IF NOT EXISTS quota_charges (
+                id INTEGER PRIMARY KEY,
+                client TEXT NOT NULL,
+                charged_at REAL NOT NULL,
+                pages INTEGER NOT NULL)''')
+            db.execute('CREATE INDEX IF NOT EXISTS quota_charges_client ON quota_charges (client, charged_at)')
+            # Work one worker process does on behalf of all of them (see single_flight.py)
+            db.execute('''CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL)''')
+            db.execute('''CREATE TABLE IF NOT EXISTS job_results (
+                name TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                created_at REAL NOT NULL)''')
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA foreign_keys=ON')
+            self._local.db = db
+        return db
+
+    def put(self, filename: str, content: bytes, content_type: Optional[str] = None,
+            encodings: Optional[Dict[str, bytes]] = None):
+        """Store a page, compressing it unless pre-compressed encodings are passed in"""
+        if content_type is None:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if encodings is None:
+            encodings = {}
+            if len(content) >= MIN_COMPRESS_SIZE:
+                encodings['gzip'] = gzip_bytes(content)
+                if brotli is not None:
+                    encodings['br'] = brotli_bytes(content)
+
+        with self._connection() as db:
+            db.execute('DELETE FROM pages WHERE filename = ?', (filename,))
+            db.execute(
+                'INSERT INTO pages (filename, content, content_type, etag, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (filename, content, content_type, make_etag(content), time.time())
+            )
+            db.executemany(
+                'INSERT INTO page_encodings (filename, encoding, content) VALUES (?, ?, ?)',
+                [(filename, encoding, data) for encoding, data in encodings.items()]
+            )
+
+    def get(self, filename: str) -> Optional[StoredPage]:
+        db = self._connection()
+        row = db.execute(
+            'SELECT content, content_type, etag, updated_at FROM pages WHERE filename = ?', (filename,)
+        ).fetchone()
+        if row is None:
+            return None
+        encodings = dict(db.execute(
+            'SELECT encoding, content FROM page_encodings WHERE filename = ?', (filename,)
+        ))
+        return StoredPage(filename, row[0], row[1], row[2], row[3], encodings)
+
+    def delete(self, filename: str):
+        with self._connection() as db:
+            db.execute('DELETE FROM pages WHERE filename = ?', (filename,))
+
+    def filenames(self) -> Iterator[str]:
+        for (filename,) in self._connection().execute('SELECT filename FROM pages ORDER BY filename'):
+            yield filename
+
+    def __contains__(self, filename: str) -> bool:
+        row = self._connection().execute('SELECT 1 FROM pages WHERE filename = ?', (filename,)).fetchone()
+        return row is not None
+
+    def add_keywords(self, keywords: Iterable[str]):
+        with self._connection() as db:
+            db.executemany('INSERT OR IGNORE INTO keywords (slug, keyword) VALUES (?, ?)',
+                           [(slugify(keyword), keyword) for keyword in keywords])
+
+    def keywords(self) -> List[str]:
+        return [keyword for (keyword,) in self._connection().execute('SELECT keyword FROM keywords ORDER BY rowid')]
+
+    def keyword_for_slug(self, slug: str) -> Optional[str]:
+        row = self._connection().execute('SELECT keyword FROM keywords WHERE slug = ?', (slug,)).fetchone()
+        return row[0] if row else None
+
+    def put_variants(self, backend: str, model: str, block: str, texts: List[str]):
+        with self._connection() as db:
+            db.execute('DELETE FROM variant_pools WHERE backend = ? AND model = ? AND block = ?',
+                       (backend, model, block))
+            db.executemany(
+                'INSERT INTO variant_pools (backend, model, block, position, text) VALUES (?, ?, ?, ?, ?)',
+                [(backend, model, block, position, text) for position, text in enumerate(texts)]
+            )
+
+    def get_variants(self, backend: str, model: str, block: str) -> List[str]:
+        return [text for (text,) in self._connection().execute(
+            'SELECT text FROM variant_pools WHERE backend = ? AND model = ? AND block = ? ORDER BY position',
+            (backend, model, block))]
+
+    def add_hits(self, hits: Dict[str, int], half_life: float, now: Optional[float] = None):
+        """Fold request counts into each page's popularity, which halves every half_life seconds"""
+        now = time.time() if now is None else now
+        with self._connection() as db:
+            for filename, count in hits.items():
+                row = db.execute('SELECT score, updated_at FROM popularity WHERE filename = ?', (filename,)).fetchone()
+                score = count + (row[0] * 0.5 ** ((now - row[1]) / half_life) if row else 0.0)
+                db.execute('INSERT OR REPLACE INTO popularity (filename, score, updated_at) VALUES (?, ?, ?)',
+                           (filename, score, now))
+
+    def popularity(self, half_life: float, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """(filename, current score) for every tracked page, most popular first"""
+        now = time.time() if now is None else now
+        rows = [(filename, score * 0.5 ** ((now - updated_at) / half_life)) for filename, score, updated_at
+                in self._connection().execute('SELECT filename, score, updated_at FROM popularity')]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def forget_popularity(self, filenames: Iterable[str]):
+        with self._connection() as db:
+            db.executemany('DELETE FROM popularity WHERE filename = ?', [(filename,) for filename in filenames])
+
+    def reserve_quota(self, client: str, pages: int, quota: int, window: float,
+                      now: Optional[float] = None) -> Tuple[Optional[int], int]:
+        """Reserve pages for a client if they fit its quota; returns (reservation id or None, pages used)"""
+        now = time.time() if now is None else now
+        with self._connection() as db:
+            # Taken before reading, so two workers can't both fit the last pages
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('DELETE FROM quota_charges WHERE client = ? AND charged_at < ?', (client, now - window))
+            used = db.execute('SELECT COALESCE(SUM(pages), 0) FROM quota_charges WHERE client = ?',
+                              (client,)).fetchone()[0]
+            if used + pages > quota:
+                return None, used
+            cursor = db.execute('INSERT INTO quota_charges (client, charged_at, pages) VALUES (?, ?, ?)',
+                                (client, now, pages))
+            return cursor.lastrowid, used
+
+    def settle_quota(self, reservation: int, pages: int):
+        """Charge a reservation for no more than `pages`"""
+        with self._connection() as db:
+            db.execute('UPDATE quota_charges SET pages = MIN(pages, ?) WHERE id = ?', (pages, reservation))
+
+    def acquire_lease(self, name: str, owner: str, ttl: float, now: Optional[float] = None) -> bool:
+        """Take or renew the named lease for ttl seconds; False while another owner holds it"""
+        now = time.time() if now is None else now
+        with self._connection() as db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('DELETE FROM leases WHERE name = ? AND expires_at < ?', (name, now))
+            db.execute('INSERT OR IGNORE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)',
+                       (name, owner, now + ttl))
+            cursor = db.execute('UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ?',
+                                (now + ttl, name, owner))
+            return cursor.rowcount == 1
+
+    def release_lease(self, name: str, owner: str):
+        with self._connection() as db:
+            db.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, owner))
+
+    def lease_held(self, name: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        row = self._connection().execute('SELECT 1 FROM leases WHERE name = ? AND expires_at >= ?',
+                                         (name, now)).fetchone()
+        return row is not None
+
+    def put_job_result(self, name: str, content: bytes, keep_seconds: float):
+        """Keep a finished job's output for the workers waiting on it; older results are dropped"""
+        now = time.time()
+        with self._connection() as db:
+            db.execute('DELETE FROM job_results WHERE created_at < ?', (now - keep_seconds,))
+            db.execute('INSERT OR REPLACE INTO job_results (name, content, created_at) VALUES (?, ?, ?)',
+                       (name, content, now))
+
+    def get_job_result(self, name: str, since: float) -> Optional[bytes]:
+        """A job's output if it finished after `since`"""
+        row = self._connection().execute('SELECT content FROM job_results WHERE name = ? AND created_at >= ?',
+                                         (name, since)).fetchone()
+        return row[0] if row else None
+
+    def updated_at(self, filename: str) -> Optional[float]:
+        row = self._connection().execute('SELECT updated_at FROM pages WHERE filename = ?', (filename,)).fetchone()
+        return row[0] if row else None
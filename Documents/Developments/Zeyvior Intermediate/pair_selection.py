@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import bisect
+import itertools
+import math
+import random
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Pair = Tuple[str, str]
+
+STRATEGIES = ('all', 'file', 'top-k', 'sample', 'new')
+
+
+class AllPairs:
+    """Every unordered pair of keywords, in itertools.combinations order.
+
+    Re-iterable and lazy, so it can be walked once per page for link building
+    without ever materialising the O(n²) list.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+
+    def __iter__(self) -> Iterator[Pair]:
+        return itertools.combinations(self.keywords, 2)
+
+    def __len__(self) -> int:
+        return math.comb(len(self.keywords), 2)
+
+
+def read_pairs_file(path: str) -> List[Pair]:
+    """Read an explicit pair list: one pair per line as "A vs B", "A, B" or tab-separated.
+
+    Blank lines and lines starting with # are ignored.
+    """
+    pairs = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = [part.strip() for part in re.split(r'\s+vs\.?\s+|\t|,', line, maxsplit=1)]
+            if len(parts) != 2 or not all(parts):
+                raise ValueError(f"{path}:{line_number}: expected a pair like 'A vs B', got {line!r}")
+            pairs.append((parts[0], parts[1]))
+    return _dedupe(pairs)
+
+
+def _dedupe(pairs: Iterable[Pair]) -> List[Pair]:
+    seen = set()
+    unique = []
+    for item1, item2 in pairs:
+        key = frozenset((item1, item2))
+        if item1 == item2 or key in seen:
+            continue
+        seen.add(key)
+        unique.append((item1, item2))
+    return unique
+
+
+def _ordered(pairs: Iterable[Pair], keywords: Sequence[str]) -> List[Pair]:
+    """Orient pairs the way combinations() would and sort them into that order"""
+    position = {keyword: i for i, keyword in enumerate(keywords)}
+    oriented = [(a, b) if position[a] < position[b] else (b, a) for a, b in pairs]
+    return sorted(_dedupe(oriented), key=lambda pair: (position[pair[0]], position[pair[1]]))
+
+
+def _trigrams(text: str) -> set:
+    text = f"  {re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def top_k_neighbours(keywords: Sequence[str], k: int) -> List[Pair]:
+    """Pair every keyword with its k most similar keywords.
+
+    Similarity is the Jaccard overlap of character trigrams of the names, which
+    is computed locally and needs no API calls. Ties keep input order.
+    """
+    grams = [_trigrams(keyword) for keyword in keywords]
+    pairs = []
+    for i, keyword in enumerate(keywords):
+        scored = []
+        for j, other in enumerate(keywords):
+            if i == j:
+                continue
+            union = len(grams[i] | grams[j])
+            similarity = len(grams[i] & grams[j]) / union if union else 0.0
+            scored.append((-similarity, j))
+        for _, j in sorted(scored)[:k]:
+            pairs.append((keyword, keywords[j]))
+    return _ordered(pairs, keywords)
+
+
+def random_sample(keywords: Sequence[str], budget: int, seed: Optional[int] = None) -> List[Pair]:
+    """Uniformly sample `budget` distinct pairs without enumerating all of them"""
+    n = len(keywords)
+    total = math.comb(n, 2)
+    if budget >= total:
+        return list(AllPairs(keywords))
+    # Pair index t lives in row i where row i holds the pairs (i, j > i)
+    row_starts = list(itertools.accumulate((n - 1 - i for i in range(n - 1)), initial=0))
+    pairs = []
+    for t in sorted(random.Random(seed).sample(range(total), budget)):
+        i = bisect.bisect_right(row_starts, t) - 1
+        j = i + 1 + (t - row_starts[i])
+        pairs.append((keywords[i], keywords[j]))
+    return pairs
+
+
+def pairs_with_new_keywords(keywords: Sequence[str], new_keywords: Sequence[str]) -> List[Pair]:
+    """Only the pairs that involve at least one of the new keywords"""
+    new = set(new_keywords)
+    return [(a, b) for a, b in AllPairs(keywords) if a in new or b in new]
+
+
+def select_pairs(keywords: Sequence[str], strategy: str = 'all', pairs_file: Optional[str] = None,
+                 k: int = 5, budget: int = 100, seed: Optional[int] = None,
+                 new_keywords: Sequence[str] = ()) -> Iterable[Pair]:
+    """Apply a pair selection strategy before any content is generated"""
+    if strategy == 'all':
+        return AllPairs(keywords)
+    if strategy == 'file':
+        if not pairs_file:
+            raise ValueError("The 'file' strategy needs a pairs file")
+        return read_pairs_file(pairs_file)
+    if strategy == 'top-k':
+        return top_k_neighbours(keywords, k)
+    if strategy == 'sample':
+        return random_sample(keywords, budget, seed)
+    if strategy == 'new':
+        if not new_keywords:
+            raise ValueError("The 'new' strategy needs at least one new keyword")
+        return pairs_with_new_keywords(keywords, new_keywords)
+    raise ValueError(f"Unknown pair selection strategy: {strategy} (expected one of {', '.join(STRATEGIES)})")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, IO, Iterable, List, Optional, Sequence, Tuple
+from prompts import (BOILERPLATE_BLOCKS, SOURCE_LOCALE, page_requests, translation_request, ui_strings,
+                     variant_pool_requests)
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a characters-per-token estimate
+    tiktoken = None
+
+# Rough average for English prose when tiktoken isn't installed
+CHARS_PER_TOKEN = 4
+# Fixed overhead the chat format adds per message and per request
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REQUEST = 3
+
+
+class BudgetExceededError(ValueError):
+    pass
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass
+class PlannerConfig:
+    """Throughput, pricing and budget assumptions used to project a job"""
+    concurrency: int = 1
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    prompt_price_per_1k: float = 0.03
+    completion_price_per_1k: float = 0.06
+    base_latency_seconds: float = 1.0
+    output_tokens_per_second: float = 20.0
+    budget_usd: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> 'PlannerConfig':
+        return cls(
+            concurrency=int(os.getenv('GENERATION_CONCURRENCY', '1')),
+            requests_per_minute=_env_float('OPENAI_RPM_LIMIT', None),
+            tokens_per_minute=_env_float('OPENAI_TPM_LIMIT', None),
+            prompt_price_per_1k=_env_float('PROMPT_PRICE_PER_1K', 0.03),
+            completion_price_per_1k=_env_float('COMPLETION_PRICE_PER_1K', 0.06),
+            base_latency_seconds=_env_float('LLM_BASE_LATENCY_SECONDS', 1.0),
+            output_tokens_per_second=_env_float('LLM_OUTPUT_TOKENS_PER_SECOND', 20.0),
+            budget_usd=_env_float('GENERATION_BUDGET_USD', None),
+        )
+
+
+_encodings = {}
+
+
+def count_tokens(text: str, model: str) -> int:
+    if tiktoken is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding('cl100k_base')
+    return len(_encodings[model].encode(text))
+
+
+def count_prompt_tokens(request: Dict) -> int:
+    return TOKENS_PER_REQUEST + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message['content'], request['model'])
+        for message in request['messages']
+    )
+
+
+def shared_prefix(request: Dict) -> str:
+    """The system instructions that every pair sends unchanged"""
+    return "".join(message['content'] for message in request['messages'] if message['role'] == 'system')
+
+
+@dataclass
+class Plan:
+    pages: int = 0
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cacheable_prompt_tokens: int = 0
+    call_seconds: float = 0.0
+    by_block: Dict[str, List[int]] = field(default_factory=dict)
+
+    def cost(self, config: PlannerConfig) -> float:
+        return (self.prompt_tokens * config.prompt_price_per_1k
+                + self.completion_tokens * config.completion_price_per_1k) / 1000
+
+    def wall_time(self, config: PlannerConfig) -> Tuple[float, str]:
+        """Projected wall-clock seconds and the limit that determines it"""
+        limits = [(self.call_seconds / max(config.concurrency, 1), f"concurrency of {config.concurrency}")]
+        if self.pages:
+            # The calls for one page run one after another
+            limits.append((self.call_seconds / self.pages, "sequential calls within a page"))
+        if config.requests_per_minute:
+            limits.append((self.calls / config.requests_per_minute * 60, "requests-per-minute limit"))
+        if config.tokens_per_minute:
+            total_tokens = self.prompt_tokens + self.completion_tokens
+            limits.append((total_tokens / config.tokens_per_minute * 60, "tokens-per-minute limit"))
+        return max(limits)
+
+    def report(self, config: PlannerConfig) -> List[str]:
+        seconds, bound_by = self.wall_time(config)
+        lines = [
+            f"Plan for {self.pages} pages:",
+            f"  API calls          {self.calls:>12,}",
+            f"  prompt tokens      {self.prompt_tokens:>12,}" + ("" if tiktoken else "  (estimated, pip install tiktoken for exact counts)"),
+            f"    shared prefix    {self.cacheable_prompt_tokens:>12,}  (repeated system instructions, cacheable by the provider)",
+            f"  completion tokens  {self.completion_tokens:>12,}  (upper bound from max_tokens)",
+            f"  estimated cost     ${self.cost(config):>11,.2f}",
+            f"  estimated time     {_format_duration(seconds):>12}  (bound by {bound_by})",
+            "  per block:",
+        ]
+        for block, (calls, prompt_tokens, completion_tokens) in self.by_block.items():
+            lines.append(f"    {block:<16} {calls:>8,} calls {prompt_tokens:>12,} prompt {completion_tokens:>12,} completion")
+        if config.budget_usd is not None:
+            lines.append(f"  budget             ${config.budget_usd:>11,.2f}")
+        return lines
+
+    def check_budget(self, config: PlannerConfig):
+        if config.budget_usd is not None and self.cost(config) > config.budget_usd:
+            raise BudgetExceededError(
+                f"Estimated cost ${self.cost(config):,.2f} for {self.pages} pages exceeds the "
+                f"${config.budget_usd:,.2f} budget; select fewer pairs or raise GENERATION_BUDGET_USD"
+            )
+
+
+def _format_duration(seconds: float) -> str:
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def plan_job(pairs: Iterable[Tuple[str, str]], config: PlannerConfig,
+             prompt_log: Optional[IO[str]] = None, variant_pool_size: int = 0,
+             locales: Sequence[str] = ()) -> Plan:
+    """Enumerate every request the job would send and add up its projected usage.
+
+    No API calls are made. When prompt_log is given, each request is written to it
+    as a JSON line together with its token counts. With a variant pool the
+    boilerplate blocks cost one request each for the whole job instead of one per page.
+    Each extra locale adds one interface translation per job and one per page.
+    """
+    plan = Plan()
+    prefix_tokens = {}
+    pooled_blocks = tuple(BOILERPLATE_BLOCKS) if variant_pool_size else ()
+
+    def add(pair, block, request):
+        prompt_tokens = count_prompt_tokens(request)
+        prefix = shared_prefix(request)
+        if prefix in prefix_tokens:
+            plan.cacheable_prompt_tokens += prefix_tokens[prefix]
+        else:
+            prefix_tokens[prefix] = count_tokens(prefix, request['model'])
+        completion_tokens = request['max_tokens']
+        plan.calls += 1
+        plan.prompt_tokens += prompt_tokens
+        plan.completion_tokens += completion_tokens
+        plan.call_seconds += config.base_latency_seconds + completion_tokens / config.output_tokens_per_second
+        totals = plan.by_block.setdefault(block, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += prompt_tokens
+        totals[2] += completion_tokens
+        if prompt_log is not None:
+            prompt_log.write(json.dumps({
+                'pair': pair,
+                'block': block,
+                'request': request,
+                'prompt_tokens': prompt_tokens,
+                'max_completion_tokens': completion_tokens
+            }) + "\n")
+
+    locales = [locale for locale in dict.fromkeys(locales) if locale != SOURCE_LOCALE]
+    for block in pooled_blocks:
+        for request in variant_pool_requests(block, variant_pool_size):
+            add(None, f"{block}_variants", request)
+    for locale in locales:
+        add(None, "ui_strings", translation_request(locale, ui_strings()))
+    for item1, item2 in pairs:
+        plan.pages += 1
+        for block, request in page_requests(item1, item2, pooled_blocks=pooled_blocks, locales=locales):
+            add([item1, item2], block, request)
+    return plan
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+from backends import GenerationBackend
+from generate_comparisons import HTML_TEMPLATE
+from prompts import (
+    comparison_data_request,
+    content_4_request,
+    content_5_request,
+    content_6_request,
+    select_content_5_categories,
+    seo_intro_request,
+)
+
+# The inline <style> blocks of the generated page, so previews look like the real thing
+PAGE_STYLES = "\n".join(re.findall(r'<style>.*?</style>', HTML_TEMPLATE, re.S))
+
+
+def iter_json_array_objects(chunks: Iterable[str], key: str, full_text: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Yield each object of the `key` array of a JSON document as soon as it is complete.
+
+    Chunks are consumed as they arrive, so callers can act on the first array
+    element long before the document has been fully received. The raw text is
+    appended to `full_text` when given, for reading the remaining fields afterwards.
+    """
+    chunks = iter(chunks)
+    buffer = ""
+    position = 0          # next character to scan
+    array_start = None    # index just past the opening bracket, once found
+    array_done = False
+    depth = 0             # object nesting depth inside the array
+    in_string = False
+    escaped = False
+    object_start = None
+
+    for chunk in chunks:
+        buffer += chunk
+        if array_start is None:
+            match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), buffer)
+            if not match:
+                continue
+            array_start = position = match.end()
+
+        while position < len(buffer):
+            char = buffer[position]
+            position += 1
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                if depth == 0:
+                    object_start = position - 1
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    yield json.loads(buffer[object_start:position])
+            elif char == ']' and depth == 0:
+                array_done = True
+                break
+
+        if array_done:
+            break
+
+    if full_text is not None:
+        # Drain the rest of the stream so the caller gets the whole document
+        full_text.append(buffer)
+        full_text.extend(chunks)
+
+
+class PreviewPage:
+    """Lazily generated content for one streamed comparison page.
+
+    Every block is a generator that only calls the backend when the template
+    reaches it, so the page header is sent before any API call and each block
+    streams in as its completion arrives. Scores are accumulated while the
+    category rows stream so the sections after the table can use them.
+    """
+
+    def __init__(self, item1: str, item2: str, backend: GenerationBackend):
+        self.item1 = item1
+        self.item2 = item2
+        self.backend = backend
+        self.item1_performance = 50.0
+        self.item2_performance = 50.0
+        self.winning_reason = "Both methods have their unique advantages"
+
+    def _stream(self, block: str, request: Dict, fallback: str, **fields) -> Iterator[str]:
+        try:
+            yield from self.backend.stream(block, request, item1=self.item1, item2=self.item2, **fields)
+        except Exception as e:
+            print(f"Error streaming {block} preview: {str(e)}")
+            yield fallback
+
+    def intro(self) -> Iterator[str]:
+        return self._stream("seo_intro", seo_intro_request(self.item1, self.item2),
+                            f"Compare {self.item1} vs {self.item2} - A Comprehensive Analysis")
+
+    def rows(self) -> Iterator[Dict]:
+        item1_scores, item2_scores, full_text = [], [], []
+        chunks = self.backend.stream("comparison_data", comparison_data_request(self.item1, self.item2),
+                                     item1=self.item1, item2=self.item2)
+        try:
+            for category in iter_json_array_objects(chunks, "categories", full_text):
+                item1_scores.append(category['item1_score'])
+                item2_scores.append(category['item2_score'])
+                yield category
+            self.winning_reason = json.loads("".join(full_text))['winning_reason']
+        except Exception as e:
+            print(f"Error streaming comparison_data preview: {str(e)}")
+
+        if item1_scores:
+            self.item1_performance = sum(item1_scores) / len(item1_scores)
+            self.item2_performance = sum(item2_scores) / len(item2_scores)
+
+    def content_4(self) -> Iterator[str]:
+        item1_score, item2_score = self.item1_performance, self.item2_performance
+        winner = self.item1 if item1_score > item2_score else self.item2
+        return self._stream("content_4", content_4_request(self.item1, self.item2, item1_score, item2_score),
+                            f"Based on our analysis, {self.item1} achieved {item1_score:.1f}% while {self.item2} reached {item2_score:.1f}%. For beginners, {winner} offers better starting opportunities.",
+                            item1_score=item1_score, item2_score=item2_score)
+
+    def content_5(self) -> Iterator[Dict]:
+        for category in select_content_5_categories(self.item1, self.item2):
+            text = "".join(self._stream(
+                "content_5", content_5_request(self.item1, self.item2, category),
+                f"{self.item1} and {self.item2} both have their unique approaches to {category['name'].lower()}. Each method offers different advantages depending on your specific situation.",
+                category=category
+            ))
+            yield {
+                "category": category["name"],
+                "comparison": text,
+                "link": category["link"],
+                "button_text": category["button_text"]
+            }
+
+    def content_6(self) -> Iterator[str]:
+        return self._stream("content_6", content_6_request(self.item1, self.item2),
+                            f"Interested in exploring {self.item1} vs {self.item2} with current data and trends? Zeyvior AI provides comprehensive analysis to help you evaluate different opportunities. Whether you're comparing various methods or exploring new possibilities, Zeyvior AI offers detailed insights to support your decision-making process.")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Opt-in CPU profiling of a run, broken down by stage.
+
+With a mock or cached backend the API no longer dominates, and what is left
+is local work: rendering templates, building links, minifying, packaging.
+Code marks its stages with stage(); outside a profiled run that is a no-op.
+
+    python generate_comparisons.py A B C --backend offline --profile profile
+
+writes, per stage, <stage>.prof (for pstats, snakeviz and the like) and
+<stage>.txt (the top functions by cumulative time), plus stages.collapsed,
+sampled stacks of every thread in the collapsed format that flamegraph.pl,
+speedscope and inferno read.
+
+From Python 3.12 cProfile sits on sys.monitoring, which takes one profiler
+per process for all threads. There the run gets a single run.prof/run.txt
+instead of one per stage; the stage times and sampled stacks are the same.
+If another profiler already holds it (e.g. a concurrent profiled /generate
+job), the run falls back to the sampled stacks alone.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Functions listed per stage in <stage>.txt
+TOP_FUNCTIONS = 30
+
+# Up to 3.11 each thread can have its own active cProfile.Profile
+PER_STAGE_PROFILES = sys.version_info < (3, 12)
+
+
+def _enable(profile: cProfile.Profile) -> bool:
+    try:
+        profile.enable()
+        return True
+    except ValueError:  # "Another profiling tool is already active"
+        return False
+
+
+class _Stage:
+    """One entry into a stage on one thread"""
+
+    def __init__(self, profiler: 'StageProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        # cProfile hooks one profiler per thread; the enclosing stage pauses meanwhile
+        if stack and stack[-1].profile:
+            stack[-1].profile.disable()
+        self.frame = sys._getframe(1)
+        self.profile = self.profiler._profile(self.name) if PER_STAGE_PROFILES else None
+        self.started = time.perf_counter(), time.thread_time()
+        stack.append(self)
+        # Another tool holding the profiler hook only costs this stage its cProfile stats
+        if self.profile and not _enable(self.profile):
+            self.profile = None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile:
+            self.profile.disable()
+        wall, cpu = time.perf_counter() - self.started[0], time.thread_time() - self.started[1]
+        stack = self.profiler._stack()
+        stack.pop()
+        self.profiler._record(self.name, wall, cpu)
+        if stack and stack[-1].profile and not _enable(stack[-1].profile):
+            stack[-1].profile = None
+        return False
+
+
+class StageProfiler:
+    """cProfile stats per stage, and sampled stacks for flame graphs.
+
+    Up to 3.11 every thread gets its own cProfile.Profile per stage (cProfile
+    only sees the thread that enabled it); they are merged when the stats are
+    written. From 3.12 one profile covers the whole run and every thread.
+    A sampler thread reads the stack of every thread that is inside a stage
+    every sample_interval seconds and counts it under the stage names, so the
+    flame graph covers the worker threads too. Times include cProfile's own
+    overhead, which weighs most on stages that make many small calls.
+    """
+
+    def __init__(self, sample_interval: Optional[float] = None):
+        if sample_interval is None:
+            sample_interval = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000
+        self.sample_interval = sample_interval
+        self.entries: Counter = Counter()
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+        self.samples: Counter = Counter()
+        self._profiles: Dict[Tuple[int, str], cProfile.Profile] = {}
+        self._active: Dict[int, List[_Stage]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.run_profile: Optional[cProfile.Profile] = None
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def _stack(self) -> List[_Stage]:
+        with self._lock:
+            return self._active.setdefault(threading.get_ident(), [])
+
+    def _profile(self, name: str) -> cProfile.Profile:
+        key = (threading.get_ident(), name)
+        with self._lock:
+            if key not in self._profiles:
+                self._profiles[key] = cProfile.Profile()
+            return self._profiles[key]
+
+    def _record(self, name: str, wall: float, cpu: float):
+        with self._lock:
+            self.entries[name] += 1
+            self.wall[name] = self.wall.get(name, 0.0) + wall
+            self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+
+    def _sample(self):
+        while not self._stopped.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = [(thread_id, list(stack)) for thread_id, stack in self._active.items() if stack]
+            for thread_id, stack in active:
+                frame = frames.get(thread_id)
+                names = []
+                # Only the frames from the innermost stage's `with` down
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{Path(code.co_filename).stem}.{code.co_qualname}")
+                    if frame is stack[-1].frame:
+                        break
+                    frame = frame.f_back
+                if names:
+                    self.samples[";".join([entry.name for entry in stack] + names[::-1])] += 1
+
+    def start(self):
+        if not PER_STAGE_PROFILES:
+            profile = cProfile.Profile()
+            if _enable(profile):
+                self.run_profile = profile
+            else:
+                print("Another profiler is active; recording sampled stacks only")
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._sampler:
+            self._sampler.join()
+        if self.run_profile:
+            self.run_profile.disable()
+
+    def write(self, directory: Path) -> List[str]:
+        """Write the per-stage stats and stages.collapsed into directory; returns a summary"""
+        directory.mkdir(parents=True, exist_ok=True)
+        by_stage: Dict[str, List[cProfile.Profile]] = {}
+        for (_, name), profile in self._profiles.items():
+            by_stage.setdefault(name, []).append(profile)
+        if self.run_profile:
+            by_stage["run"] = [self.run_profile]
+        for name, profiles in by_stage.items():
+            stats = pstats.Stats(*profiles)
+            stats.dump_stats(directory / f"{name}.prof")
+            text = io.StringIO()
+            pstats.Stats(*profiles, stream=text).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            (directory / f"{name}.txt").write_text(text.getvalue(), encoding='utf-8')
+        (directory / "stages.collapsed").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items())), encoding='utf-8')
+
+        sampled = Counter()
+        for stack, count in self.samples.items():
+            sampled[stack.split(';', 1)[0]] += count
+        total_samples = sum(sampled.values())
+        lines = [f"Profile by stage (written to {directory}):",
+                 f"  {'stage':<14} {'entries':>8} {'wall s':>9} {'CPU s':>9} {'samples':>8}"]
+        for name in sorted(self.wall, key=self.wall.get, reverse=True):
+            share = sampled[name] / total_samples if total_samples else 0.0
+            lines.append(f"  {name:<14} {self.entries[name]:>8,} {self.wall[name]:>9.3f} "
+                         f"{self.cpu[name]:>9.3f} {share:>8.1%}")
+        lines.append("  Wall and CPU time are summed over threads and include nested stages")
+        return lines
+
+
+current_profiler: ContextVar[Optional[StageProfiler]] = ContextVar('current_profiler', default=None)
+
+
+def stage(name: str):
+    """Context manager marking a stage of the current run; free when the run isn't profiled"""
+    profiler = current_profiler.get()
+    return profiler.stage(name) if profiler else nullcontext()
+
+
+@contextmanager
+def profile_run(directory: Path) -> Iterator[StageProfiler]:
+    """Profile everything inside the block and write the results to directory when it ends"""
+    profiler = StageProfiler()
+    token = current_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        current_profiler.reset(token)
+        print()
+        print("\n".join(profiler.write(directory)))
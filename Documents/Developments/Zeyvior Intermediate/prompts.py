@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+import json
+import random
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Every chat request the generator sends is built here, so the same prompts can be
+# sent by generate_comparisons.py or enumerated offline by planner.py.
+
+MODEL = "gpt-4"
+
+COMPARISON_CATEGORIES = [
+    "Ease of Starting & Doing",
+    "Minimal or Zero Investment",
+    "Scalability",
+    "Passive Income Potential",
+    "Market Demand",
+    "Competition Level",
+    "Immediate Earnings",
+    "Long-Term Stability",
+    "Risk of Failure",
+    "Opportunity for Newcomers",
+    "Adaptability to Changes",
+    "Global Reach & Accessibility"
+]
+
+CONTENT_5_CATEGORIES = [
+    {
+        "name": "Ease of Starting & Doing",
+        "link": "https://zeyvior.com/ease-of-starting/",
+        "button_text": "Easiest Methods to Start"
+    },
+    {
+        "name": "Minimal or Zero Investment", 
+        "link": "https://zeyvior.com/minimal-investment/",
+        "button_text": "Best Methods with Minimal Investment"
+    },
+    {
+        "name": "Passive Income Potential",
+        "link": "https://zeyvior.com/passive-income-potential/",
+        "button_text": "Best Methods with Passive Income Potential"
+    },
+    {
+        "name": "Market Demand",
+        "link": "https://zeyvior.com/market-demand/",
+        "button_text": "Best Methods with High Market Demand"
+    },
+    {
+        "name": "Competition Level",
+        "link": "https://zeyvior.com/competition-level/",
+        "button_text": "Methods with Lowest Competition"
+    },
+    {
+        "name": "Immediate Earnings",
+        "link": "https://zeyvior.com/immediate-earnings/",
+        "button_text": "Best Immediate Earning Methods"
+    },
+    {
+        "name": "Risk of Failure",
+        "link": "https://zeyvior.com/risk-of-failure/",
+        "button_text": "Lowest Risk Methods to Start"
+    },
+    {
+        "name": "Skills & Experience Needed",
+        "link": "https://zeyvior.com/skills-and-experience/",
+        "button_text": "Best Methods for your Skills"
+    }
+]
+
+
+# Each request is a fixed system message shared by every pair followed by a short
+# user message holding only the item names. Keeping all instructions in the shared
+# prefix lets providers that cache prompt prefixes reuse them across pairs.
+
+REWRITE_SEO_INSTRUCTIONS = "Re-write the text the user sends in a meaningful, engaging, and SEO-friendly way. Ensure content avoids triggering Google's YMYL (Your Money or Your Life) policy. Reply with the re-written text only."
+
+REWRITE_INSTRUCTIONS = "Re-write the text the user sends in another meaningful way. Avoid words and phrases that might trigger Google YMYL policy. Reply with the re-written text only."
+
+COMPARISON_DATA_INSTRUCTIONS = f'''You are a helpful assistant that responds only in valid JSON format with detailed comparisons between two options.
+
+The user names two options, item1 and item2. Compare item1 vs item2 across the following categories for COMPLETE BEGINNERS. For each category:
+
+1. Provide separate descriptions for item1 and item2 (30-40 words each) focusing on beginner-friendliness.
+2. Provide VERY CHALLENGING scores (20-60) for each option. Even excellent beginner methods should rarely exceed 60%.
+3. Determine which option performs better for beginners in this category.
+
+Remember: Be very strict with scoring. Starting any online method is extremely difficult for beginners.
+
+Also provide a SHORT explanation (15-25 words) of why the overall winner is better for beginners.
+
+Categories:
+{chr(10).join(COMPARISON_CATEGORIES)}
+
+Format the response as JSON with this structure:
+{{
+    "categories": [
+        {{
+            "name": "category name",
+            "item1_details": "Specific details about item1 for this category (beginner-focused)",
+            "item2_details": "Specific details about item2 for this category (beginner-focused)",
+            "item1_score": 45,
+            "item2_score": 52,
+            "winner": "the exact name of item1 or item2"
+        }}
+    ],
+    "overall_winner": "The overall better option for beginners",
+    "winning_reason": "Short explanation why winner is better for beginners"
+}}
+
+IMPORTANT: 
+- Respond ONLY with the JSON structure
+- Focus on beginner-friendliness in all descriptions
+- Scores should be very challenging (20-60 range maximum)
+- Winner should be exactly the name of item1 or item2 as given by the user (no other variations)
+- Winning reason should be SHORT (15-25 words only)'''
+
+CONTENT_5_INSTRUCTIONS = "Write a short comparison (30-40 words) between the two methods the user names, specifically for the category the user gives. Focus on which method performs better and why. Do not include scores or percentages."
+
+
+# Fixed promotional paragraphs that only differ in the item names. {item1} and
+# {item2} are placeholders, filled in with str.replace so the text may hold braces.
+SEO_INTRO_TEMPLATE = "Get the most accurate and unbiased AI-driven comparison of {item1} and {item2}. Unlike human opinions, Zeyvior AI analyzes real-time data and trends to give you the clearest answer on which is the better choice. Explore expert AI insights now!"
+
+CONTENT_6_TEMPLATE = """Want to compare {item1} vs. {item2} with real-time data, considering the latest news and trends? Zeyvior AI is the most reliable tool to give you accurate insights before deciding on your next online money-making strategy.
+And if you need to compare anything else—whether it's financial markets, tech trends, or any topic in the universe—Zeyvior AI has you covered. Try it now and make smarter decisions with confidence!"""
+
+# Block -> (template, style, max_tokens per text) for the blocks that can come from a variant pool
+BOILERPLATE_BLOCKS = {
+    "seo_intro": (SEO_INTRO_TEMPLATE, "meaningful, engaging, and SEO-friendly", 200),
+    "content_6": (CONTENT_6_TEMPLATE, "meaningful", 200),
+}
+
+# Paraphrases asked for per request, so a large pool isn't one oversized completion
+VARIANTS_PER_REQUEST = 8
+
+VARIANT_POOL_INSTRUCTIONS = "Write {count} different re-writes of the text the user sends, each {style}. Avoid words and phrases that might trigger Google YMYL (Your Money or Your Life) policy. Keep the placeholders {{item1}} and {{item2}} exactly as written, each at least once, in every re-write. Reply only with a JSON array of the {count} re-written texts."
+
+# Pages are written in SOURCE_LOCALE; other locales are translations of the same analysis
+SOURCE_LOCALE = "en"
+
+LOCALE_NAMES = {
+    "de": "German", "es": "Spanish", "fr": "French", "it": "Italian", "nl": "Dutch",
+    "pl": "Polish", "pt": "Portuguese", "tr": "Turkish", "hi": "Hindi", "id": "Indonesian",
+    "ja": "Japanese", "ko": "Korean", "zh": "Simplified Chinese", "ar": "Arabic", "ru": "Russian",
+}
+
+# Interface text of the page template, translated once per locale per run
+UI_STRINGS = {
+    "personalize": "Personalize Comparisons",
+    "similar_comparisons": "Similar Comparisons",
+    "winner": "Winner!",
+    "performance": "Performance",
+    "try_zeyvior": "Try Zeyvior",
+    "start_now": "Best Methods to Start Now!",
+    "privacy_policy": "Privacy Policy",
+    "terms": "Terms and Conditions",
+    "refund_policy": "Refund Policy",
+    "about_us": "About Us",
+    "contact_us": "Contact Us",
+    "copyright": "\u00a9 2025 Zeyvior. All rights reserved.",
+    "title_suffix": "[AI Analysis]",
+}
+
+TRANSLATION_INSTRUCTIONS = "Translate every value of the JSON object the user sends into {language}. Keep the keys, HTML tags, numbers and percentages exactly as they are, and leave the names of the methods being compared untranslated. Write natural, fluent {language} for beginners. Reply only with the translated JSON object."
+
+
+def ui_strings() -> Dict[str, str]:
+    """Template text plus the category names and hub button labels shown on a page"""
+    strings = dict(UI_STRINGS)
+    for name in COMPARISON_CATEGORIES:
+        strings[f"category:{name}"] = name
+    for category in CONTENT_5_CATEGORIES:
+        strings[f"category:{category['name']}"] = category["name"]
+        strings[f"button:{category['name']}"] = category["button_text"]
+    return strings
+
+
+def fill_template(template: str, item1: str, item2: str) -> str:
+    return template.replace("{item1}", item1).replace("{item2}", item2)
+
+def seo_intro_request(item1: str, item2: str) -> Dict:
+    text = f'''"{fill_template(SEO_INTRO_TEMPLATE, item1, item2)}"'''
+
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": REWRITE_SEO_INSTRUCTIONS},
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 200
+    }
+
+def comparison_data_request(item1: str, item2: str) -> Dict:
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": COMPARISON_DATA_INSTRUCTIONS},
+            {"role": "user", "content": f"item1: {item1}\nitem2: {item2}"}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 1500
+    }
+
+def content_4_request(item1: str, item2: str, item1_score: float, item2_score: float) -> Dict:
+    text = f'''"According to Zeyvior AI, {item1} scores {item1_score:.1f}%, while {item2} scores {item2_score:.1f}%—meaning neither is ideal right now. However, if you're a beginner with no clear direction, {item1 if item1_score > item2_score else item2} is the better choice. Want more options? Select one from the buttons below."'''
+
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": REWRITE_INSTRUCTIONS},
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 150
+    }
+
+def select_content_5_categories(item1: str, item2: str) -> List[Dict]:
+    """Select the 6 categories shown in Content 5; a pair always gets the same ones.
+
+    Seeding by the pair keeps rebuilt pages byte-identical, so delta archives
+    only carry pages whose content actually changed.
+    """
+    return random.Random(f"{item1}\x1f{item2}").sample(CONTENT_5_CATEGORIES, 6)
+
+def content_5_request(item1: str, item2: str, category: Dict) -> Dict:
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": CONTENT_5_INSTRUCTIONS},
+            {"role": "user", "content": f'Methods: {item1} and {item2}\nCategory: "{category["name"]}"'}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 100
+    }
+
+def content_6_request(item1: str, item2: str) -> Dict:
+    text = f'''"{fill_template(CONTENT_6_TEMPLATE, item1, item2)}"'''
+
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": REWRITE_INSTRUCTIONS},
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 200
+    }
+
+def variant_pool_request(block: str, count: int) -> Dict:
+    """Ask for `count` paraphrases of a boilerplate block, keeping the item placeholders"""
+    template, style, max_tokens = BOILERPLATE_BLOCKS[block]
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": VARIANT_POOL_INSTRUCTIONS.format(count=count, style=style)},
+            {"role": "user", "content": f'"{template}"'}
+        ],
+        "temperature": 0.9,
+        "max_tokens": max_tokens * count
+    }
+
+def variant_pool_requests(block: str, count: int) -> List[Dict]:
+    """The requests for a pool of `count` paraphrases, at most VARIANTS_PER_REQUEST each"""
+    return [variant_pool_request(block, min(VARIANTS_PER_REQUEST, count - start))
+            for start in range(0, count, VARIANTS_PER_REQUEST)]
+
+def translation_request(locale: str, texts: Dict[str, str]) -> Dict:
+    """Translate a {key: text} batch, e.g. every text field of one page, in one call"""
+    body = json.dumps(texts, ensure_ascii=False)
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": TRANSLATION_INSTRUCTIONS.format(language=LOCALE_NAMES.get(locale, locale))},
+            {"role": "user", "content": body}
+        ],
+        "temperature": 0.3,
+        # Translations run longer than English in most languages and scripts
+        "max_tokens": len(body) // 2 + 100
+    }
+
+def _placeholder_page_texts(item1: str, item2: str) -> Dict[str, str]:
+    """Stand-in page text of typical length, for projecting translation calls"""
+    sentence = " ".join(["word"] * 35)
+    texts = {"intro": f"<p>{fill_template(SEO_INTRO_TEMPLATE, item1, item2)}</p>",
+             "content_4": f"{sentence} {sentence}", "content_6": fill_template(CONTENT_6_TEMPLATE, item1, item2)}
+    for i in range(len(COMPARISON_CATEGORIES)):
+        texts[f"details.{i}.item1"] = sentence
+        texts[f"details.{i}.item2"] = sentence
+    for i in range(6):
+        texts[f"content_5.{i}"] = sentence
+    return texts
+
+def page_requests(item1: str, item2: str, item1_score: float = 50.0,
+                  item2_score: float = 50.0, pooled_blocks: Iterable[str] = (),
+                  locales: Iterable[str] = ()) -> Iterator[Tuple[str, Dict]]:
+    """Every (block, request) generate_html_file sends for one pair, in call order.
+
+    Content 4 depends on the scores returned by the comparison data call, so
+    placeholder scores are used when the real ones aren't known yet. Blocks in
+    pooled_blocks come from a variant pool and send nothing per page. Each extra
+    locale adds one translation of the page's text, projected from stand-in text.
+    """
+    if "seo_intro" not in pooled_blocks:
+        yield "seo_intro", seo_intro_request(item1, item2)
+    yield "comparison_data", comparison_data_request(item1, item2)
+    yield "content_4", content_4_request(item1, item2, item1_score, item2_score)
+    for category in select_content_5_categories(item1, item2):
+        yield "content_5", content_5_request(item1, item2, category)
+    if "content_6" not in pooled_blocks:
+        yield "content_6", content_6_request(item1, item2)
+    for locale in locales:
+        yield "translation", translation_request(locale, _placeholder_page_texts(item1, item2))
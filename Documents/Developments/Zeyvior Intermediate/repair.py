@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Regenerate the failed blocks of a finished run and re-render those pages.
+
+    python repair.py run_report.json [--backend offline]
+
+Only the blocks the run report lists as fallbacks are requested again; every
+other block of the page is reused from the report. The run report also records
+how the run wrote its pages (minify, variants, locales, mirror, base URL) and
+where to (output/ and its archive, or the --sink destinations, the page store
+and the manifest), so repaired pages go everywhere the fallback versions went:
+directories and buckets are written again, archives are rebuilt with the new
+files, manifest.json gets their new hashes and leaderboards.json is redone with
+their new scores. The report is updated to list whatever failed again.
+"""
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+from slugify import slugify
+from analytics import PairAnalytics, current_analytics
+from backends import BACKENDS, get_backend
+from generate_comparisons import emit_output, repair_pages
+from locales import Localizer
+from manifest import BuildManifest
+from page_store import PageStore
+from run_report import RunReport
+from sinks import DirectorySink, is_archive_spec, open_sink, rewrite_archive
+from usage import UsageStats, current_usage
+from variants import VariantPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate only the failed blocks of a run")
+    parser.add_argument('report', nargs='?', default='run_report.json', help="Run report written by generate_comparisons.py")
+    parser.add_argument('--output', help="Only rewrite the pages in this directory instead of where the run wrote them")
+    parser.add_argument('--store', default=os.getenv('PAGE_STORE_PATH'),
+                        help="Page store to update as well (default: the one the run used)")
+    # The rest default to what the run report says the run used
+    parser.add_argument('--minify', action='store_true', default=None, help="Pages were generated with --minify")
+    parser.add_argument('--variants', type=int, metavar='K', help="Variant pool size the run used")
+    parser.add_argument('--locales', help="Extra languages the run was generated in, e.g. de,fr")
+    parser.add_argument('--mirror', action='store_true', default=None, help="The run was generated with --mirror")
+    parser.add_argument('--base-url', help="Base URL the run used")
+    parser.add_argument('--backend', choices=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    report = RunReport.load(args.report)
+    if not report.failed_pages():
+        print("Nothing to repair")
+        return
+
+    options = report.options
+    report_dir = Path(args.report).resolve().parent
+    minify = args.minify if args.minify is not None else options.get('minify', False)
+    variant_pool_size = args.variants if args.variants is not None else options.get('variants', 0)
+    locales = ([locale.strip() for locale in args.locales.split(',') if locale.strip()]
+               if args.locales is not None else options.get('locales', []))
+    mirror = args.mirror if args.mirror is not None else options.get('mirror', False)
+    base_url = args.base_url if args.base_url is not None else options.get('base_url')
+    store_path = args.store or options.get('store')
+    store = PageStore(store_path) if store_path else None
+
+    backend = get_backend(args.backend or options.get('backend'))
+    usage = UsageStats()
+    current_usage.set(usage)
+    variants = VariantPool.build(backend, variant_pool_size, store) if variant_pool_size else None
+    localizer = Localizer.build(backend, locales) if locales else None
+
+    manifest_path = Path(options.get('manifest') or report_dir / "manifest.json")
+    manifest = BuildManifest.load(manifest_path) or BuildManifest()
+    # Repaired category scores replace the placeholder ones as the pages are repaired
+    scores_path = Path(options['scores']) if options.get('scores') else None
+    analytics = PairAnalytics.load(scores_path) if scores_path and scores_path.exists() else None
+    current_analytics.set(analytics)
+
+    # Archives can't be appended to, so their files are collected in a spool
+    # directory and the archives are rebuilt from it at the end
+    if args.output or not options.get('sinks'):
+        sinks = [DirectorySink(args.output or options.get('output') or report_dir / "output")]
+        archives = [options['archive']] if options.get('archive') and not args.output else []
+    else:
+        sinks, archives = [], []
+        for spec in options['sinks']:
+            if spec is None:
+                print("Skipping the tar stream on stdout: it can't be written again")
+            elif is_archive_spec(spec):
+                archives.append(spec)
+            else:
+                sinks.append(open_sink(spec))
+    spool = tempfile.TemporaryDirectory(prefix="repair-") if archives else None
+    if spool:
+        sinks.append(DirectorySink(spool.name))
+
+    files = []
+    try:
+        print(f"Repairing {len(report.failed_pages())} pages")
+        for item1, item2, pages in repair_pages(report, backend, variants, localizer=localizer,
+                                                mirror=mirror, base_url=base_url):
+            for filename, html_content in pages.items():
+                files.extend(emit_output(filename, html_content, sinks, manifest, store, minify))
+            print(f"Repaired: {slugify(item1)}-vs-{slugify(item2)}.html")
+        if analytics:
+            leaderboards = json.dumps(analytics.leaderboards(), indent=2)
+            files.extend(emit_output("leaderboards.json", leaderboards, sinks, manifest, store, minify))
+        for sink in sinks:
+            sink.close()
+        for archive in archives:
+            rewrite_archive(archive, spool.name, files)
+            print(f"Updated {archive}")
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    finally:
+        if spool:
+            spool.cleanup()
+
+    manifest.write(manifest_path)
+    if analytics:
+        analytics.save(scores_path)
+    report.write(args.report)
+    print()
+    print("\n".join(report.report()))
+    print()
+    print("\n".join(usage.report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import json
+import threading
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class RunReport:
+    """Which blocks of which pages fell back to generic text during a run.
+
+    The generate_* functions record a fallback whenever they substitute
+    placeholder content for a failed call. Pages with fallbacks keep their full
+    page data, so repair.py can regenerate just the failed blocks and re-render
+    the page without repeating the blocks that worked.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        # (item1, item2) -> list of {"block", "detail", "error"}; None for run-wide blocks
+        self.fallbacks: Dict[Optional[Tuple[str, str]], List[Dict]] = {}
+        self.page_data: Dict[Tuple[str, str], Dict] = {}
+        # How the run rendered and wrote its pages, so repair.py can do the same
+        self.options: Dict = {}
+        self._lock = threading.Lock()
+
+    def record_fallback(self, block: str, item1: Optional[str], item2: Optional[str],
+                        error: Exception, detail: Optional[str] = None):
+        key = (item1, item2) if item1 is not None else None
+        with self._lock:
+            self.fallbacks.setdefault(key, []).append({"block": block, "detail": detail, "error": str(error)})
+
+    def record_page(self, item1: str, item2: str, data: Dict):
+        with self._lock:
+            self.pages += 1
+            if (item1, item2) in self.fallbacks:
+                self.page_data[(item1, item2)] = data
+
+    def resolve(self, item1: str, item2: str, data: Dict, remaining: List[Dict]):
+        """Replace a page's data and fallbacks after a repair attempt"""
+        with self._lock:
+            if remaining:
+                self.fallbacks[(item1, item2)] = remaining
+                self.page_data[(item1, item2)] = data
+            else:
+                self.fallbacks.pop((item1, item2), None)
+                self.page_data.pop((item1, item2), None)
+
+    def failed_pages(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [key for key in self.fallbacks if key is not None and key in self.page_data]
+
+    def by_block(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entries in self.fallbacks.values():
+            for entry in entries:
+                counts[entry["block"]] = counts.get(entry["block"], 0) + 1
+        return counts
+
+    def report(self) -> List[str]:
+        failed = self.failed_pages()
+        lines = [f"Fallbacks: {len(failed)} of {self.pages} pages have generic text in place of failed blocks"]
+        for block, count in sorted(self.by_block().items()):
+            lines.append(f"    {block:<20} {count:>6,}")
+        if failed:
+            lines.append("  run repair.py on the run report to regenerate just those blocks")
+        return lines
+
+    def to_json(self) -> Dict:
+        return {
+            "options": self.options,
+            "pages": self.pages,
+            "fallback_pages": len(self.failed_pages()),
+            "fallbacks_by_block": self.by_block(),
+            "run_fallbacks": self.fallbacks.get(None, []),
+            "failed": [
+                {"item1": item1, "item2": item2, "fallbacks": self.fallbacks[(item1, item2)],
+                 "data": self.page_data[(item1, item2)]}
+                for item1, item2 in self.failed_pages()
+            ]
+        }
+
+    def write(self, path):
+        Path(path).write_text(json.dumps(self.to_json(), indent=2), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path) -> 'RunReport':
+        document = json.loads(Path(path).read_text(encoding='utf-8'))
+        report = cls()
+        report.pages = document.get("pages", 0)
+        report.options = document.get("options", {})
+        if document.get("run_fallbacks"):
+            report.fallbacks[None] = document["run_fallbacks"]
+        for page in document.get("failed", []):
+            key = (page["item1"], page["item2"])
+            report.fallbacks[key] = page["fallbacks"]
+            report.page_data[key] = page["data"]
+        return report
+
+
+# Report of the run in progress, if main() is collecting one
+current_report: ContextVar[Optional[RunReport]] = ContextVar('current_report', default=None)
+
+
+def record_fallback(block: str, item1: Optional[str], item2: Optional[str], error: Exception,
+                    detail: Optional[str] = None):
+    report = current_report.get()
+    if report is not None:
+        report.record_fallback(block, item1, item2, error, detail)
+
+
+def record_page(item1: str, item2: str, data: Dict):
+    report = current_report.get()
+    if report is not None:
+        report.record_page(item1, item2, data)
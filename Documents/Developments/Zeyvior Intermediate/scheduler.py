@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, wait as wait_for_futures
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+class QuotaExceededError(ValueError):
+    pass
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+@dataclass
+class SchedulerConfig:
+    """How generation work from concurrent jobs shares the worker pool"""
+    workers: int = 8
+    # Jobs of at most this many pages go to the priority lane
+    small_job_pages: int = 20
+    # With both lanes busy, the priority lane gets this many tasks for every one
+    # task of the normal lane, so large jobs keep moving
+    priority_share: int = 3
+    client_max_in_flight: Optional[int] = None
+    client_page_quota: Optional[int] = None
+    quota_window_seconds: float = 86400.0
+
+    @classmethod
+    def from_env(cls) -> 'SchedulerConfig':
+        return cls(
+            workers=_env_int('SCHEDULER_WORKERS', None) or _env_int('GENERATION_CONCURRENCY', 8),
+            small_job_pages=_env_int('SMALL_JOB_PAGES', 20),
+            priority_share=_env_int('PRIORITY_SHARE', 3),
+            client_max_in_flight=_env_int('CLIENT_MAX_IN_FLIGHT', None),
+            client_page_quota=_env_int('CLIENT_PAGE_QUOTA', None),
+            quota_window_seconds=float(os.getenv('CLIENT_QUOTA_WINDOW_SECONDS', '86400')),
+        )
+
+
+class MemoryQuotaLedger:
+    """Quota charges kept in this process; PageStore has the same methods for charges shared by all workers"""
+
+    def __init__(self):
+        self._charges: Dict[str, Deque[List]] = {}
+        self._lock = threading.Lock()
+
+    def reserve_quota(self, client: str, pages: int, quota: int, window: float,
+                      now: Optional[float] = None) -> Tuple[Optional[List], int]:
+        now = time.time() if now is None else now
+        with self._lock:
+            history = self._charges.setdefault(client, deque())
+            while history and history[0][0] < now - window:
+                history.popleft()
+            used = sum(count for _, count in history)
+            if used + pages > quota:
+                return None, used
+            reservation = [now, pages]
+            history.append(reservation)
+            return reservation, used
+
+    def settle_quota(self, reservation: List, pages: int):
+        with self._lock:
+            reservation[1] = min(reservation[1], pages)
+
+
+class _Task:
+    __slots__ = ('fn', 'args', 'kwargs', 'future', 'cost')
+
+    def __init__(self, fn: Callable, args: Tuple, kwargs: Dict, cost: float):
+        self.fn, self.args, self.kwargs, self.cost = fn, args, kwargs, cost
+        self.future = Future()
+
+
+class _Job:
+    def __init__(self, client: str, lane: str, weight: float, charge=None):
+        self.client = client
+        self.lane = lane
+        self.weight = weight
+        self.queue: Deque[_Task] = deque()
+        self.deficit = 0.0
+        # Whether this visit's quantum has been added to the deficit yet
+        self.credited = False
+        self.closed = False
+        self.futures: Set[Future] = set()
+        # The quota reservation made at admission, and the tasks that
+        # completed; the reservation is cut down to those once the job is done
+        self.charge = charge
+        self.completed = 0
+
+
+class FairScheduler:
+    """Runs page tasks from many jobs on one worker pool, interleaved fairly.
+
+    Within each lane jobs take turns by deficit round-robin: on every turn a job
+    earns `weight` credit and runs tasks while its credit covers their cost, so
+    a 1,770-page job and a 3-page job submitted together progress at the same
+    rate instead of one after the other. Small jobs get a priority lane and
+    background jobs an idle lane, clients can be capped on concurrent tasks and
+    on pages per time window. A job reserves its pages against the quota when it
+    is admitted and is charged only for the tasks that completed once it ends.
+    Quotas are kept in `ledger`: pass the PageStore so that every worker process
+    charges the same totals, or they are counted per process.
+    """
+
+    def __init__(self, config: Optional[SchedulerConfig] = None, ledger=None):
+        self.config = config or SchedulerConfig.from_env()
+        self.ledger = ledger or MemoryQuotaLedger()
+        self._lock = threading.Condition()
+        self._active: Dict[str, Deque[_Job]] = {'priority': deque(), 'normal': deque(), 'idle': deque()}
+        self._priority_streak = 0
+        self._client_in_flight: Dict[str, int] = {}
+        self._workers = []
+
+    def open_job(self, client: str, pages: int, weight: float = 1.0, background: bool = False) -> 'JobExecutor':
+        """Admit a job of `pages` pages for a client, or raise QuotaExceededError.
+
+        Background jobs skip the quota and only run on workers that the other
+        lanes leave idle.
+        """
+        charge = None
+        quota = self.config.client_page_quota
+        if quota is not None and not background:
+            charge, used = self.ledger.reserve_quota(client, pages, quota, self.config.quota_window_seconds)
+            if charge is None:
+                raise QuotaExceededError(
+                    f"Job of {pages} pages exceeds the quota of {quota} pages per "
+                    f"{self.config.quota_window_seconds / 3600:g} hours ({used} used)"
+                )
+        with self._lock:
+            self._start_workers()
+        if background:
+            lane = 'idle'
+        else:
+            lane = 'priority' if pages <= self.config.small_job_pages else 'normal'
+        return JobExecutor(self, _Job(client, lane, weight, charge))
+
+    def _start_workers(self):
+        while len(self._workers) < self.config.workers:
+            worker = threading.Thread(target=self._work, name=f"scheduler-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _submit(self, job: _Job, task: _Task):
+        with self._lock:
+            if job.closed:
+                raise RuntimeError("cannot schedule new tasks after shutdown")
+            if not job.queue:
+                self._active[job.lane].append(job)
+            job.queue.append(task)
+            job.futures.add(task.future)
+            self._lock.notify()
+
+    def _pick_from(self, lane: str) -> Optional[Tuple[_Job, _Task]]:
+        active = self._active[lane]
+        cap = self.config.client_max_in_flight
+        skipped = 0
+        while active and skipped < len(active):
+            job = active[0]
+            if cap is not None and self._client_in_flight.get(job.client, 0) >= cap:
+                active.rotate(-1)
+                skipped += 1
+                continue
+            skipped = 0
+            if not job.credited:
+                job.deficit += job.weight
+                job.credited = True
+            task = job.queue[0]
+            if task.cost <= job.deficit:
+                job.queue.popleft()
+                job.deficit -= task.cost
+                if not job.queue:
+                    active.popleft()
+                    job.deficit, job.credited = 0.0, False
+                return job, task
+            # Credit used up for this turn; move on to the next job
+            job.credited = False
+            active.rotate(-1)
+        return None
+
+    def _pick(self) -> Optional[Tuple[_Job, _Task]]:
+        lanes = ('priority', 'normal')
+        if self._active['normal'] and self._priority_streak >= self.config.priority_share:
+            lanes = ('normal', 'priority')
+        for lane in lanes:
+            picked = self._pick_from(lane)
+            if picked:
+                self._priority_streak = self._priority_streak + 1 if lane == 'priority' else 0
+                return picked
+        # Background work only gets workers nothing else wants
+        return self._pick_from('idle')
+
+    def _work(self):
+        while True:
+            with self._lock:
+                picked = self._pick()
+                while picked is None:
+                    self._lock.wait()
+                    picked = self._pick()
+                job, task = picked
+                self._client_in_flight[job.client] = self._client_in_flight.get(job.client, 0) + 1
+
+            completed = False
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    result = task.fn(*task.args, **task.kwargs)
+                except BaseException as e:
+                    task.future.set_exception(e)
+                else:
+                    task.future.set_result(result)
+                    completed = True
+
+            with self._lock:
+                self._client_in_flight[job.client] -= 1
+                job.futures.discard(task.future)
+                job.completed += completed
+                self._settle(job)
+                # A client below its cap may have tasks waiting
+                self._lock.notify_all()
+
+    def _close(self, job: _Job, cancel_futures: bool):
+        with self._lock:
+            job.closed = True
+            if cancel_futures and job.queue:
+                for task in job.queue:
+                    task.future.cancel()
+                    job.futures.discard(task.future)
+                job.queue.clear()
+                if job in self._active[job.lane]:
+                    self._active[job.lane].remove(job)
+            self._settle(job)
+            return set(job.futures)
+
+    def _settle(self, job: _Job):
+        # Failed and cancelled tasks, and pages never submitted, are refunded
+        if job.charge is not None and job.closed and not job.futures:
+            self.ledger.settle_quota(job.charge, job.completed)
+            job.charge = None
+
+    def _wait_settled(self, job: _Job):
+        with self._lock:
+            self._lock.wait_for(lambda: not job.futures)
+
+    def queued(self) -> int:
+        with self._lock:
+            return sum(len(job.queue) for lane in self._active.values() for job in lane)
+
+
+class JobExecutor(Executor):
+    """The Executor one job submits its page tasks through"""
+
+    def __init__(self, scheduler: FairScheduler, job: _Job):
+        self._scheduler = scheduler
+        self._job = job
+        self.max_workers = scheduler.config.workers
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        task = _Task(fn, args, kwargs, cost=1.0)
+        self._scheduler._submit(self._job, task)
+        return task.future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        running = self._scheduler._close(self._job, cancel_futures)
+        if wait:
+            wait_for_futures(running)
+            # The last worker settles the job's quota just after its future resolves
+            self._scheduler._wait_settled(self._job)
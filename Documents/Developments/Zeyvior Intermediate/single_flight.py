@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Runs at most one computation per key and shares its outcome with concurrent callers.
+
+    The first caller for a key does the work; callers arriving while it is in flight
+    block until it finishes and get the same result, or the same exception. Nothing
+    is cached: once the work finishes the key is forgotten and the next call starts
+    afresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Return fn()'s result for key and whether it was shared from another caller's call"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.started += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), True
+        return self._run(key, future, fn), False
+
+    def try_do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[bool, Optional[T]]:
+        """Run fn() for key unless a call for it is in flight already; returns (ran, result).
+
+        For callers that must not wait on another caller, such as tasks on a
+        bounded worker pool whose leader may itself be waiting for a worker.
+        """
+        with self._lock:
+            if key in self._calls:
+                return False, None
+            future = self._calls[key] = Future()
+            self.started += 1
+        return True, self._run(key, future, fn)
+
+    def _run(self, key: Hashable, future: Future, fn: Callable[[], T]) -> T:
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class SharedFlight:
+    """SingleFlight across worker processes, through leases in a shared store (a PageStore).
+
+    The caller that takes a key's lease runs fn and saves its bytes for the
+    others, which poll until the lease is released and then return those bytes.
+    The leader renews the lease while it works; if its process dies the lease
+    runs out and a waiting caller takes over. If fn fails, the next waiter runs
+    it again instead of sharing the exception.
+    """
+
+    def __init__(self, store, lease_seconds: float = 60.0, poll_interval: float = 0.5,
+                 keep_seconds: float = 300.0):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.keep_seconds = keep_seconds
+
+    def do(self, key: str, fn: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """Return fn()'s bytes for key and whether they came from another caller's call"""
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        arrived = time.time()
+        while not self.store.acquire_lease(key, owner, self.lease_seconds):
+            time.sleep(self.poll_interval)
+            if not self.store.lease_held(key):
+                result = self.store.get_job_result(key, since=arrived)
+                if result is not None:
+                    return result, True
+        # The leader may have finished and released the lease between two polls
+        result = self.store.get_job_result(key, since=arrived)
+        if result is not None:
+            self.store.release_lease(key, owner)
+            return result, True
+
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(self.lease_seconds / 3):
+                self.store.acquire_lease(key, owner, self.lease_seconds)
+
+        renewer = threading.Thread(target=renew, name="lease-renewal", daemon=True)
+        renewer.start()
+        try:
+            result = fn()
+            self.store.put_job_result(key, result, self.keep_seconds)
+            return result, False
+        finally:
+            done.set()
+            renewer.join()
+            self.store.release_lease(key, owner)
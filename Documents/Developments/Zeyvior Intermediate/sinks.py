@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Where a run's files go: a directory, a ZIP, a tar stream or an S3-compatible bucket.
+
+Every sink takes whole files from several threads at once and streams them
+to their destination as they arrive, so nothing is staged on disk first:
+
+    output/               directory tree
+    site.zip              ZIP, deflated on the writing threads
+    site.tar, site.tar.zst, -
+                          tar file, zstd-compressed tar, or a tar stream on stdout
+    s3://bucket/prefix    S3-compatible object store (S3_ENDPOINT_URL, e.g. MinIO)
+"""
+import datetime
+import hashlib
+import hmac
+import mimetypes
+import os
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+import httpx
+from archive import ZipStreamWriter, archive_workers, deflate_entry, zstandard
+
+_CONTENT_TYPES = {'.gz': 'application/gzip', '.br': 'application/x-brotli', '.json': 'application/json'}
+
+
+class OutputSink:
+    """Destination for the files of a run; write() may be called from many threads"""
+
+    # The --sink argument that reaches the same destination again, for repair.py
+    spec: Optional[str] = None
+
+    def write(self, filename: str, data: bytes):
+        raise NotImplementedError
+
+    def close(self):
+        """Finish the output; raises if any write failed"""
+
+    def abort(self):
+        """Finish what was written so far after a failed run, without raising"""
+        try:
+            self.close()
+        except Exception as e:
+            print(f"Closing {self} failed: {str(e)}")
+
+
+class DirectorySink(OutputSink):
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.spec = str(self.root.resolve())
+
+    def write(self, filename: str, data: bytes):
+        path = self.root / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def __str__(self):
+        return f"{self.root}/"
+
+
+class ZipSink(OutputSink):
+    """Deflates on the calling thread and appends under a lock, so writers compress in parallel"""
+
+    def __init__(self, path, level: int = 6):
+        self.path = Path(path)
+        self.spec = str(self.path.resolve())
+        self.level = level
+        self.mtime = time.time()
+        self._file = open(self.path, 'wb')
+        self._writer = ZipStreamWriter(self._file)
+        self._lock = threading.Lock()
+
+    def write(self, filename: str, data: bytes):
+        entry = deflate_entry(filename, data, self.mtime, self.level)
+        with self._lock:
+            self._writer.add(entry)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._writer.close()
+                self._file.close()
+
+    def __str__(self):
+        return str(self.path)
+
+
+class TarSink(OutputSink):
+    """A tar stream, optionally zstd-compressed, written in arrival order"""
+
+    def __init__(self, out: BinaryIO, name: str, compress: bool = False, owns_file: bool = True):
+        self.name = name
+        # A stream on stdout can't be written again
+        self.spec = str(Path(name).resolve()) if owns_file else None
+        self._out = out
+        self._owns_file = owns_file
+        self._stream = None
+        if compress:
+            if zstandard is None:
+                raise RuntimeError("tar.zst output needs the zstandard package (pip install zstandard)")
+            workers = archive_workers()
+            compressor = zstandard.ZstdCompressor(level=10, threads=workers if workers > 1 else 0)
+            self._stream = compressor.stream_writer(out, closefd=False)
+        self._tar = tarfile.open(fileobj=self._stream or out, mode='w|')
+        self.mtime = time.time()
+        self._lock = threading.Lock()
+
+    def write(self, filename: str, data: bytes):
+        info = tarfile.TarInfo(filename)
+        info.size = len(data)
+        info.mtime = self.mtime
+        info.mode = 0o644
+        with self._lock:
+            self._tar.addfile(info, BytesIO(data))
+
+    def close(self):
+        with self._lock:
+            if self._tar.closed:
+                return
+            self._tar.close()
+            if self._stream:
+                self._stream.close()
+            if self._owns_file:
+                self._out.close()
+            else:
+                self._out.flush()
+
+    def __str__(self):
+        return self.name
+
+
+@dataclass
+class S3Config:
+    """Endpoint and credentials for S3Sink, from the usual AWS variables"""
+    access_key: str
+    secret_key: str
+    region: str = 'us-east-1'
+    # Unset means AWS itself; point it at MinIO or another S3-compatible store
+    endpoint_url: Optional[str] = None
+    # Uploads in flight at once
+    concurrency: int = 16
+
+    @classmethod
+    def from_env(cls) -> 'S3Config':
+        access_key, secret_key = os.getenv('AWS_ACCESS_KEY_ID'), os.getenv('AWS_SECRET_ACCESS_KEY')
+        if not access_key or not secret_key:
+            raise RuntimeError("S3 output needs AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY")
+        return cls(
+            access_key=access_key,
+            secret_key=secret_key,
+            region=os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION') or 'us-east-1',
+            endpoint_url=os.getenv('S3_ENDPOINT_URL'),
+            concurrency=int(os.getenv('S3_UPLOAD_CONCURRENCY', '16')),
+        )
+
+    @property
+    def endpoint(self) -> str:
+        return (self.endpoint_url or f"https://s3.{self.region}.amazonaws.com").rstrip('/')
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def sign_v4(method: str, url: str, headers: dict, payload_hash: str, access_key: str, secret_key: str,
+            region: str, now: datetime.datetime, service: str = 's3') -> str:
+    """AWS Signature Version 4 Authorization header for a request without a query string.
+
+    headers must include host, x-amz-content-sha256 and x-amz-date; all of
+    them are signed.
+    """
+    canonical_headers = {name.lower(): ' '.join(str(value).split()) for name, value in headers.items()}
+    signed_headers = ';'.join(sorted(canonical_headers))
+    canonical_request = '\n'.join([
+        method,
+        quote(urlsplit(url).path or '/', safe='/-_.~'),
+        '',
+        ''.join(f"{name}:{canonical_headers[name]}\n" for name in sorted(canonical_headers)),
+        signed_headers,
+        payload_hash,
+    ])
+    date = now.strftime('%Y%m%d')
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', now.strftime('%Y%m%dT%H%M%SZ'), scope,
+                                hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
+    key = _hmac(_hmac(_hmac(_hmac(('AWS4' + secret_key).encode('utf-8'), date), region), service), 'aws4_request')
+    signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, SignedHeaders={signed_headers}, Signature={signature}"
+
+
+class S3Sink(OutputSink):
+    """PUTs each file as an object, config.concurrency uploads at a time.
+
+    Uses path-style URLs (endpoint/bucket/key), which MinIO and other
+    S3-compatible stores accept. write() hands the file to the upload pool
+    and returns once no more than a few uploads per worker are queued, so a
+    fast generator can't pile a whole build up in memory. Failed uploads are
+    retried twice; close() waits for the rest and raises the first failure.
+    """
+
+    RETRIES = 2
+
+    def __init__(self, bucket: str, prefix: str = '', config: Optional[S3Config] = None):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.spec = f"s3://{self.bucket}/{self.prefix}"
+        self.config = config or S3Config.from_env()
+        self._client = httpx.Client(timeout=60, limits=httpx.Limits(max_connections=self.config.concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=self.config.concurrency, thread_name_prefix="s3-upload")
+        self._slots = threading.BoundedSemaphore(self.config.concurrency * 4)
+        self._errors: List[BaseException] = []
+        self._lock = threading.Lock()
+
+    def url(self, filename: str) -> str:
+        key = f"{self.prefix}/{filename}" if self.prefix else filename
+        return f"{self.config.endpoint}/{self.bucket}/{key}"
+
+    def _put(self, filename: str, data: bytes):
+        url = self.url(filename)
+        payload_hash = hashlib.sha256(data).hexdigest()
+        suffix = os.path.splitext(filename)[1]
+        content_type = _CONTENT_TYPES.get(suffix) or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for attempt in range(self.RETRIES + 1):
+            now = datetime.datetime.now(datetime.timezone.utc)
+            headers = {'host': urlsplit(url).netloc, 'x-amz-content-sha256': payload_hash,
+                       'x-amz-date': now.strftime('%Y%m%dT%H%M%SZ')}
+            headers['authorization'] = sign_v4('PUT', url, headers, payload_hash, self.config.access_key,
+                                               self.config.secret_key, self.config.region, now)
+            headers['content-type'] = content_type
+            try:
+                response = self._client.put(url, content=data, headers=headers)
+                if response.status_code < 500 or attempt == self.RETRIES:
+                    response.raise_for_status()
+                    break
+            except httpx.TransportError:
+                if attempt == self.RETRIES:
+                    raise
+            time.sleep(0.5 * 2 ** attempt)
+
+    def _done(self, future: Future):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self._errors.append(future.exception())
+
+    def write(self, filename: str, data: bytes):
+        if self._errors:
+            raise self._errors[0]
+        self._slots.acquire()
+        self._executor.submit(self._put, filename, data).add_done_callback(self._done)
+
+    def abort(self):
+        # Uploads not started yet are dropped; running ones finish
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._client.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._client.close()
+        if self._errors:
+            raise RuntimeError(f"{len(self._errors)} uploads to {self} failed, "
+                               f"first: {self._errors[0]}") from self._errors[0]
+
+    def __str__(self):
+        return f"s3://{self.bucket}/{self.prefix}"
+
+
+def open_sink(spec: str) -> OutputSink:
+    """A sink from a --sink argument: s3://bucket/prefix, *.zip, *.tar, *.tar.zst, - or a directory"""
+    if spec.startswith('s3://'):
+        bucket, _, prefix = spec[len('s3://'):].partition('/')
+        return S3Sink(bucket, prefix)
+    if spec == '-':
+        return TarSink(sys.stdout.buffer, "tar stream on stdout", owns_file=False)
+    if spec.endswith('.zip'):
+        return ZipSink(spec)
+    if spec.endswith('.tar') or spec.endswith('.tar.zst'):
+        return TarSink(open(spec, 'wb'), spec, compress=spec.endswith('.zst'))
+    return DirectorySink(spec)
+
+
+def is_archive_spec(spec: str) -> bool:
+    return spec.endswith('.zip') or spec.endswith('.tar') or spec.endswith('.tar.zst')
+
+
+def _archive_entries(path: Path) -> Iterator[Tuple[str, bytes]]:
+    """(name, data) of every file in a .zip, .tar or .tar.zst archive, one at a time"""
+    if path.name.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, archive.read(info)
+        return
+    with open(path, 'rb') as f:
+        stream = f
+        if path.name.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError("tar.zst output needs the zstandard package (pip install zstandard)")
+            stream = zstandard.ZstdDecompressor().stream_reader(f)
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if member.isfile():
+                    yield member.name, tar.extractfile(member).read()
+
+
+def rewrite_archive(path, updates_dir, filenames: Iterable[str]) -> Path:
+    """Replace or add `filenames`, read from updates_dir, in an existing .zip, .tar or .tar.zst archive.
+
+    Archives can't be changed in place, so the old entries are copied one at a
+    time into a new archive next to it, which then takes its place.
+    """
+    path, updates_dir = Path(path), Path(updates_dir)
+    pending = dict.fromkeys(filenames)
+    temp_path = path.with_name(f".{path.name}.partial")
+    if path.name.endswith('.zip'):
+        sink = ZipSink(temp_path)
+    else:
+        sink = TarSink(open(temp_path, 'wb'), str(temp_path), compress=path.name.endswith('.zst'))
+    try:
+        for name, data in _archive_entries(path):
+            if name in pending:
+                pending.pop(name)
+                data = (updates_dir / name).read_bytes()
+            sink.write(name, data)
+        for name in pending:
+            sink.write(name, (updates_dir / name).read_bytes())
+        sink.close()
+    except BaseException:
+        sink.abort()
+        temp_path.unlink(missing_ok=True)
+        raise
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import tempfile
+from datetime import date
+from typing import Callable, List, Optional
+from xml.sax.saxutils import escape
+from jinja2 import Template
+from slugify import slugify
+
+# The sitemaps.org protocol caps every sitemap file at 50,000 URLs
+SITEMAP_SHARD_SIZE = 50000
+HUB_PAGE_SIZE = 100
+
+HUB_TEMPLATE = Template('''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{{ title }}{% if page > 1 %} - Page {{ page }}{% endif %}</title>
+    <meta name="description" content="{{ description }}">
+    <link rel="stylesheet" href="styles.css">
+    {% if prev_url %}<link rel="prev" href="{{ prev_url }}">{% endif %}
+    {% if next_url %}<link rel="next" href="{{ next_url }}">{% endif %}
+</head>
+<body>
+    <div class="container">
+        <h1>{{ title }}</h1>
+        <p>{{ description }}</p>
+        <ul class="hub-links">
+            {% for link in links %}
+            <li><a href="{{ link.url }}">{{ link.text }}</a></li>
+            {% endfor %}
+        </ul>
+        <nav class="hub-pagination">
+            {% if prev_url %}<a href="{{ prev_url }}" rel="prev">&larr; Previous</a>{% endif %}
+            <span>Page {{ page }} of {{ pages }}</span>
+            {% if next_url %}<a href="{{ next_url }}" rel="next">Next &rarr;</a>{% endif %}
+            {% if index_url %}<a href="{{ index_url }}">All comparisons</a>{% endif %}
+        </nav>
+    </div>
+</body>
+</html>
+''')
+
+INDEX_FILENAME = "comparisons.html"
+
+
+def hub_filename(keyword_slug: str, page: int = 1) -> str:
+    if page == 1:
+        return f"{keyword_slug}-comparisons.html"
+    return f"{keyword_slug}-comparisons-{page}.html"
+
+
+def index_filename(page: int = 1) -> str:
+    if page == 1:
+        return INDEX_FILENAME
+    return f"comparisons-{page}.html"
+
+
+def _page_count(total: int, page_size: int) -> int:
+    return max(1, -(-total // page_size))
+
+
+class SitemapWriter:
+    """Streams URLs into sitemap shards of at most `shard_size` URLs plus a sitemap index"""
+
+    def __init__(self, write: Callable[[str, str], List[str]], base_url: str,
+                 shard_size: int = SITEMAP_SHARD_SIZE):
+        self.write = write
+        self.base_url = base_url.rstrip('/') + '/'
+        self.shard_size = shard_size
+        self.lastmod = date.today().isoformat()
+        self.shards: List[str] = []
+        self.files_written: List[str] = []
+        self._urls: List[str] = []
+
+    def add(self, filename: str):
+        self._urls.append(f"<url><loc>{escape(self.base_url + filename)}</loc>"
+                          f"<lastmod>{self.lastmod}</lastmod></url>")
+        if len(self._urls) >= self.shard_size:
+            self._flush_shard()
+
+    def _flush_shard(self):
+        if not self._urls:
+            return
+        shard_name = f"sitemap-{len(self.shards) + 1}.xml"
+        content = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                   + "\n".join(self._urls) + "\n</urlset>\n")
+        self.files_written.extend(self.write(shard_name, content))
+        self.shards.append(shard_name)
+        self._urls = []
+
+    def close(self) -> List[str]:
+        self._flush_shard()
+        entries = "\n".join(
+            f"<sitemap><loc>{escape(self.base_url + shard)}</loc><lastmod>{self.lastmod}</lastmod></sitemap>"
+            for shard in self.shards
+        )
+        content = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                   + entries + "\n</sitemapindex>\n")
+        self.files_written.extend(self.write("sitemap.xml", content))
+        return self.files_written
+
+
+class SiteIndexBuilder:
+    """Builds paginated per-keyword hub pages and sharded sitemaps from a stream of pairs.
+
+    Pairs are fed one at a time through add_pair() as pages are generated. Sitemap
+    URLs are written out shard by shard and hub entries are spooled to a temporary
+    SQLite file, so memory stays bounded by the hub page size and the sitemap shard
+    size no matter how many pairs go through.
+    """
+
+    def __init__(self, write: Callable[[str, str], List[str]], base_url: Optional[str] = None,
+                 hub_page_size: int = HUB_PAGE_SIZE, sitemap_shard_size: int = SITEMAP_SHARD_SIZE):
+        self.write = write
+        self.hub_page_size = hub_page_size
+        self.sitemap = SitemapWriter(write, base_url, sitemap_shard_size) if base_url else None
+        self.files_written: List[str] = []
+
+        spool_fd, self._spool_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(spool_fd)
+        self._db = sqlite3.connect(self._spool_path)
+        self._db.execute('''CREATE TABLE entries (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword_slug TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            url TEXT NOT NULL,
+            text TEXT NOT NULL)''')
+
+    def add_pair(self, item1: str, item2: str, filename: str):
+        text = f"{item1} vs {item2}"
+        self._db.executemany(
+            "INSERT INTO entries (keyword_slug, keyword, url, text) VALUES (?, ?, ?, ?)",
+            [(slugify(item1), item1, filename, text), (slugify(item2), item2, filename, text)]
+        )
+        if self.sitemap:
+            self.sitemap.add(filename)
+
+    def _emit(self, filename: str, content: str):
+        self.files_written.extend(self.write(filename, content))
+        if self.sitemap:
+            self.sitemap.add(filename)
+
+    def _write_hubs(self):
+        self._db.execute("CREATE INDEX entries_by_keyword ON entries (keyword_slug, seq)")
+        keywords = self._db.execute(
+            "SELECT keyword_slug, MIN(keyword), COUNT(*) FROM entries GROUP BY keyword_slug ORDER BY keyword_slug"
+        )
+        for keyword_slug, keyword, total in keywords:
+            pages = _page_count(total, self.hub_page_size)
+            rows = self._db.execute(
+                "SELECT url, text FROM entries WHERE keyword_slug = ? ORDER BY seq", (keyword_slug,)
+            )
+            for page in range(1, pages + 1):
+                links = [{'url': url, 'text': text} for url, text in rows.fetchmany(self.hub_page_size)]
+                self._emit(hub_filename(keyword_slug, page), HUB_TEMPLATE.render(
+                    title=f"{keyword} Comparisons",
+                    description=f"Every AI-powered comparison of {keyword} with other methods.",
+                    links=links,
+                    page=page,
+                    pages=pages,
+                    prev_url=hub_filename(keyword_slug, page - 1) if page > 1 else None,
+                    next_url=hub_filename(keyword_slug, page + 1) if page < pages else None,
+                    index_url=INDEX_FILENAME
+                ))
+
+    def _write_index(self):
+        total = self._db.execute("SELECT COUNT(DISTINCT keyword_slug) FROM entries").fetchone()[0]
+        pages = _page_count(total, self.hub_page_size)
+        keywords = self._db.execute(
+            "SELECT keyword_slug, MIN(keyword) FROM entries GROUP BY keyword_slug ORDER BY keyword_slug"
+        )
+        for page in range(1, pages + 1):
+            links = [{'url': hub_filename(keyword_slug), 'text': f"{keyword} comparisons"}
+                     for keyword_slug, keyword in keywords.fetchmany(self.hub_page_size)]
+            self._emit(index_filename(page), HUB_TEMPLATE.render(
+                title="All Comparisons",
+                description="Browse every AI-powered comparison by method.",
+                links=links,
+                page=page,
+                pages=pages,
+                prev_url=index_filename(page - 1) if page > 1 else None,
+                next_url=index_filename(page + 1) if page < pages else None,
+                index_url=None
+            ))
+
+    def close(self) -> List[str]:
+        """Write hub pages, index pages and sitemaps; returns every filename written"""
+        try:
+            self._write_hubs()
+            self._write_index()
+            if self.sitemap:
+                self.files_written.extend(self.sitemap.close())
+        finally:
+            self._db.close()
+            os.remove(self._spool_path)
+        return self.files_written
@@ -0,0 +1,22 @@
+import os
+import sys
+from pathlib import Path
+import pytest
+
+# The modules live next to app.py rather than in a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """app.py, imported once with a throwaway page store"""
+    previous = os.environ.get('PAGE_STORE_PATH')
+    os.environ['PAGE_STORE_PATH'] = str(tmp_path_factory.mktemp('store') / 'pages.db')
+    try:
+        import app
+    finally:
+        if previous is None:
+            del os.environ['PAGE_STORE_PATH']
+        else:
+            os.environ['PAGE_STORE_PATH'] = previous
+    return app
@@ -0,0 +1,44 @@
+def _client_id(app_module, headers, remote_addr='10.0.0.1'):
+    with app_module.app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': remote_addr}):
+        return app_module.client_id()
+
+
+def test_client_id_ignores_headers_without_a_trusted_proxy(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'TRUSTED_PROXY_HOPS', 0)
+    assert _client_id(app_module, {'X-Client-Id': 'someone-else'}) == '10.0.0.1'
+
+
+def test_client_id_uses_the_proxys_header(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'TRUSTED_PROXY_HOPS', 1)
+    assert _client_id(app_module, {'X-Client-Id': 'tenant-7'}) == 'tenant-7'
+    assert _client_id(app_module, {}) == '10.0.0.1'
+
+
+def test_compare_answers_a_matching_etag_with_304(app_module):
+    client = app_module.app.test_client()
+    url = '/compare?category=Side+Hustles&methods=Alpha,Beta'
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag'] and 'max-age' in first.headers['Cache-Control']
+
+    cached = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert client.get(url, headers={'If-None-Match': '"something-else"'}).data == first.data
+    # Only GET and HEAD are conditional
+    assert client.post(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_stored_pages_have_an_etag_per_encoding(app_module):
+    app_module.page_store.put('standalone-etag.html', b'<p>' + b'page ' * 200 + b'</p>')
+    client = app_module.app.test_client()
+    plain = client.get('/standalone/standalone-etag.html', headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get('/standalone/standalone-etag.html', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert plain.headers['ETag'] != gzipped.headers['ETag']
+    assert gzipped.headers['Vary'] == 'Accept-Encoding'
+
+    for response, encoding in ((plain, 'identity'), (gzipped, 'gzip')):
+        revalidated = client.get('/standalone/standalone-etag.html',
+                                 headers={'Accept-Encoding': encoding, 'If-None-Match': response.headers['ETag']})
+        assert revalidated.status_code == 304
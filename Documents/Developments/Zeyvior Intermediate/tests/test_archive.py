@@ -0,0 +1,105 @@
+import tarfile
+import threading
+import time
+import zipfile
+import pytest
+import archive as archive_module
+from archive import (_ZIP64_LIMIT, _ZIP_COUNT_LIMIT, ZipStreamWriter, archive_workers, deflate_entry,
+                     write_archive, write_zip, zstandard)
+
+PAGE = b"<html><body>" + b"<p>A vs B</p>" * 200 + b"</body></html>"
+
+
+def test_write_zip_round_trips(tmp_path):
+    output = tmp_path / "output"
+    (output / "de").mkdir(parents=True)
+    files = {"a-vs-b.html": PAGE, "de/a-vs-b.html": PAGE.replace(b"vs", b"gegen"),
+             "a-vs-b.html.gz": b"\x1f\x8b already compressed"}
+    for name, data in files.items():
+        (output / name).write_bytes(data)
+
+    zip_path = tmp_path / "site.zip"
+    write_zip(zip_path, output, list(files) + ["a-vs-b.html"], workers=2)
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == list(files)
+        assert {name: archive.read(name) for name in files} == files
+        assert archive.getinfo("a-vs-b.html").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("a-vs-b.html.gz").compress_type == zipfile.ZIP_STORED
+
+
+def test_zip64_end_records_past_the_entry_count_limit(tmp_path):
+    zip_path = tmp_path / "many.zip"
+    mtime = time.time()
+    count = _ZIP_COUNT_LIMIT + 10
+    with open(zip_path, 'wb') as out:
+        writer = ZipStreamWriter(out)
+        for i in range(count):
+            writer.add(deflate_entry(f"p{i}.html", b"", mtime))
+        writer.close()
+    with zipfile.ZipFile(zip_path) as archive:
+        assert len(archive.infolist()) == count
+        assert archive.testzip() is None
+
+
+def test_zip64_offsets_past_4_gib(tmp_path):
+    # A sparse file: the entries really sit past 4 GiB without using the disk space
+    zip_path = tmp_path / "large.zip"
+    start = _ZIP64_LIMIT + 1024
+    with open(zip_path, 'wb') as out:
+        out.seek(start)
+        writer = ZipStreamWriter(out)
+        writer.offset = start
+        writer.add(deflate_entry("a-vs-b.html", PAGE, time.time()))
+        writer.add(deflate_entry("b-vs-c.html", PAGE[::-1], time.time()))
+        writer.close()
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.testzip() is None
+        assert archive.getinfo("a-vs-b.html").header_offset == start
+        assert archive.read("a-vs-b.html") == PAGE
+        assert archive.read("b-vs-c.html") == PAGE[::-1]
+
+
+def _site(tmp_path, count=40):
+    output = tmp_path / "output"
+    output.mkdir()
+    names = [f"page-{i}.html" for i in range(count)]
+    for i, name in enumerate(names):
+        (output / name).write_bytes(PAGE + str(i).encode() * i)
+    return output, names
+
+
+def test_parallel_zip_matches_single_threaded(tmp_path, monkeypatch):
+    output, names = _site(tmp_path)
+    threads = set()
+    deflate = archive_module.deflate_entry
+
+    def recording_deflate(*args, **kwargs):
+        threads.add(threading.current_thread().name)
+        return deflate(*args, **kwargs)
+
+    monkeypatch.setattr(archive_module, "deflate_entry", recording_deflate)
+    write_zip(tmp_path / "serial.zip", output, names, workers=1)
+    assert threads == {threading.current_thread().name}
+    threads.clear()
+    write_zip(tmp_path / "parallel.zip", output, names, workers=4)
+    assert all(name.startswith("archive") for name in threads)
+    # Same entries in the same order, so the bytes match too
+    assert (tmp_path / "parallel.zip").read_bytes() == (tmp_path / "serial.zip").read_bytes()
+
+
+def test_archive_workers_default_to_the_cpu_count(monkeypatch):
+    monkeypatch.setenv("ARCHIVE_WORKERS", "3")
+    assert archive_workers() == 3
+    monkeypatch.delenv("ARCHIVE_WORKERS")
+    assert archive_workers() >= 1
+
+
+@pytest.mark.skipif(zstandard is None, reason="needs zstandard")
+def test_tar_zst_round_trips_with_threads(tmp_path):
+    output, names = _site(tmp_path)
+    path = write_archive(tmp_path / "site.tar.zst", output, names + names[:3], workers=4)
+    with open(path, "rb") as f, tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(f), mode="r|") as tar:
+        contents = {member.name: tar.extractfile(member).read() for member in tar}
+    assert list(contents) == names
+    assert all(contents[name] == (output / name).read_bytes() for name in names)
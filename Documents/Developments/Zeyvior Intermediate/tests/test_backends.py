@@ -0,0 +1,91 @@
+import json
+import threading
+import pytest
+from backends import LocalModelBackend, OfflineBackend, RemoteChatBackend, get_backend
+from generate_comparisons import generate_page_data
+
+KEYWORDS = ["Alpha", "Beta", "Gamma"]
+
+
+class RecordingClient:
+    """Stands in for LLMClient: records requests, answers after `release` is set"""
+
+    base_url = "https://llm.example"
+
+    def __init__(self):
+        self.requests = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def chat_completion(self, **request):
+        self.requests.append(request)
+        self.release.wait(5)
+        return {"choices": [{"message": {"content": "text"}}], "usage": {"prompt_tokens": 5, "completion_tokens": 1}}
+
+
+def test_offline_pages_are_deterministic_and_plausible():
+    backend = OfflineBackend()
+    data = generate_page_data("Alpha", "Beta", KEYWORDS, backend=backend)
+    assert data == generate_page_data("Alpha", "Beta", KEYWORDS, backend=OfflineBackend())
+    assert all(20 <= row["item1_score"] <= 60 and 20 <= row["item2_score"] <= 60 for row in data["comparison_data"])
+    assert "Alpha" in data["intro_content"] and "Beta" in data["intro_content"]
+    assert data != generate_page_data("Alpha", "Gamma", KEYWORDS, backend=backend)
+
+
+def test_offline_stream_matches_complete():
+    backend = OfflineBackend()
+    fields = {"item1": "Alpha", "item2": "Beta"}
+    complete = backend.complete("content_6", {}, **fields)["choices"][0]["message"]["content"]
+    assert "".join(backend.stream("content_6", {}, **fields)) == complete
+    pool = json.loads(backend.complete("seo_intro_variants", {}, count=4)["choices"][0]["message"]["content"])
+    assert len(pool) == 4 and all("{item1}" in text and "{item2}" in text for text in pool)
+    with pytest.raises(ValueError):
+        backend.text("unknown", "Alpha", "Beta")
+
+
+def test_get_backend_shares_one_instance_per_name(monkeypatch):
+    assert get_backend("offline") is get_backend("OFFLINE")
+    monkeypatch.setenv("GENERATION_BACKEND", "offline")
+    assert get_backend() is get_backend("offline")
+    with pytest.raises(ValueError, match="Unknown generation backend"):
+        get_backend("nope")
+
+
+def test_remote_backend_needs_a_key_and_applies_its_model(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+        RemoteChatBackend()
+
+    client = RecordingClient()
+    RemoteChatBackend(client=client, model="small-model").complete("content_6", {"model": "gpt-4", "messages": []})
+    RemoteChatBackend(client=client).complete("content_6", {"model": "gpt-4", "messages": [], "n": 2})
+    assert [request["model"] for request in client.requests] == ["small-model", "gpt-4"]
+
+
+def test_identical_remote_requests_in_flight_share_one_call():
+    client = RecordingClient()
+    client.release.clear()
+    backend = RemoteChatBackend(client=client)
+    request = {"model": "gpt-4", "messages": [{"role": "user", "content": "same"}]}
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(backend.complete("content_6", request)))
+               for _ in range(2)]
+    threads[0].start()
+    while not client.requests:
+        pass
+    threads[1].start()
+    client.release.set()
+    for thread in threads:
+        thread.join()
+    # Whether or not the second caller caught the first call, the tokens are counted once
+    usages = [response["usage"] for response in responses]
+    assert len(client.requests) + usages.count(None) == 2
+
+
+def test_local_backend_reads_its_server_from_the_environment(monkeypatch):
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", "http://gpu-box:8000/v1/")
+    monkeypatch.setenv("LOCAL_LLM_MODEL", "qwen2.5")
+    backend = LocalModelBackend()
+    assert backend.client.base_url == "http://gpu-box:8000/v1"
+    assert backend.model == "qwen2.5"
+    assert not backend.billable
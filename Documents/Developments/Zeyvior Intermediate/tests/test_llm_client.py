@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from llm_client import LLMClient, LLMError
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        status = 500 if request.get('fail') else 200
+        body = json.dumps({'choices': [{'message': {'content': request['messages'][0]['content'].upper()}}]})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = LLMClient(api_key='test', base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    yield client
+    client.close()
+    server.shutdown()
+
+
+def _content(response):
+    return response['choices'][0]['message']['content']
+
+
+def test_achat_completion_shares_one_client_per_loop(client):
+    async def run():
+        responses = await asyncio.gather(*(
+            client.achat_completion(messages=[{'role': 'user', 'content': f"hi {i}"}]) for i in range(5)))
+        return [_content(response) for response in responses], await client._async_client()
+
+    texts, first = asyncio.run(run())
+    assert texts == [f"HI {i}" for i in range(5)]
+    # asyncio.run shut the loop down, and the client with it
+    assert first.is_closed
+
+    _, second = asyncio.run(run())
+    assert second is not first
+    assert second.is_closed
+
+
+def test_aclose_closes_the_running_loops_client(client):
+    async def run():
+        await client.achat_completion(messages=[{'role': 'user', 'content': 'hi'}])
+        async_client = await client._async_client()
+        await client.aclose()
+        return async_client, len(client._async_clients)
+
+    async_client, remaining = asyncio.run(run())
+    assert async_client.is_closed
+    assert remaining == 0
+
+
+def test_achat_completion_raises_llm_error_on_http_errors(client):
+    with pytest.raises(LLMError, match="HTTP 500"):
+        asyncio.run(client.achat_completion(fail=True, messages=[{'role': 'user', 'content': 'hi'}]))
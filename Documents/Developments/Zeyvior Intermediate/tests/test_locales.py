@@ -0,0 +1,56 @@
+import shutil
+from pathlib import Path
+from backends import OfflineBackend
+from generate_comparisons import generate_page_data, main, render_pages
+from locales import Localizer, translate_texts
+from run_report import RunReport, current_report
+
+KEYWORDS = ["Alpha", "Beta", "Gamma"]
+
+
+class BrokenTranslations(OfflineBackend):
+    def complete(self, block, request, **fields):
+        if block == "translation":
+            return {"choices": [{"message": {"content": "not json"}}], "usage": None}
+        return super().complete(block, request, **fields)
+
+
+def test_localized_pages_go_in_a_directory_per_locale():
+    data = generate_page_data("Alpha", "Beta", KEYWORDS, backend=OfflineBackend())
+    # The source locale and repeats add nothing
+    localizer = Localizer.build(OfflineBackend(), ["de", "en", "de"])
+    assert localizer.locales == ["de"]
+    pages = render_pages(data, localizer, mirror=True)
+    assert list(pages) == ["alpha-vs-beta.html", "beta-vs-alpha.html",
+                           "de/alpha-vs-beta.html", "de/beta-vs-alpha.html"]
+    german = pages["de/alpha-vs-beta.html"]
+    assert '<html lang="de">' in german
+    assert 'href="../styles.css"' in german
+    assert "[de] " in german
+    assert '<html lang="en">' in pages["alpha-vs-beta.html"]
+    assert 'href="styles.css"' in pages["alpha-vs-beta.html"]
+
+
+def test_failed_translations_keep_the_source_text_and_are_reported():
+    report = RunReport()
+    token = current_report.set(report)
+    try:
+        texts = {"intro": "Hello", "content_4": "World"}
+        assert translate_texts(BrokenTranslations(), "translation", "fr", texts, "Alpha", "Beta") == texts
+    finally:
+        current_report.reset(token)
+    assert [(entry["block"], entry["detail"]) for entry in report.fallbacks[("Alpha", "Beta")]] == [
+        ("translation", "fr")]
+
+
+def test_main_writes_every_locale_under_output(tmp_path):
+    shutil.copytree(Path(__file__).resolve().parent.parent / "static", tmp_path / "static")
+    main(KEYWORDS, backend=OfflineBackend(), work_dir=str(tmp_path), locales=["de", "fr"],
+         site_index=True, base_url="https://example.com/")
+    output = tmp_path / "output"
+    for locale in ("", "de/", "fr/"):
+        for page in ("alpha-vs-beta.html", "alpha-vs-gamma.html", "beta-vs-gamma.html"):
+            assert (output / f"{locale}{page}").exists()
+    assert not (output / "de" / "styles.css").exists()
+    # Hub pages and sitemaps cover the English pages only
+    assert "/de/" not in (output / "sitemap-1.xml").read_text()
@@ -0,0 +1,39 @@
+import zipfile
+from manifest import BuildManifest, write_delta
+
+
+def _manifest(files):
+    manifest = BuildManifest()
+    for name, data in files.items():
+        manifest.add(name, data)
+    return manifest
+
+
+def test_diff_sorts_files_into_added_changed_and_deleted():
+    previous = _manifest({"a.html": b"a", "b.html": b"b", "gone.html": b"x"})
+    current = _manifest({"a.html": b"a", "b.html": b"b2", "new.html": b"n"})
+    assert current.diff(previous) == (["new.html"], ["b.html"], ["gone.html"])
+    assert current.diff(current) == ([], [], [])
+
+
+def test_write_and_load_round_trip(tmp_path):
+    manifest = _manifest({"b.html": b"b", "a.html": b"a"})
+    manifest.write(tmp_path / "manifest.json")
+    assert BuildManifest.load(tmp_path / "manifest.json").hashes == manifest.hashes
+    assert BuildManifest.load(tmp_path / "missing.json") is None
+
+
+def test_write_delta_packages_only_changes(tmp_path):
+    files = {"a.html": b"same", "b.html": b"changed", "de/new.html": b"new"}
+    output = tmp_path / "output"
+    (output / "de").mkdir(parents=True)
+    for name, data in files.items():
+        (output / name).write_bytes(data)
+    previous = _manifest({"a.html": b"same", "b.html": b"old", "gone.html": b"x"})
+
+    lines = write_delta(_manifest(files), previous, output, tmp_path / "delta.zip", tmp_path / "deleted.txt")
+    with zipfile.ZipFile(tmp_path / "delta.zip") as archive:
+        assert sorted(archive.namelist()) == ["b.html", "de/new.html"]
+        assert archive.read("b.html") == b"changed"
+    assert (tmp_path / "deleted.txt").read_text() == "gone.html\n"
+    assert lines[0] == "Delta: 1 new, 1 changed, 1 deleted, 1 unchanged files"
@@ -0,0 +1,84 @@
+import gzip
+from html.parser import HTMLParser
+from pathlib import Path
+from minify import brotli, minify_css, minify_html, precompressed_variants
+
+STYLES = (Path(__file__).resolve().parent.parent / "static" / "styles.css").read_text()
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+    <!-- build comment -->
+    <!--[if IE]><p>old browser</p><![endif]-->
+    <style>
+        body { color: red ; }
+    </style>
+    <script>
+        // setup
+        var a = 1
+        var b = 2
+    </script>
+</head>
+<body>
+    <p>Alpha   vs
+       <b>Beta</b>, side by side</p>
+    <pre>  keep
+    this   spacing</pre>
+</body>
+</html>
+"""
+
+
+class _Text(HTMLParser):
+    """Tags and visible text, without the style and script bodies"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.tag = None
+
+    def handle_starttag(self, tag, attrs):
+        self.tag = tag
+        self.parts.append(f"<{tag}>")
+
+    def handle_data(self, data):
+        if self.tag not in ("style", "script"):
+            self.parts.append(data)
+
+
+def _text(html):
+    parser = _Text()
+    parser.feed(html)
+    return " ".join("".join(parser.parts).split())
+
+
+def test_minify_html_keeps_text_and_raw_blocks():
+    minified = minify_html(PAGE)
+    assert len(minified) < len(PAGE)
+    assert minify_html(minified) == minified
+    assert "build comment" not in minified
+    assert "<!--[if IE]>" in minified
+    assert "<style>body{color:red}</style>" in minified
+    assert "var a = 1\nvar b = 2" in minified
+    assert "<pre>  keep\n    this   spacing</pre>" in minified
+    assert "<p>Alpha vs <b>Beta</b>, side by side</p>" in minified
+    assert _text(minified) == _text(PAGE)
+
+
+def test_minify_css_round_trips_the_stylesheet():
+    minified = minify_css(STYLES)
+    assert len(minified) < len(STYLES)
+    assert minify_css(minified) == minified
+    assert "/*" not in minified
+    assert minify_css("a > b , c { margin: 0 ; /* x */ padding: 1px 2px; }") == "a>b,c{margin:0;padding:1px 2px}"
+
+
+def test_precompressed_variants_decompress_to_the_file():
+    data = minify_html(PAGE).encode("utf-8")
+    variants = precompressed_variants("page.html", data)
+    assert gzip.decompress(variants["page.html.gz"]) == data
+    # Byte-identical between builds
+    assert precompressed_variants("page.html", data) == variants
+    if brotli is not None:
+        assert brotli.decompress(variants["page.html.br"]) == data
+    assert precompressed_variants("image.png", data) == {}
@@ -0,0 +1,31 @@
+import pytest
+from page_store import PageStore
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PageStore(tmp_path / "pages.db")
+
+
+def test_popularity_halves_every_half_life(store):
+    store.add_hits({"a-vs-b.html": 8}, DAY, now=0.0)
+    assert store.popularity(DAY, now=0.0) == [("a-vs-b.html", 8.0)]
+    assert store.popularity(DAY, now=DAY) == [("a-vs-b.html", pytest.approx(4.0))]
+    assert store.popularity(DAY, now=3 * DAY) == [("a-vs-b.html", pytest.approx(1.0))]
+
+
+def test_new_hits_add_to_the_decayed_score(store):
+    store.add_hits({"a-vs-b.html": 8, "c-vs-d.html": 1}, DAY, now=0.0)
+    store.add_hits({"a-vs-b.html": 2, "c-vs-d.html": 5}, DAY, now=2 * DAY)
+    scores = dict(store.popularity(DAY, now=2 * DAY))
+    assert scores == {"a-vs-b.html": pytest.approx(4.0), "c-vs-d.html": pytest.approx(5.25)}
+    # Most popular first
+    assert [filename for filename, _ in store.popularity(DAY, now=2 * DAY)] == ["c-vs-d.html", "a-vs-b.html"]
+
+
+def test_forget_popularity(store):
+    store.add_hits({"a-vs-b.html": 1, "c-vs-d.html": 1}, DAY, now=0.0)
+    store.forget_popularity(["a-vs-b.html"])
+    assert [filename for filename, _ in store.popularity(DAY, now=0.0)] == ["c-vs-d.html"]
@@ -0,0 +1,125 @@
+import json
+import shutil
+import zipfile
+from collections import Counter
+from pathlib import Path
+import pytest
+from backends import OfflineBackend
+from generate_comparisons import generate_page_data, main, mirror_page_data, render_pages, repair_page
+from run_report import RunReport, current_report
+
+KEYWORDS = ["Alpha", "Beta", "Gamma"]
+
+
+class CountingBackend(OfflineBackend):
+    """The offline backend, counting calls per block and failing the ones asked to"""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.calls = Counter()
+
+    def complete(self, block, request, **fields):
+        self.calls[block] += 1
+        category = fields.get("category")
+        if block in self.failing or (category and (block, category["name"]) in self.failing):
+            raise RuntimeError(f"{block} unavailable")
+        return super().complete(block, request, **fields)
+
+
+@pytest.fixture
+def report():
+    report = RunReport()
+    token = current_report.set(report)
+    yield report
+    current_report.reset(token)
+
+
+def _page(backend):
+    return generate_page_data("Alpha", "Beta", KEYWORDS, backend=backend)
+
+
+def test_repair_page_regenerates_only_failed_blocks(report):
+    expected = _page(OfflineBackend())
+    category = expected["content_5_comparisons"][2]["category"]
+    data = _page(CountingBackend(failing={"content_6", ("content_5", category)}))
+    fallbacks = report.fallbacks[("Alpha", "Beta")]
+    assert {entry["block"] for entry in fallbacks} == {"content_5", "content_6"}
+    assert data != expected
+
+    backend = CountingBackend()
+    assert repair_page(data, fallbacks, backend) == expected
+    assert backend.calls == {"content_5": 1, "content_6": 1}
+
+
+def test_repair_page_rewrites_content_4_after_new_scores(report):
+    expected = _page(OfflineBackend())
+    data = _page(CountingBackend(failing={"comparison_data"}))
+    # Content 4 was written for the placeholder scores, without failing itself
+    assert {entry["block"] for entry in report.fallbacks[("Alpha", "Beta")]} == {"comparison_data"}
+
+    backend = CountingBackend()
+    assert repair_page(data, report.fallbacks[("Alpha", "Beta")], backend) == expected
+    assert backend.calls == {"comparison_data": 1, "content_4": 1}
+
+
+def test_mirror_page_data_swaps_sides():
+    data = _page(OfflineBackend())
+    mirrored = mirror_page_data(data)
+    assert (mirrored["item1"], mirrored["item2"]) == ("Beta", "Alpha")
+    assert mirrored["overall_score"] == 100 - data["overall_score"]
+    assert mirrored["item1_performance"] == data["item2_performance"]
+    for original, swapped in zip(data["comparison_data"], mirrored["comparison_data"]):
+        assert (swapped["item1_score"], swapped["item2_score"]) == (original["item2_score"], original["item1_score"])
+        assert swapped["item1_details"] == original["item2_details"]
+        assert swapped["winner"] == original["winner"]
+    # Shared text blocks stay as they are, and mirroring twice is a no-op
+    assert mirrored["content_4"] == data["content_4"]
+    assert mirror_page_data(mirrored) == data
+
+
+def test_render_pages_mirror_points_at_the_canonical_page():
+    data = _page(OfflineBackend())
+    pages = render_pages(data, mirror=True, base_url="https://example.com/")
+    assert set(pages) == {"alpha-vs-beta.html", "beta-vs-alpha.html"}
+    assert '<link rel="canonical" href="https://example.com/alpha-vs-beta.html">' in pages["beta-vs-alpha.html"]
+    assert 'rel="canonical"' not in pages["alpha-vs-beta.html"]
+    assert set(render_pages(data)) == {"alpha-vs-beta.html"}
+
+
+class FlakyBackend(CountingBackend):
+    """Fails the given blocks the first `failures` times they are called"""
+
+    def __init__(self, failing, failures=1):
+        super().__init__()
+        self.flaky = set(failing)
+        self.failures = failures
+
+    def complete(self, block, request, **fields):
+        self.calls[block] += 1
+        if block in self.flaky and self.calls[block] <= self.failures:
+            raise RuntimeError(f"{block} unavailable")
+        return OfflineBackend.complete(self, block, request, **fields)
+
+
+def _run(tmp_path, backend, repair_passes=1):
+    shutil.copytree(Path(__file__).resolve().parent.parent / "static", tmp_path / "static")
+    main(KEYWORDS, backend=backend, work_dir=str(tmp_path), mirror_pages=True, repair_passes=repair_passes)
+    with zipfile.ZipFile(tmp_path / "comparison_pages.zip") as archive:
+        names = archive.namelist()
+    assert len(names) == len(set(names))
+    return set(names), json.loads((tmp_path / "run_report.json").read_text())
+
+
+def test_main_writes_repaired_pages_once(tmp_path):
+    names, report = _run(tmp_path, FlakyBackend({"content_6"}))
+    assert {"alpha-vs-beta.html", "beta-vs-alpha.html", "beta-vs-gamma.html"} <= names
+    assert report["fallback_pages"] == 0
+    expected = render_pages(_page(OfflineBackend()), mirror=True)["alpha-vs-beta.html"]
+    assert (tmp_path / "output" / "alpha-vs-beta.html").read_text() == expected
+
+
+def test_main_writes_pages_that_fail_every_repair(tmp_path):
+    names, report = _run(tmp_path, FlakyBackend({"content_6"}, failures=100), repair_passes=2)
+    assert {"alpha-vs-beta.html", "beta-vs-alpha.html", "beta-vs-gamma.html"} <= names
+    assert report["fallback_pages"] == 3
@@ -0,0 +1,75 @@
+import shutil
+from pathlib import Path
+import pytest
+from backends import OfflineBackend
+from generate_comparisons import generate_content_3_links, main
+from pair_selection import (AllPairs, pairs_with_new_keywords, random_sample, read_pairs_file,
+                            select_pairs, top_k_neighbours)
+
+KEYWORDS = ["Linear Regression", "Logistic Regression", "Random Forest", "Gradient Boosting", "K-Means"]
+
+
+def test_all_pairs_is_lazy_and_reiterable():
+    pairs = AllPairs(KEYWORDS)
+    assert len(pairs) == 10
+    assert list(pairs) == list(pairs)
+    assert select_pairs(KEYWORDS).keywords == KEYWORDS
+
+
+def test_read_pairs_file_accepts_every_separator_and_dedupes(tmp_path):
+    path = tmp_path / "pairs.txt"
+    path.write_text("# comment\n\nAlpha vs Beta\nBeta, Alpha\nGamma\tDelta\nAlpha vs. Gamma\nAlpha vs Alpha\n")
+    assert read_pairs_file(str(path)) == [("Alpha", "Beta"), ("Gamma", "Delta"), ("Alpha", "Gamma")]
+    assert select_pairs(KEYWORDS, 'file', pairs_file=str(path)) == read_pairs_file(str(path))
+
+    path.write_text("Alpha\n")
+    with pytest.raises(ValueError, match="pairs.txt:1"):
+        read_pairs_file(str(path))
+    with pytest.raises(ValueError):
+        select_pairs(KEYWORDS, 'file')
+
+
+def test_top_k_pairs_similar_names_in_combination_order():
+    pairs = top_k_neighbours(KEYWORDS, 1)
+    assert ("Linear Regression", "Logistic Regression") in pairs
+    order = list(AllPairs(KEYWORDS))
+    assert pairs == sorted(pairs, key=order.index)
+    assert len(set(pairs)) == len(pairs)
+
+
+def test_random_sample_is_seeded_distinct_and_capped():
+    sample = random_sample(KEYWORDS, 4, seed=7)
+    assert len(set(sample)) == 4
+    assert set(sample) <= set(AllPairs(KEYWORDS))
+    assert sample == random_sample(KEYWORDS, 4, seed=7)
+    assert random_sample(KEYWORDS, 100) == list(AllPairs(KEYWORDS))
+
+
+def test_new_strategy_only_pairs_new_keywords():
+    pairs = pairs_with_new_keywords(KEYWORDS, ["K-Means"])
+    assert pairs == [(keyword, "K-Means") for keyword in KEYWORDS[:-1]]
+    with pytest.raises(ValueError):
+        select_pairs(KEYWORDS, 'new')
+    with pytest.raises(ValueError):
+        select_pairs(KEYWORDS, 'unknown')
+
+
+def test_content_3_links_only_point_at_existing_pages():
+    existing = [("Linear Regression", "Random Forest"), ("Random Forest", "K-Means"),
+                ("Logistic Regression", "Gradient Boosting")]
+    links = generate_content_3_links("Linear Regression", "Random Forest", KEYWORDS, existing)
+    assert [link["url"] for link in links] == [
+        "random-forest-vs-k-means.html", "logistic-regression-vs-gradient-boosting.html"
+    ]
+
+
+def test_partial_run_indexes_every_existing_page(tmp_path):
+    shutil.copytree(Path(__file__).resolve().parent.parent / "static", tmp_path / "static")
+    keywords = ["Alpha", "Beta", "Gamma"]
+    main(keywords, site_index=True, base_url="https://example.com/", backend=OfflineBackend(),
+         pairs=pairs_with_new_keywords(keywords, ["Gamma"]), link_pairs=AllPairs(keywords),
+         work_dir=str(tmp_path))
+    output = tmp_path / "output"
+    assert not (output / "alpha-vs-beta.html").exists()
+    assert "alpha-vs-beta.html" in (output / "sitemap-1.xml").read_text()
+    assert "alpha-vs-beta.html" in (output / "alpha-comparisons.html").read_text()
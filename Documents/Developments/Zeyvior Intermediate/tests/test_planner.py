@@ -0,0 +1,51 @@
+import io
+import json
+import pytest
+from planner import BudgetExceededError, PlannerConfig, plan_job
+from prompts import VARIANTS_PER_REQUEST
+
+PAIRS = [("Alpha", "Beta"), ("Alpha", "Gamma"), ("Beta", "Gamma")]
+
+
+def test_plan_counts_every_request_without_calling_the_api():
+    log = io.StringIO()
+    plan = plan_job(PAIRS, PlannerConfig(), prompt_log=log)
+    per_page = plan.calls // 3
+    assert plan.pages == 3 and plan.calls == per_page * 3
+    assert sum(calls for calls, _, _ in plan.by_block.values()) == plan.calls
+    assert sum(prompt for _, prompt, _ in plan.by_block.values()) == plan.prompt_tokens
+    lines = [json.loads(line) for line in log.getvalue().splitlines()]
+    assert len(lines) == plan.calls
+    assert sum(line["max_completion_tokens"] for line in lines) == plan.completion_tokens
+    # The system instructions repeat from the second page on
+    assert plan.cacheable_prompt_tokens > 0
+
+
+def test_variant_pools_and_locales_change_the_call_count():
+    config = PlannerConfig()
+    base = plan_job(PAIRS, config).calls
+    # Two boilerplate blocks per page become a few pool requests for the whole job
+    pool_requests = 2 * -(-20 // VARIANTS_PER_REQUEST)
+    assert plan_job(PAIRS, config, variant_pool_size=20).calls == base - 2 * 3 + pool_requests
+    # One translation per page and locale, plus the interface text once per locale
+    assert plan_job(PAIRS, config, locales=["de", "fr", "en", "de"]).calls == base + 2 * 3 + 2
+
+
+def test_budget_is_checked_against_the_projected_cost():
+    plan = plan_job(PAIRS, PlannerConfig())
+    cost = plan.cost(PlannerConfig())
+    assert cost == pytest.approx((plan.prompt_tokens * 0.03 + plan.completion_tokens * 0.06) / 1000)
+    plan.check_budget(PlannerConfig(budget_usd=cost + 0.01))
+    with pytest.raises(BudgetExceededError, match="exceeds"):
+        plan.check_budget(PlannerConfig(budget_usd=cost / 2))
+    assert any("budget" in line for line in plan.report(PlannerConfig(budget_usd=1.0)))
+
+
+def test_wall_time_reports_the_binding_limit():
+    plan = plan_job(PAIRS, PlannerConfig())
+    seconds, bound_by = plan.wall_time(PlannerConfig(concurrency=1))
+    assert bound_by == "concurrency of 1" and seconds == pytest.approx(plan.call_seconds)
+    # With enough workers a page's own sequential calls are the limit
+    assert plan.wall_time(PlannerConfig(concurrency=100))[1] == "sequential calls within a page"
+    seconds, bound_by = plan.wall_time(PlannerConfig(concurrency=100, requests_per_minute=1))
+    assert bound_by == "requests-per-minute limit" and seconds == plan.calls * 60
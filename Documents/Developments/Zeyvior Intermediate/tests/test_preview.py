@@ -0,0 +1,47 @@
+import json
+from preview import iter_json_array_objects
+
+DOCUMENT = json.dumps({
+    "title": "A vs B",
+    "categories": [
+        {"name": "Cost {low}", "note": "say \"hi\" ]", "nested": {"a": [1, 2]}},
+        {"name": "Risk", "note": "back\\slash"},
+    ],
+    "overall_winner": "A",
+})
+
+
+def _chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_yields_each_object_whatever_the_chunking():
+    expected = json.loads(DOCUMENT)["categories"]
+    for size in (1, 3, 7, len(DOCUMENT)):
+        assert list(iter_json_array_objects(_chunked(DOCUMENT, size), "categories")) == expected
+
+
+def test_yields_an_object_before_the_rest_arrives():
+    consumed = []
+
+    def chunks():
+        for chunk in _chunked(DOCUMENT, 5):
+            consumed.append(chunk)
+            yield chunk
+
+    objects = iter_json_array_objects(chunks(), "categories")
+    first = next(objects)
+    assert first["name"] == "Cost {low}"
+    assert len("".join(consumed)) < len(DOCUMENT)
+
+
+def test_full_text_gets_the_whole_document():
+    full_text = []
+    list(iter_json_array_objects(_chunked(DOCUMENT, 4), "categories", full_text))
+    assert json.loads("".join(full_text)) == json.loads(DOCUMENT)
+
+
+def test_missing_key_yields_nothing():
+    full_text = []
+    assert list(iter_json_array_objects(_chunked(DOCUMENT, 4), "missing", full_text)) == []
+    assert "".join(full_text) == DOCUMENT
@@ -0,0 +1,68 @@
+import contextvars
+import pstats
+import shutil
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from backends import OfflineBackend
+from generate_comparisons import main
+from profiling import PER_STAGE_PROFILES, StageProfiler, current_profiler, profile_run, stage
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def _with_stage(name):
+    with stage(name):
+        _busy(0.05)
+
+
+def test_stage_is_free_outside_a_profiled_run():
+    assert isinstance(stage("render"), nullcontext)
+
+
+def test_profile_run_writes_stats_per_stage(tmp_path):
+    with profile_run(tmp_path) as profiler:
+        profiler.sample_interval = 0.001
+        with stage("render"):
+            _busy(0.05)
+            with stage("write"):
+                _busy(0.05)
+        # Worker threads run in a copy of the caller's context, as in map_in_order
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(lambda: _with_stage("write"),))
+        worker.start()
+        worker.join()
+    assert current_profiler.get() is None
+
+    assert profiler.entries == {"render": 1, "write": 2}
+    assert profiler.wall["render"] >= profiler.wall["write"] / 2 > 0
+    stats_files = ["render", "write"] if PER_STAGE_PROFILES else ["run"]
+    for name in stats_files:
+        assert pstats.Stats(str(tmp_path / f"{name}.prof")).total_calls > 0
+        assert "cumulative" in (tmp_path / f"{name}.txt").read_text()
+    # Collapsed stacks start with the stage names, innermost stage last
+    stacks = [line.rsplit(" ", 1) for line in (tmp_path / "stages.collapsed").read_text().splitlines()]
+    assert stacks and all(stack.split(";")[0] in ("render", "write") and int(count) > 0 for stack, count in stacks)
+    assert any(stack.startswith("render;write;") and "_busy" in stack for stack, _ in stacks)
+
+
+def test_summary_lists_every_stage(tmp_path):
+    profiler = StageProfiler(sample_interval=0.001)
+    profiler._record("write", 0.5, 0.25)
+    profiler._record("render", 1.0, 0.75)
+    lines = profiler.write(tmp_path)
+    assert [line.split()[0] for line in lines[2:4]] == ["render", "write"]
+    assert (tmp_path / "stages.collapsed").read_text() == ""
+
+
+def test_profiled_run_writes_under_the_work_dir(tmp_path):
+    shutil.copytree(Path(__file__).resolve().parent.parent / "static", tmp_path / "static")
+    main(["Alpha", "Beta", "Gamma"], backend=OfflineBackend(), work_dir=str(tmp_path), profile_dir="profile")
+    profile = tmp_path / "profile"
+    assert (profile / "stages.collapsed").exists()
+    written = {path.stem for path in profile.glob("*.prof")}
+    assert written >= ({"content", "template", "write", "package"} if PER_STAGE_PROFILES else {"run"})
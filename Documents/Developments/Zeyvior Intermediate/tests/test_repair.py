@@ -0,0 +1,74 @@
+import hashlib
+import json
+import shutil
+import sys
+import zipfile
+from pathlib import Path
+import pytest
+import repair
+from backends import OfflineBackend
+from generate_comparisons import main
+from sinks import open_sink
+
+KEYWORDS = ["Alpha", "Beta", "Gamma"]
+
+
+class FailingBackend(OfflineBackend):
+    def complete(self, block, request, **fields):
+        if block == "comparison_data":
+            raise RuntimeError(f"{block} unavailable")
+        return super().complete(block, request, **fields)
+
+
+def _run(work_dir, backend, sinks=()):
+    shutil.copytree(Path(__file__).resolve().parent.parent / "static", work_dir / "static")
+    main(KEYWORDS, backend=backend, work_dir=str(work_dir), minify=True, mirror_pages=True,
+         repair_passes=0, sinks=[open_sink(str(work_dir / spec)) for spec in sinks])
+
+
+def _repair(monkeypatch, report_path):
+    monkeypatch.setattr(sys, "argv", ["repair.py", str(report_path), "--backend", "offline"])
+    repair.main()
+
+
+def _zip_contents(path):
+    with zipfile.ZipFile(path) as archive:
+        assert len(archive.namelist()) == len(set(archive.namelist()))
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+@pytest.fixture
+def clean(tmp_path):
+    _run(tmp_path / "clean", OfflineBackend())
+    return tmp_path / "clean"
+
+
+def test_repair_updates_output_archive_manifest_and_leaderboards(tmp_path, clean, monkeypatch):
+    work_dir = tmp_path / "run"
+    _run(work_dir, FailingBackend())
+    assert json.loads((work_dir / "run_report.json").read_text())["options"]["mirror"] is True
+    assert _zip_contents(work_dir / "comparison_pages.zip") != _zip_contents(clean / "comparison_pages.zip")
+
+    _repair(monkeypatch, work_dir / "run_report.json")
+
+    assert json.loads((work_dir / "run_report.json").read_text())["fallback_pages"] == 0
+    assert _zip_contents(work_dir / "comparison_pages.zip") == _zip_contents(clean / "comparison_pages.zip")
+    for name in ("alpha-vs-beta.html", "beta-vs-alpha.html", "alpha-vs-beta.html.gz", "leaderboards.json"):
+        assert (work_dir / "output" / name).read_bytes() == (clean / "output" / name).read_bytes()
+    assert (json.loads((work_dir / "manifest.json").read_text())
+            == json.loads((clean / "manifest.json").read_text()))
+    digest = hashlib.sha256((work_dir / "output" / "alpha-vs-beta.html").read_bytes()).hexdigest()
+    assert json.loads((work_dir / "manifest.json").read_text())["files"]["alpha-vs-beta.html"] == digest
+
+
+def test_repair_writes_to_the_sinks_the_run_used(tmp_path, clean, monkeypatch):
+    work_dir = tmp_path / "run"
+    _run(work_dir, FailingBackend(), sinks=["site", "site.zip"])
+    assert not (work_dir / "output").exists()
+
+    _repair(monkeypatch, work_dir / "run_report.json")
+
+    assert not (work_dir / "output").exists()
+    assert _zip_contents(work_dir / "site.zip") == _zip_contents(clean / "comparison_pages.zip")
+    for name in ("alpha-vs-beta.html", "leaderboards.json"):
+        assert (work_dir / "site" / name).read_bytes() == (clean / "output" / name).read_bytes()
@@ -0,0 +1,109 @@
+import threading
+import pytest
+from scheduler import FairScheduler, QuotaExceededError, SchedulerConfig
+
+
+def _run_blocked(scheduler, jobs):
+    """Queue every (job, label, count) behind a task holding the only worker; returns the run order"""
+    started, gate = threading.Event(), threading.Event()
+    # On the idle lane, so it doesn't count towards the priority lane's turns
+    blocker = scheduler.open_job('blocker', 1, background=True)
+    blocked = blocker.submit(lambda: (started.set(), gate.wait()))
+    # Queued work would otherwise be picked ahead of it
+    started.wait(5)
+    order = []
+    futures = [job.submit(order.append, label) for job, label, count in jobs for _ in range(count)]
+    gate.set()
+    for future in [blocked] + futures:
+        future.result(timeout=5)
+    return "".join(order)
+
+
+def test_jobs_in_a_lane_take_turns():
+    scheduler = FairScheduler(SchedulerConfig(workers=1))
+    large, small = scheduler.open_job('a', 6), scheduler.open_job('b', 3)
+    assert _run_blocked(scheduler, [(large, 'L', 6), (small, 'S', 3)]) == "LSLSLSLLL"
+
+
+def test_weight_sets_the_share_of_turns():
+    scheduler = FairScheduler(SchedulerConfig(workers=1))
+    heavy, light = scheduler.open_job('a', 6, weight=2), scheduler.open_job('b', 3)
+    assert _run_blocked(scheduler, [(heavy, 'H', 6), (light, 'L', 3)]) == "HHLHHLHHL"
+
+
+def test_priority_lane_lets_the_normal_lane_through():
+    scheduler = FairScheduler(SchedulerConfig(workers=1, small_job_pages=4, priority_share=3))
+    normal, priority = scheduler.open_job('a', 100), scheduler.open_job('b', 4)
+    assert _run_blocked(scheduler, [(normal, 'N', 3), (priority, 'P', 4)]) == "PPPNPNN"
+
+
+def test_background_jobs_only_get_idle_workers():
+    scheduler = FairScheduler(SchedulerConfig(workers=1))
+    idle, normal = scheduler.open_job('warm', 3, background=True), scheduler.open_job('a', 3)
+    assert _run_blocked(scheduler, [(idle, 'I', 3), (normal, 'N', 3)]) == "NNNIII"
+
+
+def test_quota_rejects_jobs_beyond_it():
+    scheduler = FairScheduler(SchedulerConfig(workers=1, client_page_quota=5))
+    job = scheduler.open_job('a', 5)
+    with pytest.raises(QuotaExceededError):
+        scheduler.open_job('a', 1)
+    # Other clients and background jobs aren't affected
+    scheduler.open_job('b', 5).shutdown()
+    scheduler.open_job('a', 10, background=True).shutdown()
+    job.shutdown()
+
+
+def test_quota_charges_only_completed_pages():
+    scheduler = FairScheduler(SchedulerConfig(workers=2, client_page_quota=5))
+    job = scheduler.open_job('a', 4)
+
+    def fail():
+        raise RuntimeError("generation failed")
+
+    job.submit(lambda: None).result()
+    with pytest.raises(RuntimeError):
+        job.submit(fail).result()
+    job.shutdown()
+
+    # One page completed; the failed and never-submitted ones were refunded
+    scheduler.open_job('a', 4).shutdown()
+    with pytest.raises(QuotaExceededError, match=r"\(1 used\)"):
+        scheduler.open_job('a', 5)
+
+
+def test_reservation_holds_until_the_job_ends():
+    scheduler = FairScheduler(SchedulerConfig(workers=1, client_page_quota=5))
+    gate = threading.Event()
+    job = scheduler.open_job('a', 3)
+    running = job.submit(gate.wait)
+    with pytest.raises(QuotaExceededError, match=r"\(3 used\)"):
+        scheduler.open_job('a', 3)
+    gate.set()
+    running.result(timeout=5)
+    job.shutdown()
+    with pytest.raises(QuotaExceededError, match=r"\(1 used\)"):
+        scheduler.open_job('a', 5)
+
+
+def test_quota_in_the_page_store_is_shared_between_processes(tmp_path):
+    from page_store import PageStore
+    # Two schedulers over two connections to one file, as in two gunicorn workers
+    first = FairScheduler(SchedulerConfig(workers=1, client_page_quota=5), ledger=PageStore(tmp_path / "pages.db"))
+    second = FairScheduler(SchedulerConfig(workers=1, client_page_quota=5), ledger=PageStore(tmp_path / "pages.db"))
+    job = first.open_job('a', 3)
+    with pytest.raises(QuotaExceededError, match=r"\(3 used\)"):
+        second.open_job('a', 3)
+    job.submit(lambda: None).result()
+    job.shutdown()
+    second.open_job('a', 4).shutdown()
+    with pytest.raises(QuotaExceededError, match=r"\(1 used\)"):
+        first.open_job('a', 5)
+
+
+def test_page_store_quota_window_expires(tmp_path):
+    from page_store import PageStore
+    store = PageStore(tmp_path / "pages.db")
+    assert store.reserve_quota('a', 5, 5, window=60, now=0)[0] is not None
+    assert store.reserve_quota('a', 1, 5, window=60, now=30) == (None, 5)
+    assert store.reserve_quota('a', 5, 5, window=60, now=61)[1] == 0
@@ -0,0 +1,135 @@
+import threading
+import time
+import pytest
+from single_flight import SingleFlight
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: flight.coalesced == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False)] + [("result", True)] * 4
+    assert flight.in_flight() == 0
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: flight.coalesced == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ["boom"] * 3
+
+
+def test_nothing_is_cached_between_calls():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+    assert flight.do("key", lambda: 3) == (3, False)
+    assert flight.started == 4 and flight.in_flight() == 0
+
+
+def test_try_do_skips_a_key_in_flight():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", release.wait))
+    leader.start()
+    _wait_for(lambda: flight.in_flight() == 1)
+
+    assert flight.try_do("key", lambda: "skipped") == (False, None)
+    assert flight.try_do("other", lambda: "ran") == (True, "ran")
+    release.set()
+    leader.join()
+    assert flight.try_do("key", lambda: "ran") == (True, "ran")
+
+
+def test_shared_flight_shares_a_result_between_stores(tmp_path):
+    from page_store import PageStore
+    from single_flight import SharedFlight
+    # Two connections to one file, as in two worker processes
+    leader = SharedFlight(PageStore(tmp_path / "pages.db"), poll_interval=0.01)
+    follower = SharedFlight(PageStore(tmp_path / "pages.db"), poll_interval=0.01)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return b"zip bytes"
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(leader.do("job", work)))
+    thread.start()
+    started.wait(5)
+    follower_thread = threading.Thread(target=lambda: results.append(follower.do("job", work)))
+    follower_thread.start()
+    time.sleep(0.05)
+    release.set()
+    thread.join()
+    follower_thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [(b"zip bytes", False), (b"zip bytes", True)]
+    # Once finished, the next call runs afresh
+    assert follower.do("job", lambda: b"new") == (b"new", False)
+
+
+def test_shared_flight_takes_over_after_a_failure(tmp_path):
+    from page_store import PageStore
+    from single_flight import SharedFlight
+    flight = SharedFlight(PageStore(tmp_path / "pages.db"), poll_interval=0.01)
+    with pytest.raises(RuntimeError):
+        flight.do("job", lambda: (_ for _ in ()).throw(RuntimeError("failed")))
+    assert flight.do("job", lambda: b"retried") == (b"retried", False)
+
+
+def test_expired_lease_can_be_taken(tmp_path):
+    from page_store import PageStore
+    store = PageStore(tmp_path / "pages.db")
+    assert store.acquire_lease("job", "a", ttl=10, now=0)
+    assert not store.acquire_lease("job", "b", ttl=10, now=5)
+    assert store.acquire_lease("job", "a", ttl=10, now=5)
+    assert store.acquire_lease("job", "b", ttl=10, now=16)
@@ -0,0 +1,56 @@
+import re
+from sitemap import SITEMAP_SHARD_SIZE, SiteIndexBuilder, SitemapWriter, hub_filename
+
+
+def _collect():
+    files = {}
+
+    def write(filename, content):
+        files[filename] = content
+        return [filename]
+    return files, write
+
+
+def _links(html):
+    return re.findall(r'<a href="([^"]+)"', html)
+
+
+def test_sitemaps_shard_at_50000_urls():
+    files, write = _collect()
+    sitemap = SitemapWriter(write, "https://example.com")
+    for i in range(SITEMAP_SHARD_SIZE + 1):
+        sitemap.add(f"page-{i}.html")
+    assert sitemap.close() == ["sitemap-1.xml", "sitemap-2.xml", "sitemap.xml"]
+    assert SITEMAP_SHARD_SIZE == 50000
+    assert files["sitemap-1.xml"].count("<url>") == 50000
+    assert files["sitemap-2.xml"].count("<url>") == 1
+    assert "<loc>https://example.com/page-50000.html</loc>" in files["sitemap-2.xml"]
+    assert re.findall(r"<loc>([^<]+)</loc>", files["sitemap.xml"]) == [
+        "https://example.com/sitemap-1.xml", "https://example.com/sitemap-2.xml"]
+
+
+def test_hub_pages_are_paginated():
+    files, write = _collect()
+    builder = SiteIndexBuilder(write, "https://example.com/", hub_page_size=2, sitemap_shard_size=4)
+    for other in ["Beta", "Gamma", "Delta", "Epsilon", "Zeta"]:
+        builder.add_pair("Alpha", other, f"alpha-vs-{other.lower()}.html")
+    written = builder.close()
+
+    alpha_pages = [hub_filename("alpha", page) for page in (1, 2, 3)]
+    assert alpha_pages == ["alpha-comparisons.html", "alpha-comparisons-2.html", "alpha-comparisons-3.html"]
+    assert set(alpha_pages) <= set(written)
+    # Two pairs per page in the order they were added, with links between the pages
+    assert _links(files["alpha-comparisons.html"])[:2] == ["alpha-vs-beta.html", "alpha-vs-gamma.html"]
+    assert "alpha-comparisons-2.html" in files["alpha-comparisons.html"]
+    assert _links(files["alpha-comparisons-3.html"])[0] == "alpha-vs-zeta.html"
+    assert "alpha-comparisons-4.html" not in files["alpha-comparisons-3.html"]
+    # Six keywords at two per page make three index pages
+    assert {"comparisons.html", "comparisons-2.html", "comparisons-3.html"} <= set(written)
+    assert "comparisons-4.html" not in written
+
+    # Pages, hubs and index pages all end up in the sharded sitemaps
+    urls = [url for name, content in files.items() if re.fullmatch(r"sitemap-\d+\.xml", name)
+            for url in re.findall(r"<loc>https://example.com/([^<]+)</loc>", content)]
+    assert all(content.count("<url>") <= 4 for name, content in files.items() if name.startswith("sitemap-"))
+    assert set(urls) == {name for name in written if name.endswith(".html")} | {
+        f"alpha-vs-{other}.html" for other in ["beta", "gamma", "delta", "epsilon", "zeta"]}
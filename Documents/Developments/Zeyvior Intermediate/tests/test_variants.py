@@ -0,0 +1,70 @@
+import itertools
+import json
+import pytest
+import variants
+from backends import GenerationBackend
+from page_store import PageStore
+from prompts import BOILERPLATE_BLOCKS, MODEL
+from variants import VariantPool
+
+
+class NumberedBackend(GenerationBackend):
+    """Returns new numbered paraphrases on every call, or fails while `failing` is set"""
+
+    name = 'numbered'
+
+    def __init__(self, model=None):
+        self.model = model
+        self.counter = itertools.count(1)
+        self.requested = []
+        self.failing = False
+
+    def complete(self, block, request, **fields):
+        if self.failing:
+            raise RuntimeError("unavailable")
+        self.requested.append(fields["count"])
+        texts = [f"Paraphrase {next(self.counter)} of {{item1}} vs {{item2}}" for _ in range(fields["count"])]
+        return {"choices": [{"message": {"content": json.dumps(texts)}}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PageStore(tmp_path / "pages.db")
+
+
+def _texts(pool):
+    return [text.split(" of ")[0] for text in pool.texts["seo_intro"]]
+
+
+def test_pools_are_stored_per_backend_and_model(store):
+    VariantPool.build(NumberedBackend(), 2, store, blocks=("seo_intro",))
+    assert store.get_variants("numbered", MODEL, "seo_intro") == [
+        "Paraphrase 1 of {item1} vs {item2}", "Paraphrase 2 of {item1} vs {item2}"]
+
+    other_model = NumberedBackend(model="other-model")
+    assert _texts(VariantPool.build(other_model, 2, store, blocks=("seo_intro",))) == ["Paraphrase 1", "Paraphrase 2"]
+    assert other_model.requested == [2]
+    assert store.get_variants("numbered", "other-model", "seo_intro")
+    assert store.get_variants("offline", MODEL, "seo_intro") == []
+
+
+def test_short_pools_are_topped_up(store):
+    store.put_variants("numbered", MODEL, "seo_intro", ["Stored of {item1} vs {item2}"])
+    backend = NumberedBackend()
+    pool = VariantPool.build(backend, 3, store, blocks=("seo_intro",))
+    assert _texts(pool) == ["Stored", "Paraphrase 1", "Paraphrase 2"]
+    assert backend.requested == [2]
+    assert len(store.get_variants("numbered", MODEL, "seo_intro")) == 3
+
+
+def test_failed_pools_fall_back_and_are_retried(store, monkeypatch):
+    monkeypatch.setattr(variants, "FAILED_POOL_RETRY_SECONDS", -1)
+    backend = NumberedBackend()
+    backend.failing = True
+    pool = VariantPool.build(backend, 2, store, blocks=("seo_intro",))
+    assert pool.texts["seo_intro"] == [BOILERPLATE_BLOCKS["seo_intro"][0]]
+    assert store.get_variants("numbered", MODEL, "seo_intro") == []
+
+    # The fallback has expired, so the next build tries again
+    backend.failing = False
+    assert _texts(VariantPool.build(backend, 2, store, blocks=("seo_intro",))) == ["Paraphrase 1", "Paraphrase 2"]
@@ -0,0 +1,76 @@
+import pytest
+from page_store import PageStore
+from scheduler import FairScheduler, SchedulerConfig
+from warming import PreWarmer, PrewarmConfig, parse_access_log
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PageStore(tmp_path / "pages.db")
+    store.add_keywords(["Alpha", "Beta", "Gamma"])
+    return store
+
+
+def _prewarmer(store, generate, **config):
+    return PreWarmer(store, FairScheduler(SchedulerConfig(workers=2)), generate, PrewarmConfig(**config))
+
+
+def test_refresh_follows_the_page_ttl(monkeypatch):
+    monkeypatch.delenv('PREWARM_REFRESH_SECONDS', raising=False)
+    assert PrewarmConfig.from_env(1000).refresh_seconds == 750
+    # Pages that never expire are only generated when missing
+    assert PrewarmConfig.from_env(0).refresh_seconds is None
+    monkeypatch.setenv('PREWARM_REFRESH_SECONDS', '60')
+    assert PrewarmConfig.from_env(0).refresh_seconds == 60
+
+
+def test_both_orders_of_a_pair_take_one_slot(store):
+    prewarmer = _prewarmer(store, lambda *args: True, top_n=2)
+    scores = [("beta-vs-alpha.html", 5.0), ("alpha-vs-beta.html", 4.0), ("alpha-vs-gamma.html", 1.0)]
+    assert prewarmer.candidates(scores) == [("beta-vs-alpha.html", "Beta", "Alpha"),
+                                            ("alpha-vs-gamma.html", "Alpha", "Gamma")]
+
+
+def test_only_stored_pages_count_as_warmed(store):
+    generated = []
+
+    def generate(filename, item1, item2):
+        generated.append(filename)
+        if filename == "alpha-vs-beta.html":
+            store.put(filename, b"<p>page</p>")
+            return True
+        return False  # fell back to generic text, so not stored
+
+    prewarmer = _prewarmer(store, generate, top_n=2, refresh_seconds=None)
+    prewarmer.record("alpha-vs-beta.html")
+    prewarmer.record("alpha-vs-gamma.html")
+    assert prewarmer.run_once() == (1, 0)
+    assert sorted(generated) == ["alpha-vs-beta.html", "alpha-vs-gamma.html"]
+
+    # The stored page is fresh for good; the one that fell back is tried again
+    generated.clear()
+    prewarmer.run_once()
+    assert generated == ["alpha-vs-gamma.html"]
+
+
+def test_parse_access_log_counts_pair_pages():
+    lines = [
+        '1.2.3.4 - - [24/May/2026:00:00:00 +0000] "GET /alpha-vs-beta.html HTTP/1.1" 200 512',
+        '1.2.3.4 - - [24/May/2026:00:00:01 +0000] "GET /alpha-vs-beta.html?ref=x HTTP/1.1" 200 512',
+        '1.2.3.4 - - [24/May/2026:00:00:02 +0000] "GET /de/alpha-vs-beta.html HTTP/1.1" 200 512',
+        '1.2.3.4 - - [24/May/2026:00:00:03 +0000] "POST /generate HTTP/1.1" 200 512',
+    ]
+    assert parse_access_log(lines) == {"alpha-vs-beta.html": 2}
+
+
+def test_one_process_warms_at_a_time(store, tmp_path):
+    # Another worker process: its own connection to the same store
+    first = _prewarmer(store, lambda *args: True, top_n=1)
+    second = _prewarmer(PageStore(tmp_path / "pages.db"), lambda *args: True, top_n=1)
+    assert first.lead()
+    assert not second.lead()
+    assert first.lead()  # renewing its own lease
+
+    first.stop()
+    assert second.lead()
+    assert not first.lead()
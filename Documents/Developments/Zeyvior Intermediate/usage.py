@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Mapping, Optional
+
+
+class UsageStats:
+    """Token usage of one generation run, split into cached and uncached prompt tokens"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.by_block: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, block: str, usage: Optional[Mapping]):
+        """Add the `usage` object of one chat completion response"""
+        usage = usage or {}
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        cached_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_prompt_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+            totals = self.by_block.setdefault(block, [0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += prompt_tokens
+            totals[2] += cached_tokens
+            totals[3] += completion_tokens
+
+    @property
+    def uncached_prompt_tokens(self) -> int:
+        return self.prompt_tokens - self.cached_prompt_tokens
+
+    def report(self) -> List[str]:
+        hit_rate = self.cached_prompt_tokens * 100 / self.prompt_tokens if self.prompt_tokens else 0
+        lines = [
+            f"Token usage for {self.calls} API calls:",
+            f"  prompt tokens      {self.prompt_tokens:>12,}",
+            f"    cached           {self.cached_prompt_tokens:>12,}  ({hit_rate:.1f}% of prompt tokens)",
+            f"    uncached         {self.uncached_prompt_tokens:>12,}",
+            f"  completion tokens  {self.completion_tokens:>12,}",
+        ]
+        for block, (calls, prompt_tokens, cached_tokens, completion_tokens) in self.by_block.items():
+            lines.append(f"    {block:<16} {calls:>6,} calls {prompt_tokens:>10,} prompt "
+                         f"({cached_tokens:,} cached) {completion_tokens:>10,} completion")
+        return lines
+
+
+# Usage of the run in progress; main() installs a fresh UsageStats for every run
+current_usage: ContextVar[UsageStats] = ContextVar('current_usage', default=UsageStats())
+
+
+def record_usage(block: str, response: Mapping):
+    current_usage.get().record(block, response.get('usage'))
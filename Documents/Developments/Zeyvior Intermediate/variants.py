@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from backends import GenerationBackend
+from page_store import PageStore
+from prompts import BOILERPLATE_BLOCKS, MODEL, VARIANTS_PER_REQUEST, fill_template, variant_pool_request
+from run_report import record_fallback
+from single_flight import SingleFlight
+from usage import record_usage
+
+# A pool that couldn't be generated (or filled up) serves what it has until it is tried again
+FAILED_POOL_RETRY_SECONDS = 600
+
+
+def _usable(text) -> bool:
+    # A paraphrase that dropped a placeholder would name the wrong items
+    return isinstance(text, str) and "{item1}" in text and "{item2}" in text
+
+
+class VariantPool:
+    """K paraphrases per boilerplate block, generated once and shared by every page.
+
+    The seo_intro and content_6 blocks rephrase a fixed paragraph in which only
+    the item names change, so instead of one API call per page each, a pool of
+    texts with {item1}/{item2} placeholders is requested once and every pair
+    picks one of them deterministically. Pools are stored per backend and model,
+    since another model's paraphrases aren't this one's output, and kept per
+    process as well, so lazily generated pages don't hit the store or the API
+    for each page.
+    """
+
+    # (backend, model, store, block, size) -> (texts, expires_at or None)
+    _pools: Dict[Tuple, Tuple[List[str], Optional[float]]] = {}
+    _pools_lock = threading.Lock()
+    _flight = SingleFlight()
+
+    def __init__(self, texts: Dict[str, List[str]]):
+        self.texts = texts
+
+    @classmethod
+    def build(cls, backend: GenerationBackend, size: int, store: Optional[PageStore] = None,
+              blocks=tuple(BOILERPLATE_BLOCKS)) -> 'VariantPool':
+        """Reuse this process's pools or the store's, generating the missing ones"""
+        texts = {}
+        for block in blocks:
+            key = (backend.name, backend.model or MODEL, store.path if store else None, block, size)
+            # Pages building a pool at the same time wait for one generation
+            texts[block], _ = cls._flight.do(
+                key, lambda block=block, key=key: cls._pool(key, backend, block, size, store))
+        return cls(texts)
+
+    @classmethod
+    def _pool(cls, key: Tuple, backend: GenerationBackend, block: str, size: int,
+              store: Optional[PageStore]) -> List[str]:
+        with cls._pools_lock:
+            cached = cls._pools.get(key)
+        if cached and (cached[1] is None or time.time() < cached[1]):
+            return cached[0]
+        model = backend.model or MODEL
+        texts = store.get_variants(backend.name, model, block)[:size] if store else []
+        expires_at = None
+        if len(texts) < size:
+            # Top up a pool stored by a run with a smaller size, or one that was cut short
+            added = [text for text in cls._generate(backend, block, size - len(texts)) if text not in texts]
+            if added and store:
+                store.put_variants(backend.name, model, block, texts + added)
+            texts = texts + added
+            if len(texts) < size:
+                expires_at = time.time() + FAILED_POOL_RETRY_SECONDS
+            if not texts:
+                # The original paragraph is always a valid fallback
+                texts = [BOILERPLATE_BLOCKS[block][0]]
+        with cls._pools_lock:
+            cls._pools[key] = (texts, expires_at)
+        return texts
+
+    @staticmethod
+    def _generate(backend: GenerationBackend, block: str, size: int) -> List[str]:
+        """Up to `size` usable paraphrases, requested in batches; those of failed batches are missing"""
+        texts = []
+        for start in range(0, size, VARIANTS_PER_REQUEST):
+            count = min(VARIANTS_PER_REQUEST, size - start)
+            try:
+                response = backend.complete(f"{block}_variants", variant_pool_request(block, count), count=count)
+                record_usage(f"{block}_variants", response)
+                content = response['choices'][0]['message']['content'].strip()
+                # Models sometimes wrap JSON in a code fence
+                content = content.strip('`').removeprefix('json').strip()
+                texts.extend(text.strip().strip('"') for text in json.loads(content) if _usable(text))
+            except Exception as e:
+                print(f"Error generating {block} variants: {str(e)}")
+                record_fallback(f"{block}_variants", None, None, e)
+                # The API is likely down; later batches would fail the same way
+                break
+        return list(dict.fromkeys(texts))[:size]
+
+    def __contains__(self, block: str) -> bool:
+        return block in self.texts
+
+    def pick(self, block: str, item1: str, item2: str) -> str:
+        """The text for one pair; the same pair always gets the same variant"""
+        texts = self.texts[block]
+        digest = hashlib.sha256(f"{block}\x1f{item1}\x1f{item2}".encode('utf-8')).digest()
+        return fill_template(texts[int.from_bytes(digest[:4], 'big') % len(texts)], item1, item2)
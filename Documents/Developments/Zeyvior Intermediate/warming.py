@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Keep the most requested pair pages warm in the page store.
+
+The app counts pair page requests; every PREWARM_INTERVAL_SECONDS the counts
+are folded into a decayed popularity score per page, and the top pages that
+are missing or due for a refresh are regenerated on the scheduler's idle lane.
+Request logs from a proxy or an earlier deployment can seed the scores:
+
+    python warming.py access.log [more.log ...] --store pages.db
+"""
+import argparse
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from slugify import slugify
+from generate_comparisons import map_in_order
+from page_store import PageStore
+from scheduler import FairScheduler
+
+# Pages whose decayed score drops below this are no longer tracked
+MIN_TRACKED_SCORE = 0.01
+
+# Lease in the page store held by the one worker process that does the warming
+PREWARM_LEASE = 'prewarmer'
+
+_PAIR_PATH_RE = re.compile(r'"(?:GET|HEAD) /([^/?# ]+-vs-[^/?# ]+\.html)[?# ]')
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+@dataclass
+class PrewarmConfig:
+    """How many pages are kept warm, how often, and when they count as stale"""
+    # Pages to keep warm; 0 turns pre-warming off
+    top_n: int = 0
+    interval_seconds: float = 60.0
+    # Popularity halves over this time, so yesterday's spike fades out
+    half_life_seconds: float = 86400.0
+    # Pages older than this are regenerated before a visitor finds them stale;
+    # None only generates missing pages
+    refresh_seconds: Optional[float] = 453600.0
+    # Pages generated at once in the background
+    concurrency: int = 2
+    # Most pair pages kept in the store; the least popular regenerable ones go first
+    max_pages: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, page_ttl: float = 604800.0) -> 'PrewarmConfig':
+        """Settings from PREWARM_* variables; a page_ttl of 0 (pages never expire) turns refreshing off"""
+        refresh = os.getenv('PREWARM_REFRESH_SECONDS')
+        return cls(
+            top_n=_env_int('PREWARM_TOP_N', 0),
+            interval_seconds=float(os.getenv('PREWARM_INTERVAL_SECONDS', '60')),
+            half_life_seconds=float(os.getenv('POPULARITY_HALF_LIFE_SECONDS', '86400')),
+            # By default a quarter of the page TTL ahead of it
+            refresh_seconds=float(refresh) if refresh else (page_ttl * 0.75 if page_ttl else None),
+            concurrency=_env_int('PREWARM_CONCURRENCY', 2),
+            max_pages=_env_int('PREWARM_MAX_PAGES', None),
+        )
+
+
+def split_pair_filename(filename: str) -> Optional[Tuple[str, str]]:
+    """'a-vs-b.html' -> ('a', 'b'); None for anything that isn't a top-level pair page"""
+    if '/' in filename or not filename.endswith('.html'):
+        return None
+    slugs = filename[:-len('.html')].split('-vs-')
+    return (slugs[0], slugs[1]) if len(slugs) == 2 else None
+
+
+def parse_access_log(lines: Iterable[str]) -> Counter:
+    """Count pair page requests in common/combined format access log lines"""
+    hits = Counter()
+    for line in lines:
+        match = _PAIR_PATH_RE.search(line)
+        if match:
+            hits[match.group(1)] += 1
+    return hits
+
+
+class PreWarmer:
+    """Tracks pair and keyword popularity and regenerates the top pages in the background.
+
+    record() is called on every pair page request and only bumps an in-memory
+    counter. A background thread folds the counters into the store (so all
+    worker processes add to the same scores), then regenerates the top_n pages
+    that are missing or older than refresh_seconds. Slots the requested pages
+    don't fill go to unrequested pairs of the most popular keywords. Generation
+    runs as a background scheduler job, so it only uses workers that requests
+    leave idle, and pages beyond max_pages are evicted least popular first.
+    generate(filename, item1, item2) returns whether it stored the page; one
+    that fell back to generic text is left for the next cycle.
+
+    Every worker process runs a pre-warmer, but only the one holding the
+    prewarmer lease in the store warms and evicts; the others just flush their
+    counts. A lease whose process died runs out after three intervals.
+    """
+
+    def __init__(self, store: PageStore, scheduler: FairScheduler,
+                 generate: Callable[[str, str, str], bool], config: Optional[PrewarmConfig] = None):
+        self.store = store
+        self.scheduler = scheduler
+        self.generate = generate
+        self.config = config or PrewarmConfig.from_env()
+        self.warmed = 0
+        self.evicted = 0
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._hits: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def lead(self) -> bool:
+        """Take or renew the pre-warming lease; whether this process does the warming"""
+        return self.store.acquire_lease(PREWARM_LEASE, self._owner, self.config.interval_seconds * 3)
+
+    def record(self, filename: str):
+        with self._lock:
+            self._hits[filename] += 1
+
+    def flush(self):
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+        if hits:
+            self.store.add_hits(hits, self.config.half_life_seconds)
+
+    def _keywords(self, filename: str) -> Optional[Tuple[str, str]]:
+        slugs = split_pair_filename(filename)
+        if slugs is None:
+            return None
+        item1, item2 = self.store.keyword_for_slug(slugs[0]), self.store.keyword_for_slug(slugs[1])
+        if item1 is None or item2 is None or item1 == item2:
+            return None
+        return item1, item2
+
+    def keyword_popularity(self, scores: List[Tuple[str, float]]) -> Dict[str, float]:
+        """Each keyword's share of the page scores it appears in"""
+        totals: Dict[str, float] = {}
+        for filename, score in scores:
+            pair = self._keywords(filename)
+            if pair:
+                for keyword in pair:
+                    totals[keyword] = totals.get(keyword, 0.0) + score
+        return totals
+
+    def candidates(self, scores: List[Tuple[str, float]]) -> List[Tuple[str, str, str]]:
+        """The top_n (filename, item1, item2) to keep warm, requested pages first"""
+        top: Dict[str, Tuple[str, str]] = {}
+        # a-vs-b and b-vs-a are one generation, so each pair takes one slot
+        seen = set()
+        for filename, _ in scores:
+            if len(top) >= self.config.top_n:
+                break
+            pair = self._keywords(filename)
+            if pair and frozenset(pair) not in seen:
+                seen.add(frozenset(pair))
+                top[filename] = pair
+        if len(top) < self.config.top_n:
+            # Pairs of popular keywords are likely next, even if nobody asked for them yet
+            popularity = self.keyword_popularity(scores)
+            # Same orientation as generate_comparisons.py: keywords in the order they were added
+            keywords = [keyword for keyword in self.store.keywords() if keyword in popularity]
+            pairs = sorted(combinations(keywords, 2),
+                           key=lambda pair: popularity[pair[0]] * popularity[pair[1]], reverse=True)
+            for item1, item2 in pairs:
+                if len(top) >= self.config.top_n:
+                    break
+                if frozenset((item1, item2)) not in seen:
+                    seen.add(frozenset((item1, item2)))
+                    top[f"{slugify(item1)}-vs-{slugify(item2)}.html"] = (item1, item2)
+        return [(filename, item1, item2) for filename, (item1, item2) in top.items()]
+
+    def _stale(self, filename: str) -> bool:
+        updated_at = self.store.updated_at(filename)
+        if updated_at is None:
+            return True
+        return self.config.refresh_seconds is not None and time.time() - updated_at > self.config.refresh_seconds
+
+    def _warm(self, candidate: Tuple[str, str, str]) -> bool:
+        filename, item1, item2 = candidate
+        # A visitor or another worker may have generated it since the cycle started
+        if not self._stale(filename):
+            return False
+        return bool(self.generate(filename, item1, item2))
+
+    def evict(self, scores: List[Tuple[str, float]], keep: Iterable[str] = ()) -> int:
+        """Delete the least popular pair pages beyond max_pages that can be regenerated on demand"""
+        if self.config.max_pages is None:
+            return 0
+        score_of = dict(scores)
+        keep = set(keep)
+        pages = [filename for filename in self.store.filenames() if self._keywords(filename)]
+        if len(pages) <= self.config.max_pages:
+            return 0
+        pages.sort(key=lambda filename: (filename in keep, score_of.get(filename, 0.0)), reverse=True)
+        cold = pages[self.config.max_pages:]
+        for filename in cold:
+            self.store.delete(filename)
+        return len(cold)
+
+    def run_once(self) -> Tuple[int, int]:
+        """One cycle: fold in hits, warm the top pages, evict cold ones; returns (warmed, evicted)"""
+        self.flush()
+        scores = self.store.popularity(self.config.half_life_seconds)
+        self.store.forget_popularity(filename for filename, score in scores if score < MIN_TRACKED_SCORE)
+        scores = [(filename, score) for filename, score in scores if score >= MIN_TRACKED_SCORE]
+
+        candidates = self.candidates(scores)
+        stale = [candidate for candidate in candidates if self._stale(candidate[0])]
+        warmed = 0
+        if stale:
+            job = self.scheduler.open_job('prewarm', len(stale), background=True)
+            try:
+                for generated in map_in_order(self._warm, stale, job, window=self.config.concurrency):
+                    warmed += generated
+                    # Keep the lease through a cycle that outlasts it
+                    if self._thread is not None:
+                        self.lead()
+            finally:
+                job.shutdown(cancel_futures=True)
+        evicted = self.evict(scores, keep=(filename for filename, _, _ in candidates))
+        self.warmed += warmed
+        self.evicted += evicted
+        if warmed or evicted:
+            print(f"Pre-warmed {warmed} pages, evicted {evicted} ({len(scores)} pages tracked)")
+        return warmed, evicted
+
+    def _loop(self):
+        while not self._stop.wait(self.config.interval_seconds):
+            # Requests come first; skip the cycle while pages are queued for them
+            if self.scheduler.queued() or not self.lead():
+                self.flush()
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Pre-warming failed: {str(e)}")
+
+    def start(self):
+        if self.config.top_n > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="prewarmer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+        self.store.release_lease(PREWARM_LEASE, self._owner)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed page popularity from access logs")
+    parser.add_argument('logs', nargs='+', help="Access logs in common or combined format")
+    parser.add_argument('--store', default=os.getenv('PAGE_STORE_PATH', 'pages.db'), help="Page store to update")
+    parser.add_argument('--top', type=int, default=20, help="How many of the most popular pages to list")
+    args = parser.parse_args()
+
+    store = PageStore(args.store)
+    config = PrewarmConfig.from_env()
+    hits = Counter()
+    for path in args.logs:
+        with open(path, encoding='utf-8', errors='replace') as log:
+            hits.update(parse_access_log(log))
+    store.add_hits(hits, config.half_life_seconds)
+    print(f"Added {sum(hits.values()):,} requests for {len(hits):,} pages")
+    for filename, score in store.popularity(config.half_life_seconds)[:args.top]:
+        print(f"  {score:>10.1f}  {filename}")
+
+
+if __name__ == "__main__":
+    main()